@@ -0,0 +1,49 @@
+"""Add notification_outbox (transactional outbox for quake notifications)
+
+Revision ID: 013_notification_outbox
+Revises: 012_emergency_contacts_rebuild
+Create Date: 2026-10-19
+
+Deprem ingest'i kanal başına (push, ws) olay satırı yazar; teslimat worker'ları
+FOR UPDATE SKIP LOCKED ile boşaltır. Kısmi indeks yalnız bekleyen satırları tutar.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "013_notification_outbox"
+down_revision = "012_emergency_contacts_rebuild"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "notification_outbox" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("channel", sa.String(16), nullable=False),
+        sa.Column("event_type", sa.String(32), nullable=False),
+        sa.Column("idempotency_key", sa.String(128), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("delivered_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("idempotency_key", name="uq_notification_outbox_idempotency_key"),
+    )
+    op.create_index(
+        "ix_notification_outbox_pending",
+        "notification_outbox",
+        ["channel", "available_at"],
+        postgresql_where=sa.text("delivered_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_outbox_pending", table_name="notification_outbox")
+    op.drop_table("notification_outbox")
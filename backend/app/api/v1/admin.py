@@ -20,6 +20,7 @@ from app.models.notification_pref import NotificationPref
 from app.models.notification_log import NotificationLog
 from app.models.app_settings import AppSettings, DEFAULT_SETTINGS
 from app.dependencies import get_current_user, get_admin_user
+from app.services.push_audience import refresh_user_audience
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -149,6 +150,125 @@ async def admin_stats(
     )
 
 
+class FcmMetricsHour(BaseModel):
+    hour: datetime
+    attempted: int = 0
+    success: int = 0
+    failed: int = 0
+    dead: int = 0
+    pruned: int = 0
+
+
+class FcmMetricsOut(BaseModel):
+    hours: List[FcmMetricsHour]
+    attempted: int
+    pruned: int
+    prune_rate: float        # Temizlenen token / gönderim denemesi (pencere toplamı)
+    pruned_per_hour: float
+
+
+@router.get("/metrics/fcm", response_model=FcmMetricsOut, summary="FCM gönderim ve token temizliği metrikleri")
+async def fcm_metrics(
+    hours: int = Query(24, ge=1, le=168),
+    _: User = Depends(get_admin_user),
+) -> FcmMetricsOut:
+    """Saat bazlı FCM sayaçları ve geçersiz token temizleme oranı."""
+    from app.core.redis import get_redis
+    from app.services.metrics import read_counters
+
+    series = [FcmMetricsHour(**row) for row in await read_counters(await get_redis(), "fcm", hours)]
+    attempted = sum(h.attempted for h in series)
+    pruned = sum(h.pruned for h in series)
+    return FcmMetricsOut(
+        hours=series,
+        attempted=attempted,
+        pruned=pruned,
+        prune_rate=round(pruned / attempted, 6) if attempted else 0.0,
+        pruned_per_hour=round(pruned / hours, 2),
+    )
+
+
+
+class AlarmStageLatency(BaseModel):
+    stage: str
+    count: int
+    mean_ms: Optional[float] = None
+    p50_ms: Optional[float] = None   # Kova üst sınırı; taşma kovasında None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    within_slo: Optional[float] = None
+
+
+class AlarmMetricsOut(BaseModel):
+    source: str
+    hours: int
+    slo_ms: int
+    stages: List[AlarmStageLatency]
+
+
+@router.get("/metrics/alarms", response_model=AlarmMetricsOut, summary="Alarm hattı aşama gecikmeleri (SLO)")
+async def alarm_metrics(
+    hours: int = Query(24, ge=1, le=168),
+    source: str = Query("shake", pattern="^(shake|catalog)$"),
+    _: User = Depends(get_admin_user),
+) -> AlarmMetricsOut:
+    """Algılama → kuyruk → worker → ilk/son token aşamalarının histogram özeti."""
+    from app.config import settings
+    from app.core.redis import get_redis
+    from app.services.alarm_latency import STAGES, metric_name
+    from app.services.metrics import read_counters, summarize_latencies
+
+    rows = await read_counters(await get_redis(), metric_name(source), hours)
+    slo_ms = settings.ALARM_LATENCY_SLO_MS
+    stages = [
+        AlarmStageLatency(
+            stage=stage,
+            **summarize_latencies(rows, stage, slo_ms if stage.startswith("to_") else None),
+        )
+        for stage in STAGES
+    ]
+    return AlarmMetricsOut(source=source, hours=hours, slo_ms=slo_ms, stages=stages)
+
+
+class SOSMetricsOut(BaseModel):
+    hours: int
+    slo_ms: int
+    stages: List[AlarmStageLatency]
+    providers: List[AlarmStageLatency]   # Groq transcribe / Anthropic extract çağrı süreleri
+
+
+@router.get("/metrics/sos", response_model=SOSMetricsOut, summary="Sesli S.O.S hattı aşama gecikmeleri (SLO)")
+async def sos_metrics(
+    hours: int = Query(24, ge=1, le=168),
+    _: User = Depends(get_admin_user),
+) -> SOSMetricsOut:
+    """
+    İstekten ilk uyarı / transkripsiyon / takip mesajına kadar sürelerin ve
+    sağlayıcı çağrılarının (ai_latency) histogram özeti.
+    """
+    from app.config import settings
+    from app.core.redis import get_redis
+    from app.services import ai_clients
+    from app.services.metrics import read_counters, summarize_latencies
+    from app.services.sos_pipeline import METRIC_NAME, STAGES
+
+    redis = await get_redis()
+    rows = await read_counters(redis, METRIC_NAME, hours)
+    provider_rows = await read_counters(redis, ai_clients.METRIC_NAME, hours)
+    slo_ms = settings.SOS_FIRST_ALERT_SLO_MS
+    stages = [
+        AlarmStageLatency(
+            stage=stage,
+            **summarize_latencies(rows, stage, slo_ms if stage == "first_alert" else None),
+        )
+        for stage in STAGES
+    ]
+    providers = [
+        AlarmStageLatency(stage=stage, **summarize_latencies(provider_rows, stage))
+        for stage in ai_clients.STAGES
+    ]
+    return SOSMetricsOut(hours=hours, slo_ms=slo_ms, stages=stages, providers=providers)
+
 # ─── User Management ─────────────────────────────────────────────────────────
 
 @router.get("/users", response_model=List[AdminUserOut], summary="Tüm kullanıcıları listele")
@@ -220,6 +340,7 @@ async def delete_user(
         raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı.")
     await db.delete(user)
     await db.commit()
+    await refresh_user_audience(db, user_id)
     logger.info("Admin kullanıcı sildi: admin=%d deleted=%d", admin.id, user_id)
 
 
@@ -333,12 +454,12 @@ async def broadcast_notification(
         tokens = [target_user.fcm_token]
     else:
         # Broadcast
-        q = select(User).where(User.fcm_token.isnot(None))
+        # Yalnızca token kolonu çekilir — büyük broadcast'te ORM nesnesi oluşturulmaz
+        q = select(User.fcm_token).where(User.fcm_token.isnot(None))
         if body.only_active:
             q = q.where(User.is_active == True)
         result = await db.execute(q)
-        users = result.scalars().all()
-        tokens = [u.fcm_token for u in users if u.fcm_token]
+        tokens = [t for t in result.scalars().all() if t]
 
     if not tokens:
         return {"sent": 0, "message": "FCM token'ı olan kullanıcı yok."}
@@ -14,6 +14,7 @@ from app.models.user import User
 from app.models.notification_pref import NotificationPref
 from app.dependencies import get_current_user
 from app.services.fcm import send_earthquake_push
+from app.services.push_audience import refresh_user_audience
 from app.schemas.notification_pref import NotificationPrefIn, NotificationPrefOut
 
 logger = logging.getLogger(__name__)
@@ -47,6 +48,7 @@ async def register_fcm_token(
     """
     current_user.fcm_token = body.fcm_token
     await db.commit()
+    await refresh_user_audience(db, current_user.id)
     logger.info("FCM token güncellendi: user_id=%d", current_user.id)
     return {"ok": True, "message": "FCM token kaydedildi."}
 
@@ -66,6 +68,7 @@ async def delete_fcm_token(
     """
     current_user.fcm_token = None
     await db.commit()
+    await refresh_user_audience(db, current_user.id)
     logger.info("FCM token silindi: user_id=%d", current_user.id)
     return {"ok": True, "message": "Bildirimler kapatıldı."}
 
@@ -122,11 +125,11 @@ async def update_notification_prefs(
         db.add(pref)
 
     pref.min_magnitude = body.min_magnitude
-    pref.radius_km = body.radius_km
-    pref.is_enabled = body.is_enabled
+    pref.push_enabled = body.push_enabled
 
     await db.commit()
     await db.refresh(pref)
+    await refresh_user_audience(db, current_user.id)
     logger.info("Bildirim tercihleri güncellendi: user_id=%d", current_user.id)
     return pref
 
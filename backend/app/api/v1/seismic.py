@@ -1,32 +1,53 @@
 """
 Seismic (sensör) API endpoint'leri.
-POST /seismic/report → cihaz titreşim raporu al, cluster güncelle.
-GET  /seismic/clusters → aktif cluster listesi.
+POST /seismic/report → cihaz titreşim raporu al, cluster güncelle (Redis, DB'siz).
+POST /seismic/waveforms → ham ivme pencerelerini sunucuda analiz et (NumPy).
+GET  /seismic/clusters → aktif cluster listesi (Redis özetleri).
+GET  /seismic/clusters/stream → cluster değişiklikleri (SSE delta akışı).
 rules.md: rate limit, type hints, logging, try/catch.
 """
 
+import asyncio
+import json
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import List
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import AsyncSession
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
+from redis.exceptions import TimeoutError as RedisTimeoutError, RedisError
 
-from app.database import get_db
-from app.models.seismic_report import SeismicReport
-from app.schemas.seismic import SeismicReportIn, SeismicReportOut, SeismicClusterOut
+from app.config import settings
+from app.core.redis import get_shake_redis
+from app.schemas.seismic import (
+    SeismicClusterOut,
+    SeismicReportIn,
+    SeismicReportOut,
+    WaveformBatchIn,
+    WaveformVerdictOut,
+)
 from app.services.seismic_cluster import (
-    find_nearby_cluster_id,
-    get_next_cluster_id,
-    get_cluster_size,
+    ClusterSummary,
+    SeismicClusterEngine,
+    diff_cluster_snapshots,
     is_likely_earthquake,
 )
+from app.services.waveform_archive import WaveformArchiveError, get_waveform_archive
+from app.services.waveform_engine import WaveformVerdict, decode_and_analyze
+from app.utils.epicenter import MIN_STATIONS
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-_CLUSTER_WINDOW_SEC: int = 60
+
+async def get_cluster_engine(
+    redis: Redis | RedisCluster = Depends(get_shake_redis),
+) -> SeismicClusterEngine:
+    """SeismicClusterEngine'i shake Redis bağlantısı ile döndürür."""
+    return SeismicClusterEngine(redis)
 
 
 @router.post(
@@ -37,81 +58,220 @@ _CLUSTER_WINDOW_SEC: int = 60
 )
 async def report_trigger(
     body: SeismicReportIn,
-    db: AsyncSession = Depends(get_db),
+    engine: SeismicClusterEngine = Depends(get_cluster_engine),
 ) -> SeismicReportOut:
     """
     Cihaz STA/LTA eşiğini aştığında buraya rapor gönderir.
-    Yakın raporlarla kümelenerek olası deprem tespiti yapılır.
+    Yakın raporlarla Redis üzerinde kümelenerek olası deprem tespiti yapılır.
+    Rapor DB'ye asenkron toplu yazılır (persist_seismic_reports), bu yüzden id döndürülmez.
     """
     now = datetime.now(tz=timezone.utc)
 
-    cluster_id = await find_nearby_cluster_id(body.latitude, body.longitude, now, db)
-    if cluster_id is None:
-        cluster_id = await get_next_cluster_id(db)
-
-    report = SeismicReport(
-        device_id=body.device_id,
-        peak_acceleration=body.peak_acceleration,
-        sta_lta_ratio=body.sta_lta_ratio,
-        latitude=body.latitude,
-        longitude=body.longitude,
-        cluster_id=cluster_id,
-        reported_at=now,
-    )
-    db.add(report)
-    await db.commit()
-    await db.refresh(report)
+    try:
+        assignment = await engine.add_report(
+            device_id=body.device_id,
+            peak_acceleration=body.peak_acceleration,
+            sta_lta_ratio=body.sta_lta_ratio,
+            latitude=body.latitude,
+            longitude=body.longitude,
+            reported_at=now,
+            triggered_at=body.triggered_at,
+        )
+    except (RedisTimeoutError, RedisError) as e:
+        logger.error("Redis hatası (seismic report): %s", e)
+        raise HTTPException(status_code=503, detail="Servis geçici olarak kullanılamıyor. Lütfen tekrar deneyin.")
 
-    size = await get_cluster_size(cluster_id, db)
-    earthquake = is_likely_earthquake(size)
+    earthquake = is_likely_earthquake(assignment.cluster_size)
 
     if earthquake:
         logger.warning(
             "Olası crowd-sourced deprem! cluster_id=%d size=%d lat=%.4f lng=%.4f",
-            cluster_id, size, body.latitude, body.longitude,
+            assignment.cluster_id, assignment.cluster_size, body.latitude, body.longitude,
         )
 
+    # Konum her raporda değil, cihaz sayısı 4, 8, 16… olduğunda yeniden çözülür
+    size = assignment.cluster_size
+    if earthquake and size >= MIN_STATIONS and size & (size - 1) == 0:
+        try:
+            located = await engine.locate(assignment.cluster_id)
+        except (RedisTimeoutError, RedisError) as e:
+            logger.warning("Cluster konumlama atlandı (Redis): %s", e)
+            located = None
+        if located:
+            logger.warning(
+                "Cluster %d episantr (varış zamanları): %.4f,%.4f ±%.1f km, rms=%.2fs",
+                assignment.cluster_id, located.latitude, located.longitude,
+                located.semi_major_km, located.rms_residual_sec,
+            )
+
     return SeismicReportOut(
-        id=report.id,
-        device_id=report.device_id,
-        cluster_id=report.cluster_id,
-        cluster_size=size,
+        id=None,
+        device_id=body.device_id,
+        cluster_id=assignment.cluster_id,
+        cluster_size=assignment.cluster_size,
         is_likely_earthquake=earthquake,
-        reported_at=report.reported_at,
+        reported_at=now,
     )
 
 
+@router.post(
+    "/waveforms",
+    response_model=List[WaveformVerdictOut],
+    summary="Ham ivme pencerelerini sunucu tarafında analiz et",
+)
+async def analyze_waveforms(
+    body: WaveformBatchIn,
+    engine: SeismicClusterEngine = Depends(get_cluster_engine),
+) -> List[WaveformVerdictOut]:
+    """
+    Cihazların sıkıştırılmış 3 eksen pencerelerini toplu olarak filtreler ve
+    STA/LTA uygular. Tetiklenen pencereler rapor gibi kümelemeye eklenir;
+    böylece algılama eşikleri cihaz güncellemesi olmadan merkezi ayarlanır.
+    Arşiv açıksa çözülen pencereler int16 olarak olay sonrası analiz için saklanır.
+    """
+    if len(body.windows) > settings.SEISMIC_WAVEFORM_MAX_WINDOWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Tek istekte en fazla {settings.SEISMIC_WAVEFORM_MAX_WINDOWS} pencere gönderilebilir.",
+        )
+
+    now = datetime.now(tz=timezone.utc)
+    on_decoded: Optional[Callable[[int, np.ndarray], None]] = None
+    if settings.SEISMIC_WAVEFORM_ARCHIVE_ENABLED:
+        archive = get_waveform_archive()
+
+        def _archive_window(i: int, counts: np.ndarray) -> None:
+            w = body.windows[i]
+            start_ts = w.start_at.timestamp() if w.start_at else now.timestamp() - len(counts) / body.sample_rate_hz
+            try:
+                archive.append(w.device_id, start_ts, body.sample_rate_hz, w.scale, w.latitude, w.longitude, counts)
+            except WaveformArchiveError as e:
+                logger.warning("Dalga formu arşivlenemedi (%s): %s", w.device_id, e)
+
+        on_decoded = _archive_window
+
+    # CPU-yoğun NumPy işi (ve arşiv yazımı) event loop'u bloklamasın
+    results = await asyncio.to_thread(
+        decode_and_analyze,
+        [(w.data, w.scale) for w in body.windows],
+        body.sample_rate_hz,
+        settings.SEISMIC_WAVEFORM_STA_SECONDS,
+        settings.SEISMIC_WAVEFORM_LTA_SECONDS,
+        settings.SEISMIC_WAVEFORM_TRIGGER_RATIO,
+        on_decoded,
+    )
+
+    out: List[WaveformVerdictOut] = []
+    for window, result in zip(body.windows, results):
+        if not isinstance(result, WaveformVerdict):
+            out.append(WaveformVerdictOut(
+                device_id=window.device_id, accepted=False, triggered=False,
+                sta_lta_ratio=0.0, peak_acceleration=0.0,
+            ))
+            continue
+        verdict = WaveformVerdictOut(
+            device_id=window.device_id,
+            accepted=True,
+            triggered=result.triggered,
+            sta_lta_ratio=result.sta_lta_ratio,
+            peak_acceleration=result.peak_acceleration,
+        )
+        if result.triggered:
+            try:
+                assignment = await engine.add_report(
+                    device_id=window.device_id,
+                    peak_acceleration=result.peak_acceleration,
+                    sta_lta_ratio=result.sta_lta_ratio,
+                    latitude=window.latitude,
+                    longitude=window.longitude,
+                    reported_at=now,
+                )
+            except (RedisTimeoutError, RedisError) as e:
+                logger.error("Redis hatası (seismic waveforms): %s", e)
+                raise HTTPException(status_code=503, detail="Servis geçici olarak kullanılamıyor. Lütfen tekrar deneyin.")
+            verdict.cluster_id = assignment.cluster_id
+            verdict.cluster_size = assignment.cluster_size
+            verdict.is_likely_earthquake = is_likely_earthquake(assignment.cluster_size)
+        out.append(verdict)
+
+    triggered = sum(1 for v in out if v.triggered)
+    if triggered:
+        logger.info("Dalga formu analizi: %d/%d pencere tetiklendi", triggered, len(out))
+    return out
+
+
+def _cluster_out(summary: ClusterSummary) -> SeismicClusterOut:
+    return SeismicClusterOut(
+        cluster_id=summary.cluster_id,
+        report_count=summary.report_count,
+        device_count=summary.device_count,
+        center_latitude=summary.center_latitude,
+        center_longitude=summary.center_longitude,
+        max_acceleration=summary.max_acceleration,
+        is_likely_earthquake=is_likely_earthquake(summary.device_count),
+        first_report_at=summary.first_report_at,
+    )
+
+
+def _sse(event: str, payload: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
 @router.get(
     "/clusters",
     response_model=List[SeismicClusterOut],
     summary="Aktif sismik cluster'ları listele",
 )
-async def list_clusters(db: AsyncSession = Depends(get_db)) -> List[SeismicClusterOut]:
-    """Son 60 saniyedeki aktif cluster'ları döner."""
-    since = datetime.now(tz=timezone.utc) - timedelta(seconds=_CLUSTER_WINDOW_SEC)
-    result = await db.execute(
-        select(
-            SeismicReport.cluster_id,
-            func.count(SeismicReport.id).label("report_count"),
-            func.avg(SeismicReport.latitude).label("center_lat"),
-            func.avg(SeismicReport.longitude).label("center_lng"),
-            func.max(SeismicReport.peak_acceleration).label("max_accel"),
-            func.min(SeismicReport.reported_at).label("first_at"),
-        )
-        .where(SeismicReport.reported_at >= since, SeismicReport.cluster_id.is_not(None))
-        .group_by(SeismicReport.cluster_id)
-        .order_by(func.count(SeismicReport.id).desc())
+async def list_clusters(
+    engine: SeismicClusterEngine = Depends(get_cluster_engine),
+) -> List[SeismicClusterOut]:
+    """Son 60 saniyedeki aktif cluster'ları Redis'teki artımlı özetlerden döner."""
+    try:
+        summaries = await engine.active_clusters(datetime.now(tz=timezone.utc).timestamp())
+    except (RedisTimeoutError, RedisError) as e:
+        logger.error("Redis hatası (seismic clusters): %s", e)
+        raise HTTPException(status_code=503, detail="Servis geçici olarak kullanılamıyor. Lütfen tekrar deneyin.")
+    return [_cluster_out(s) for s in summaries]
+
+
+@router.get(
+    "/clusters/stream",
+    summary="Aktif sismik cluster değişikliklerini SSE ile yayınla",
+)
+async def stream_clusters(
+    request: Request,
+    engine: SeismicClusterEngine = Depends(get_cluster_engine),
+) -> StreamingResponse:
+    """
+    Server-Sent Events akışı. İlk olay `snapshot` (tüm aktif cluster'lar),
+    sonrasında yalnızca değişiklikler: `upsert` (yeni/değişen cluster) ve
+    `remove` (pencereden çıkan cluster ID'leri). Yoklamaya gerek kalmaz.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        previous: Dict[int, ClusterSummary] = {}
+        first = True
+        while not await request.is_disconnected():
+            try:
+                now_ts = datetime.now(tz=timezone.utc).timestamp()
+                current = {s.cluster_id: s for s in await engine.active_clusters(now_ts)}
+            except (RedisTimeoutError, RedisError) as e:
+                logger.warning("Cluster akışı Redis hatası: %s", e)
+                current = previous
+            if first:
+                yield _sse("snapshot", [_cluster_out(s).model_dump(mode="json") for s in current.values()])
+                first = False
+            else:
+                upserts, removed = diff_cluster_snapshots(previous, current)
+                if upserts:
+                    yield _sse("upsert", [_cluster_out(s).model_dump(mode="json") for s in upserts])
+                if removed:
+                    yield _sse("remove", removed)
+            previous = current
+            await asyncio.sleep(settings.SEISMIC_STREAM_INTERVAL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    rows = result.all()
-    return [
-        SeismicClusterOut(
-            cluster_id=int(r.cluster_id),
-            report_count=int(r.report_count),
-            center_latitude=float(r.center_lat),
-            center_longitude=float(r.center_lng),
-            max_acceleration=float(r.max_accel),
-            is_likely_earthquake=is_likely_earthquake(int(r.report_count)),
-            first_report_at=r.first_at,
-        )
-        for r in rows
-    ]
@@ -4,13 +4,15 @@ Mobil cihazdan gelen shake verisini alır, Redis sliding window ile kümeleyip d
 """
 
 import logging
+import time
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.core.redis import get_redis
+from app.core.redis import get_shake_redis
 from app.schemas.sensors import ShakeReportRequest, ShakeReportResponse
 from app.services.shake_cluster_service import ShakeClusterService
 from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
 from redis.exceptions import TimeoutError as RedisTimeoutError, RedisError
 
 logger = logging.getLogger(__name__)
@@ -18,8 +20,10 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-async def get_shake_service(redis: Redis = Depends(get_redis)) -> ShakeClusterService:
-    """ShakeClusterService'i Redis bağımlılığı ile döndürür."""
+async def get_shake_service(
+    redis: Redis | RedisCluster = Depends(get_shake_redis),
+) -> ShakeClusterService:
+    """ShakeClusterService'i ayrılmış shake Redis bağlantısı ile döndürür."""
     return ShakeClusterService(redis)
 
 
@@ -48,6 +52,8 @@ async def report_shake(
         )
 
         if confirmed:
+            # Alarm SLO: sunucunun kümeyi doğruladığı an (AlarmTimeline.detected_ts)
+            detected_ts = time.time()
             # WebSocket ile tüm client'lara anlık bildir
             try:
                 from app.api.websocket import manager
@@ -58,6 +64,14 @@ async def report_shake(
                     "timestamp": confirmed.timestamp.isoformat(),
                     "device_count": confirmed.device_count,
                     "geohash": confirmed.geohash,
+                    "extent_km": confirmed.extent_km,
+                    "max_intensity": confirmed.max_intensity,
+                    "estimated_magnitude": confirmed.estimated_magnitude,
+                    "location_method": confirmed.location_method,
+                    "origin_time": confirmed.origin_time.isoformat() if confirmed.origin_time else None,
+                    "uncertainty_major_km": confirmed.uncertainty_major_km,
+                    "uncertainty_minor_km": confirmed.uncertainty_minor_km,
+                    "uncertainty_azimuth_deg": confirmed.uncertainty_azimuth_deg,
                 }
                 await manager.broadcast_earthquake(earthquake_data)
             except Exception as e:
@@ -72,6 +86,12 @@ async def report_shake(
                     geohash=confirmed.geohash,
                     timestamp_iso=confirmed.timestamp.isoformat(),
                     device_count=confirmed.device_count,
+                    extent_km=confirmed.extent_km,
+                    estimated_magnitude=confirmed.estimated_magnitude,
+                    origin_time_iso=confirmed.origin_time.isoformat() if confirmed.origin_time else None,
+                    uncertainty_km=confirmed.uncertainty_major_km or 0.0,
+                    detected_ts=detected_ts,
+                    enqueued_ts=time.time(),
                 )
             except Exception as e:
                 logger.error("Celery task kuyruğa alma hatası: %s", e)
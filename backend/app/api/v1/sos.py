@@ -5,9 +5,8 @@ Sesli acil durum bildirimi için endpoint'ler.
 
 import logging
 import os
-import tempfile
+import time
 from datetime import datetime
-from typing import Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
 from fastapi.responses import FileResponse
@@ -26,9 +25,9 @@ from app.schemas.sos import (
     SOSAudioResponse, SOSSafeResponse,
 )
 from app.tasks.process_sos import process_sos_audio_task
-from app.services.audio_storage import get_audio_storage
-from app.services.twilio_fallback import send_waterfall_emergency
-from app.services.whisper_service import get_whisper_service, WhisperServiceError
+from app.services.audio_storage import AudioEmptyError, AudioTooLargeError, StoredAudio, get_audio_storage
+from app.services.twilio_fallback import send_waterfall_emergency_async
+from app.services.sos_pipeline import run_sos_pipeline, start_transcription
 from app.core.redis import get_redis
 from app.core.rate_limit import limiter
 from app.config import settings
@@ -39,6 +38,19 @@ router = APIRouter()
 # Allowed audio formats
 ALLOWED_AUDIO_FORMATS = {".mp3", ".wav", ".m4a", ".ogg", ".webm"}
 
+# KRİTİK FALLBACK — Groq başarısız → sabit metin
+_TRANSCRIPTION_FALLBACK = "S.O.S Sinyali alındı ancak ses çözümlenemedi."
+
+
+async def _store_upload(audio_file: UploadFile, user_id: int, timestamp: str, ext: str) -> StoredAudio:
+    """Yüklemeyi akışla depoya yazar; boyut aşımı 413, boş dosya 400."""
+    try:
+        return await get_audio_storage().stream_upload(audio_file, user_id, timestamp, ext)
+    except AudioTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    except AudioEmptyError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
 
 @router.post(
     "/analyze",
@@ -88,18 +100,18 @@ async def analyze_sos(
             detail=f"Desteklenmeyen ses formatı. İzin verilenler: {', '.join(ALLOWED_AUDIO_FORMATS)}"
         )
 
-    # Save to temporary file
+    # Akışla doğrudan depoya yaz (bellekte tamponlamadan, kopyasız)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            content = await audio_file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+        stored = await _store_upload(audio_file, current_user.id, timestamp, file_ext)
 
-        logger.info("S.O.S audio uploaded: user_id=%d, size=%d bytes", current_user.id, len(content))
+        logger.info(
+            "S.O.S audio uploaded: user_id=%d, size=%d bytes, sha256=%s",
+            current_user.id, stored.size, stored.sha256[:12],
+        )
 
         # Queue Celery task
         task = process_sos_audio_task.delay(
-            audio_path=tmp_path,
+            audio_path=str(stored.path),
             user_id=current_user.id,
             timestamp=timestamp,
             latitude=latitude,
@@ -114,6 +126,8 @@ async def analyze_sos(
             message="S.O.S kaydınız işleniyor..."
         )
 
+    except HTTPException:
+        raise
     except Exception as exc:
         logger.error("S.O.S upload hatası: %s", exc)
         raise HTTPException(
@@ -142,7 +156,7 @@ async def test_sos_twilio(
     """
     Twilio S.O.S test endpoint'i.
 
-    - Celery kuyruğunu BYPASS eder — doğrudan senkron Twilio API çağrısı yapar.
+    - Celery kuyruğunu BYPASS eder — Twilio API'yi doğrudan (async httpx havuzu) çağırır.
     - Waterfall mantığı aktif: WhatsApp başarısız → SMS fallback.
     - Hata veya yanlış numara durumunda anında 400 döner, mobil ekranda görünür.
     - Test sonucu her numara için detaylı olarak yanıtta yer alır.
@@ -163,19 +177,13 @@ async def test_sos_twilio(
         )
 
     try:
-        # Celery bypass — doğrudan senkron Twilio çağrısı
-        # run_in_executor ile event loop'u bloke etmeden çalıştır
-        import asyncio
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: send_waterfall_emergency(
-                phone_numbers=payload.phone_numbers,
-                message=payload.message,
-                channel=payload.channel,
-                user_id=current_user.id,
-                event_type="TEST",
-            ),
+        # Celery bypass — doğrudan async Twilio çağrısı (httpx havuzu, thread yok)
+        result = await send_waterfall_emergency_async(
+            phone_numbers=payload.phone_numbers,
+            message=payload.message,
+            channel=payload.channel,
+            user_id=current_user.id,
+            event_type="TEST",
         )
     except Exception as exc:
         logger.error("[SOS Test] Twilio çağrısı başarısız: %s", exc)
@@ -383,8 +391,8 @@ async def get_sos_audio(
     status_code=status.HTTP_200_OK,
     summary="S.O.S ses kaydını Groq ile metne çevirip Twilio Şelale ile gönder (senkron)",
     description=(
-        "Ses dosyasını alır, Groq Whisper ile Türkçe metne çevirir, "
-        "acil kişilere WhatsApp→SMS şelale ile gönderir. "
+        "Ses dosyasını alır; acil kişilere hemen konumlu ilk uyarıyı, Groq Whisper "
+        "ile Türkçe metne çevrilince metinli takip mesajını WhatsApp→SMS şelale ile gönderir. "
         "Celery kullanmaz — anında sonuç döner."
     ),
 )
@@ -399,20 +407,20 @@ async def sos_audio_sync(
     db: AsyncSession = Depends(get_db),
 ) -> SOSAudioResponse:
     """
-    Ses → Groq Whisper → Twilio Şelale pipeline.
+    Ses → (ilk uyarı ∥ Groq Whisper) → takip mesajı (app.services.sos_pipeline).
 
     Zincir:
-      1. Ses dosyasını geçici diske kaydet
-      2. Groq Whisper ile metne çevir
+      1. Ses dosyasını akışla depoya kaydet (SOS_AUDIO_MAX_BYTES, SHA-256)
+      2. Groq Whisper transkripsiyonunu arka planda başlat
       3. Acil kişilerin telefon numaralarını DB'den al
-      4. Twilio Waterfall: WhatsApp → başarısız olursa SMS
-      5. Sonucu senkron döndür
+      4. Twilio Şelale ile hemen konumlu ilk uyarı (transkripsiyonu beklemez)
+      5. Transkripsiyon hazır olunca metinli takip mesajı; sonucu senkron döndür
 
     Fallback:
-      - Groq API hatası → "S.O.S Sinyali alındı ancak ses çözümlenemedi."
+      - Groq API hatası → takip mesajı gitmez, yanıtta "S.O.S Sinyali alındı ancak ses çözümlenemedi."
       - Acil kişi yok → 200 + boş gönderim
     """
-    import asyncio
+    received_ts = time.time()
 
     if not audio_file.filename:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ses dosyası gerekli")
@@ -425,33 +433,18 @@ async def sos_audio_sync(
         )
 
     ts = timestamp or datetime.utcnow().isoformat()
-    tmp_path: Optional[str] = None
-    transcription: str = ""
 
     try:
-        # 1. Geçici dosyaya kaydet
-        content = await audio_file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
+        # 1. Akışla depoya kaydet (bellekte tamponlamadan, içerik özeti ile)
+        stored = await _store_upload(audio_file, current_user.id, ts, file_ext)
 
         logger.info(
-            "[SOS Audio] Dosya alındı: user=%d, boyut=%d bytes, format=%s",
-            current_user.id, len(content), file_ext,
+            "[SOS Audio] Dosya alındı: user=%d, boyut=%d bytes, format=%s, sha256=%s",
+            current_user.id, stored.size, file_ext, stored.sha256[:12],
         )
 
-        # 2. Groq Whisper transkripsiyon (thread pool — blocking I/O)
-        try:
-            whisper = get_whisper_service()
-            transcription = await asyncio.get_running_loop().run_in_executor(
-                None,
-                lambda: whisper.transcribe(tmp_path, timeout=12),
-            )
-            logger.info("[SOS Audio] Groq transkripsiyon OK: %d karakter", len(transcription))
-        except (WhisperServiceError, Exception) as exc:
-            # KRİTİK FALLBACK — Groq başarısız → sabit metin
-            transcription = "S.O.S Sinyali alındı ancak ses çözümlenemedi."
-            logger.warning("[SOS Audio] Groq fallback devreye girdi: %s", exc)
+        # 2. Transkripsiyon arka planda (kişi sorgusu ve ilk uyarı ile eşzamanlı)
+        transcription = start_transcription(str(stored.path), timeout=12)
 
         # 3. Acil kişileri al
         contacts_result = await db.execute(
@@ -467,7 +460,7 @@ async def sos_audio_sync(
             logger.warning("[SOS Audio] Acil kişi yok: user_id=%d", current_user.id)
             return SOSAudioResponse(
                 success=True,
-                transcription=transcription,
+                transcription=await transcription or _TRANSCRIPTION_FALLBACK,
                 notified_contacts=0,
                 whatsapp_sent=0,
                 sms_sent=0,
@@ -475,43 +468,30 @@ async def sos_audio_sync(
                 message="Transkripsiyon tamamlandı ancak acil kişi bulunamadı. Lütfen acil kişi ekleyin.",
             )
 
-        # 4. Mesaj formatla
-        maps_link = f"https://maps.google.com/?q={latitude:.6f},{longitude:.6f}"
-        full_message = (
-            f"🆘 ACİL DURUM S.O.S: {current_user.email}\n"
-            f"Mesaj: {transcription}\n"
-            f"📍 Konum: {maps_link}"
-        )
-
-        # 5. Twilio Şelale: WhatsApp → SMS
-        loop = asyncio.get_running_loop()
-        wf_result = await loop.run_in_executor(
-            None,
-            lambda: send_waterfall_emergency(
-                phone_numbers=phone_numbers,
-                message=full_message,
-                channel="waterfall",
-                user_id=current_user.id,
-                event_type="SOS_AUDIO",
-            ),
+        # 4–5. İlk uyarı hemen, metinli takip transkripsiyon bitince
+        pipeline = await run_sos_pipeline(
+            transcription, phone_numbers, current_user.email, latitude, longitude,
+            user_id=current_user.id, received_ts=received_ts,
         )
+        first, followup = pipeline.first, pipeline.followup or {}
+        whatsapp_sent = first["whatsapp_sent"] + followup.get("whatsapp_sent", 0)
+        sms_sent = first["sms_sent"] + followup.get("sms_sent", 0)
 
         logger.info(
-            "[SOS Audio] Twilio Şelale tamamlandı: user=%d, WA=%d, SMS=%d, failed=%d",
-            current_user.id,
-            wf_result["whatsapp_sent"],
-            wf_result["sms_sent"],
-            wf_result["failed"],
+            "[SOS Audio] Twilio Şelale tamamlandı: user=%d, WA=%d, SMS=%d, failed=%d, ilk uyarı=%.0f ms",
+            current_user.id, whatsapp_sent, sms_sent, first["failed"], pipeline.first_alert_ms or -1,
         )
 
         return SOSAudioResponse(
             success=True,
-            transcription=transcription,
-            notified_contacts=wf_result["whatsapp_sent"] + wf_result["sms_sent"],
-            whatsapp_sent=wf_result["whatsapp_sent"],
-            sms_sent=wf_result["sms_sent"],
-            fallback_used=wf_result["fallback_used"],
-            message=f"S.O.S iletildi: {wf_result['whatsapp_sent']} WhatsApp, {wf_result['sms_sent']} SMS.",
+            transcription=pipeline.transcription or _TRANSCRIPTION_FALLBACK,
+            notified_contacts=first["whatsapp_sent"] + first["sms_sent"],
+            whatsapp_sent=whatsapp_sent,
+            sms_sent=sms_sent,
+            fallback_used=first["fallback_used"] or followup.get("fallback_used", False),
+            transcript_sent=bool(followup.get("whatsapp_sent") or followup.get("sms_sent")),
+            first_alert_ms=pipeline.first_alert_ms,
+            message=f"S.O.S iletildi: {whatsapp_sent} WhatsApp, {sms_sent} SMS.",
         )
 
     except HTTPException:
@@ -522,13 +502,6 @@ async def sos_audio_sync(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"S.O.S işlenirken hata oluştu: {exc}",
         )
-    finally:
-        # Geçici dosyayı temizle
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except Exception:
-                pass
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -554,8 +527,6 @@ async def i_am_safe_sos(
     - Twilio Şelale (WhatsApp → SMS) ile sabit mesaj gönderilir.
     - Mesaj: "Kullanıcı güvende olduğunu bildirdi. Merak etmeyin."
     """
-    import asyncio
-
     # Acil kişileri al
     try:
         contacts_result = await db.execute(
@@ -581,16 +552,12 @@ async def i_am_safe_sos(
             f"Kullanıcı güvende olduğunu bildirdi. Merak etmeyin. ❤️"
         )
 
-        loop = asyncio.get_running_loop()
-        wf_result = await loop.run_in_executor(
-            None,
-            lambda: send_waterfall_emergency(
-                phone_numbers=phone_numbers,
-                message=safe_message,
-                channel="waterfall",
-                user_id=current_user.id,
-                event_type="I_AM_SAFE",
-            ),
+        wf_result = await send_waterfall_emergency_async(
+            phone_numbers=phone_numbers,
+            message=safe_message,
+            channel="waterfall",
+            user_id=current_user.id,
+            event_type="I_AM_SAFE",
         )
 
         logger.info(
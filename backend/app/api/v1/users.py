@@ -22,6 +22,7 @@ from app.schemas.user import (
 )
 from app.schemas.emergency_contact import EmergencyContactIn, EmergencyContactOut
 from app.schemas.notification_pref import NotificationPrefIn, NotificationPrefOut
+from app.services.push_audience import refresh_user_audience
 from app.services.auth import hash_password, verify_password, create_access_token, decode_token, verify_firebase_token
 from app.core.rate_limit import limiter
 
@@ -179,6 +180,7 @@ async def update_me_technical(
 
     await db.commit()
     await db.refresh(current_user)
+    await refresh_user_audience(db, current_user.id)
     return UserOut.model_validate(current_user)
 
 
@@ -208,6 +210,7 @@ async def delete_account(
     # If not, manual delete might be needed. Using SQLAlchemy cascade="all, delete-orphan" in models.
     await db.delete(current_user)
     await db.commit()
+    await refresh_user_audience(db, current_user.id)
     logger.info("Hesap silindi: id=%d", current_user.id)
 
 
@@ -369,6 +372,7 @@ async def update_preferences(
 
     await db.commit()
     await db.refresh(pref)
+    await refresh_user_audience(db, current_user.id)
     logger.info("Bildirim tercihi güncellendi: user_id=%d", current_user.id)
     return NotificationPrefOut.model_validate(pref)
 
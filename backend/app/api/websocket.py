@@ -1,17 +1,25 @@
 """
 WebSocket bağlantı yöneticisi.
 Gerçek zamanlı deprem bildirimleri için. Yeni deprem geldiğinde tüm bağlı istemcilere anlık gönderir.
+Celery worker'larından gelen olaylar Redis WS bus'ı (settings.WS_BUS_CHANNEL)
+üzerinden her API sürecine ulaşır; relay_ws_bus lifespan'da başlatılır.
 """
 
+import asyncio
 import json
 import logging
 from typing import Dict
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 websocket_router = APIRouter()
 
+# Redis bağlantısı koptuğunda yeniden abonelik beklemesi (sn)
+_WS_BUS_RETRY_SECONDS = 2.0
+
 
 class ConnectionManager:
     """Tüm WebSocket bağlantılarını yönetir."""
@@ -52,6 +60,40 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+async def relay_ws_bus() -> None:
+    """
+    WS bus'ına abone olur, gelen olayları bu süreçteki bağlantılara yayınlar.
+    Pub/sub kalıcı değildir: API kapalıyken yayınlanan olay kaçırılır, istemci
+    yeniden bağlanınca listeyi REST'ten tazeler.
+    """
+    from app.core.redis import get_redis
+
+    while True:
+        pubsub = None
+        try:
+            pubsub = (await get_redis()).pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(settings.WS_BUS_CHANNEL)
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    await manager.broadcast(json.loads(message["data"]))
+                except ValueError:
+                    logger.warning("WS bus'ında bozuk mesaj atlandı")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("WS bus bağlantı hatası, yeniden denenecek: %s", e)
+            await asyncio.sleep(_WS_BUS_RETRY_SECONDS)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+
+
 @websocket_router.websocket("/ws/earthquakes")
 async def websocket_endpoint(websocket: WebSocket, client_id: str | None = None) -> None:
     await manager.connect(websocket, client_id)
@@ -50,6 +50,16 @@ class Settings(BaseSettings):
     FIREBASE_PRIVATE_KEY: str = ""
     FIREBASE_CLIENT_EMAIL: str = ""
     FIREBASE_CREDENTIALS_PATH: str = "firebase-service-account.json"
+    # 500'lük send_each parçalarını eşzamanlı gönderen thread sayısı
+    FCM_FANOUT_WORKERS: int = 8
+    # Geçersiz token temizliğinde tek UPDATE'e giren token sayısı
+    FCM_PRUNE_BATCH_SIZE: int = 1000
+
+    # "local": gerçek FCM yerine yerel stand-in (app.services.local_transports) — yük testi
+    FCM_TRANSPORT: str = "firebase"
+
+    # Operasyonel metrik sayaçlarının (app.services.metrics) saklanma süresi
+    METRICS_RETENTION_HOURS: int = 168
 
     # ── Shake / deprem algılama sabitleri (EARTHQUAKE_DETECTION_ALGORITHM.md) ──
     SHAKE_WINDOW_SECONDS: int = 5
@@ -58,11 +68,112 @@ class Settings(BaseSettings):
     SHAKE_CLUSTER_RADIUS_KM: float = 10.0
     SHAKE_GEOHASH_PRECISION: int = 5
     SHAKE_RATE_LIMIT_PER_DEVICE_SECONDS: int = 30
+    # Varış zamanı farklarından konumlama (app.utils.epicenter)
+    SHAKE_LOCATION_PICK_SIGMA_SECONDS: float = 0.5
+    SHAKE_LOCATION_MAX_RMS_SECONDS: float = 2.0
+
+    # ── Shake Redis (broker'dan ayrı, Redis Cluster uyumlu) ──
+    # Boşsa REDIS_URL kullanılır; yine de ayrı bir connection pool açılır.
+    SHAKE_REDIS_URL: str = ""
+    SHAKE_REDIS_CLUSTER: bool = False
+    SHAKE_REDIS_MAX_CONNECTIONS: int = 200
+    # Hash tag olarak kullanılan GeoHash öneki uzunluğu — aynı öneke sahip
+    # hücrelerin anahtarları Redis Cluster'da aynı slot'a düşer.
+    SHAKE_REDIS_HASH_TAG_PRECISION: int = 3
+
+    # ── Sismik rapor kalıcılığı (Redis bekleme listesi → toplu DB insert) ──
+    SEISMIC_PERSIST_INTERVAL_SECONDS: int = 2
+    SEISMIC_PERSIST_BATCH_SIZE: int = 500
+    # GET /seismic/clusters/stream — Redis özetinin okunma aralığı (delta üretimi)
+    SEISMIC_STREAM_INTERVAL_SECONDS: float = 1.0
+
+    # ── Sunucu tarafı dalga formu analizi (POST /seismic/waveforms) ──
+    # 10 sn'lik pencerede oran hesaplanabilmesi için LTA mobildeki 10 sn'den kısa
+    SEISMIC_WAVEFORM_STA_SECONDS: float = 0.5
+    SEISMIC_WAVEFORM_LTA_SECONDS: float = 5.0
+    SEISMIC_WAVEFORM_TRIGGER_RATIO: float = 5.0
+    SEISMIC_WAVEFORM_MAX_WINDOWS: int = 500
+    # Olay sonrası analiz için int16 segment arşivi (API ve worker aynı volume'u görmeli)
+    SEISMIC_WAVEFORM_ARCHIVE_ENABLED: bool = False
+    SEISMIC_WAVEFORM_ARCHIVE_PATH: str = "/app/waveform_archive"
+    SEISMIC_WAVEFORM_ARCHIVE_RETENTION_HOURS: int = 72
+
+    # ── Etki bazlı hedefleme (app.services.intensity_grid) ──
+    # Ulusal ızgara sınırları ve çözünürlüğü (0.05° ≈ 5 km → ~55k hücre)
+    INTENSITY_GRID_LAT_MIN: float = 35.5
+    INTENSITY_GRID_LAT_MAX: float = 42.5
+    INTENSITY_GRID_LON_MIN: float = 25.5
+    INTENSITY_GRID_LON_MAX: float = 45.0
+    INTENSITY_GRID_STEP_DEG: float = 0.05
+    # Push için beklenen en düşük MMI (III: kapalı alanda bazı kişilerce hissedilir)
+    INTENSITY_ALERT_MIN_MMI: float = 3.0
+    INTENSITY_RASTER_CACHE_SIZE: int = 32
+
+    # ── Push kitle segmentleri (app.services.push_audience) ──
+    # Hücre GeoHash hassasiyeti (4 ≈ 39 × 20 km) ve min_magnitude kademe adımı
+    PUSH_AUDIENCE_GEOHASH_PRECISION: int = 4
+    PUSH_AUDIENCE_TIER_STEP: float = 0.5
+    # Artımlı bakımın kaçırdığı değişiklikleri onaran tam yeniden kurulum
+    PUSH_AUDIENCE_REBUILD_INTERVAL_SECONDS: int = 86400
+    PUSH_AUDIENCE_REBUILD_BATCH_SIZE: int = 1000
+
+    # ── Alarm hattı: EARTHQUAKE_CONFIRMED ve M≥4 push'ları ayrı kuyruk/worker'da ──
+    # Worker: celery worker -Q alarms --prefetch-multiplier=1 -O fair (diğerleri -X alarms)
+    ALARM_QUEUE: str = "alarms"
+    ALARM_MIN_MAGNITUDE: float = 4.0
+    # SLO: algılamadan ilk token gönderimine (to_first_token) kadar süre
+    ALARM_LATENCY_SLO_MS: int = 5000
+
+    # ── Artçı fırtınasında push birleştirme (app.services.push_coalescing) ──
+    # Kullanıcı başına pencere: ilk deprem hemen, pencere içindekiler tek özet push
+    COALESCE_WINDOW_SECONDS: int = 600
+    # Bu büyüklük ve üstü birleştirilmez, herkese hemen gider (yeni pencere açar)
+    COALESCE_BYPASS_MAGNITUDE: float = 5.0
+    # Son pencerede bu yarıçapta alarm verilmişse M<bypass için yeni nükleer alarm yok
+    COALESCE_ALARM_RADIUS_KM: float = 50.0
+    COALESCE_FLUSH_INTERVAL_SECONDS: int = 30
+    # Tek pipeline'a giren token sayısı (admit/flush)
+    COALESCE_PIPELINE_CHUNK: int = 5000
+
+    # ── Bildirim outbox'ı (app.services.outbox): ingest ↔ teslimat ayrımı ──
+    # Beat yedek boşaltma aralığı; ingest commit'ten sonra boşaltmayı hemen tetikler
+    OUTBOX_DRAIN_INTERVAL_SECONDS: int = 5
+    OUTBOX_BATCH_SIZE: int = 100
+    # Alınan satırın kiralama süresi: worker ölürse satır bu süre sonunda yeniden teslim edilir
+    OUTBOX_LEASE_SECONDS: int = 120
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BASE_SECONDS: int = 5
+    OUTBOX_RETRY_MAX_SECONDS: int = 600
+    # Teslim edilen anahtarların Redis'te tutulma süresi (tekrar teslimatı tekilleştirir)
+    OUTBOX_DEDUPE_TTL_SECONDS: int = 86400
+    OUTBOX_RETENTION_HOURS: int = 72
+    # API süreçlerinin dinlediği WebSocket yayın kanalı (Redis pub/sub)
+    WS_BUS_CHANNEL: str = "ws:earthquakes"
 
     # ── Twilio (SMS/WhatsApp for Emergency Contacts) ──
     TWILIO_ACCOUNT_SID: str = ""
     TWILIO_AUTH_TOKEN: str = ""
     TWILIO_PHONE_NUMBER: str = ""
+    # Eşzamanlı şelale (numara) sayısı ve havuzdaki HTTP bağlantısı üst sınırı
+    TWILIO_MAX_CONCURRENCY: int = 16
+    TWILIO_HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    # "local": gerçek Twilio yerine yerel stand-in (app.services.local_transports) — yük testi
+    TWILIO_TRANSPORT: str = "twilio"
+
+    # ── Yerel FCM/Twilio stand-in profilleri (FCM_TRANSPORT / TWILIO_TRANSPORT = local) ──
+    # İstek başına gecikme + rastgele ek gecikme, geçici hata oranı, kalıcı geçersiz
+    # alıcı oranı (token/numara özetinden, deterministik) ve saniyelik kota (0 = sınırsız)
+    LOCAL_FCM_LATENCY_MS: float = 80.0
+    LOCAL_FCM_JITTER_MS: float = 40.0
+    LOCAL_FCM_ERROR_RATE: float = 0.0
+    LOCAL_FCM_INVALID_RATE: float = 0.0
+    LOCAL_FCM_RATE_PER_SECOND: float = 0.0
+    LOCAL_TWILIO_LATENCY_MS: float = 250.0
+    LOCAL_TWILIO_JITTER_MS: float = 100.0
+    LOCAL_TWILIO_ERROR_RATE: float = 0.0
+    LOCAL_TWILIO_INVALID_RATE: float = 0.0
+    LOCAL_TWILIO_RATE_PER_SECOND: float = 0.0
 
     # ── OpenAI (Whisper for S.O.S Voice) — DEPRECATED: Groq kullanılıyor ──
     OPENAI_API_KEY: str = ""
@@ -77,11 +188,25 @@ class Settings(BaseSettings):
     # ── Anthropic Claude (NLP for S.O.S Voice) ──
     ANTHROPIC_API_KEY: str = ""
     ANTHROPIC_MODEL: str = "claude-3-haiku-20240307"
+    # Kural tabanlı çıkarıcı (app.services.sos_rules) bu güvenin altında LLM'e düşer
+    SOS_RULES_MIN_CONFIDENCE: float = 0.8
+    # Çıkarım sonuçları normalize transkript özetiyle önbelleklenir (sn)
+    SOS_EXTRACT_CACHE_TTL_SECONDS: int = 86400
+
+    # ── Groq/Anthropic client havuzu (app.services.ai_clients) ──
+    # Sağlayıcı başına süreç içi eşzamanlı çağrı sınırı; slot bu sürede boşalmazsa hata
+    AI_MAX_CONCURRENCY: int = 8
+    AI_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    AI_MAX_RETRIES: int = 1
 
     # ── S.O.S Audio Storage ──
     SOS_AUDIO_STORAGE_PATH: str = "/app/sos_audio"
     SOS_AUDIO_BASE_URL: str = ""
+    # Yükleme üst sınırı (bayt); aşılırsa 413 — dosya belleğe alınmadan akışta kesilir
+    SOS_AUDIO_MAX_BYTES: int = 10 * 1024 * 1024
     SOS_RATE_LIMIT_PER_HOUR: int = 10
+    # SLO: /sos/audio isteğinden konumlu ilk uyarının gönderimine kadar süre
+    SOS_FIRST_ALERT_SLO_MS: int = 5000
 
 
 @lru_cache
@@ -1,13 +1,17 @@
 """
-Redis bağlantı yönetimi. Shake clustering ve cache için kullanılır.
+Redis bağlantı yönetimi. Cache, rate limit ve shake clustering için kullanılır.
+Shake algılama yolu Celery broker'ından izole, ayrı bir connection pool
+(isteğe bağlı ayrı instance veya Redis Cluster) üzerinden çalışır.
 Timeout ve hata yönetimi production-ready.
 """
 
 import logging
-from typing import Optional
+from typing import Optional, Union
 
+import redis as syncredis
 import redis.asyncio as aioredis
 from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
 from redis.exceptions import TimeoutError as RedisTimeoutError, RedisError
 
 from app.config import settings
@@ -15,6 +19,8 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 _redis: Optional[Redis] = None
+_shake_redis: Optional[Union[Redis, RedisCluster]] = None
+_redis_sync: Optional[syncredis.Redis] = None
 
 
 async def get_redis() -> Redis:
@@ -37,9 +43,72 @@ async def get_redis() -> Redis:
     return _redis
 
 
+async def get_shake_redis() -> Union[Redis, RedisCluster]:
+    """
+    Shake clustering için ayrılmış Redis istemcisini döndürür.
+    SHAKE_REDIS_URL boşsa REDIS_URL'e bağlanır ama kendi pool'unu kullanır;
+    SHAKE_REDIS_CLUSTER=True ise RedisCluster istemcisi oluşturulur.
+    """
+    global _shake_redis
+    if _shake_redis is None:
+        url = settings.SHAKE_REDIS_URL or settings.REDIS_URL
+        options = dict(
+            encoding="utf-8",
+            decode_responses=True,
+            socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS,
+            max_connections=settings.SHAKE_REDIS_MAX_CONNECTIONS,
+        )
+        try:
+            if settings.SHAKE_REDIS_CLUSTER:
+                client: Union[Redis, RedisCluster] = RedisCluster.from_url(url, **options)
+            else:
+                client = aioredis.from_url(url, **options)
+            await client.ping()
+            _shake_redis = client
+            logger.info("Shake Redis bağlantısı kuruldu (cluster=%s).", settings.SHAKE_REDIS_CLUSTER)
+        except (RedisTimeoutError, RedisError, OSError) as e:
+            logger.error("Shake Redis bağlantı hatası: %s", e)
+            raise
+    return _shake_redis
+
+
+def get_shake_redis_sync() -> Union[syncredis.Redis, syncredis.RedisCluster]:
+    """
+    Shake/sismik Redis'e senkron istemci (Celery worker'ları için).
+    Her çağrıda yeni istemci döner; 'with' ile kullanılıp kapatılmalı.
+    """
+    url = settings.SHAKE_REDIS_URL or settings.REDIS_URL
+    options = dict(
+        decode_responses=True,
+        socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS,
+    )
+    if settings.SHAKE_REDIS_CLUSTER:
+        return syncredis.RedisCluster.from_url(url, **options)
+    return syncredis.Redis.from_url(url, **options)
+
+
+def get_redis_sync() -> syncredis.Redis:
+    """
+    REDIS_URL'e süreç başına tek senkron istemci (thread-safe pool).
+    Olay döngüsünden bağımsız çalışan kod (thread havuzu, Celery) için; metrik
+    sayaçları gibi kısa komutlarda kullanılır.
+    """
+    global _redis_sync
+    if _redis_sync is None:
+        _redis_sync = syncredis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS,
+        )
+    return _redis_sync
+
+
 async def close_redis() -> None:
-    """Redis bağlantısını kapatır. Uygulama kapanışında çağrılır."""
-    global _redis
+    """Redis bağlantılarını kapatır. Uygulama kapanışında çağrılır."""
+    global _redis, _shake_redis
     if _redis is not None:
         try:
             await _redis.aclose()
@@ -47,3 +116,10 @@ async def close_redis() -> None:
             logger.warning("Redis kapatma uyarısı: %s", e)
         _redis = None
         logger.info("Redis bağlantısı kapatıldı.")
+    if _shake_redis is not None:
+        try:
+            await _shake_redis.aclose()
+        except Exception as e:
+            logger.warning("Shake Redis kapatma uyarısı: %s", e)
+        _shake_redis = None
+        logger.info("Shake Redis bağlantısı kapatıldı.")
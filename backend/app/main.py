@@ -5,8 +5,9 @@ Tüm router'ları, middleware ve lifespan yönetir.
 Çalıştırma: uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
 """
 
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import Optional
 
 from fastapi import FastAPI, Request
@@ -20,9 +21,11 @@ from slowapi.errors import RateLimitExceeded
 
 from app.config import settings
 from app.core.redis import get_redis, close_redis
+from app.services.ai_clients import warm_ai_clients
+from app.services.twilio_async import close_async_twilio
 from app.core.rate_limit import limiter
 from app.api.v1 import earthquakes, users, notifications, analytics, risk, seismic, admin, sos, subscription
-from app.api.websocket import websocket_router
+from app.api.websocket import relay_ws_bus, websocket_router
 from app.tasks.fetch_earthquakes import start_periodic_fetch
 
 logger = logging.getLogger(__name__)
@@ -38,8 +41,15 @@ async def lifespan(app: FastAPI):
     """Uygulama başlangıç ve kapanış."""
     logger.info("Deprem App başlatılıyor...")
     await start_periodic_fetch()
+    ws_bus = asyncio.create_task(relay_ws_bus())
+    # Groq/Anthropic TLS bağlantılarını arka planda aç (başlangıcı bekletmez)
+    asyncio.get_running_loop().run_in_executor(None, warm_ai_clients)
     logger.info("Uygulama hazır.")
     yield
+    ws_bus.cancel()
+    with suppress(asyncio.CancelledError):
+        await ws_bus
+    await close_async_twilio()
     await close_redis()
     logger.info("Uygulama kapatıldı.")
 
@@ -8,3 +8,4 @@ from app.models.seismic_report import SeismicReport  # noqa: F401
 from app.models.sos_record import SOSRecord  # noqa: F401
 from app.models.gathering_point import GatheringPoint  # noqa: F401
 from app.models.user_report import UserReport  # noqa: F401
+from app.models.notification_outbox import NotificationOutbox  # noqa: F401
@@ -0,0 +1,51 @@
+"""
+Bildirim outbox modeli (transactional outbox).
+Deprem ingest'i olay satırlarını deprem kaydıyla aynı transaction'da yazar;
+teslimat worker'ları (app.tasks.outbox) kanal başına bağımsız boşaltır.
+rules.md: type hints zorunlu, docstring yazılmalı.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, JSON, String, Text, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class NotificationOutbox(Base):
+    """
+    Tek kanala (push, ws) teslim edilecek tek olay.
+    idempotency_key (<kanal>:<olay>:<kimlik>) aynı olayın aynı kanala iki kez
+    yazılmasını engeller; teslimat en az bir kez, tüketici bu anahtarla tekilleştirir.
+    """
+
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Boşaltma sorgusu: teslim edilmemiş satırlar, kanal + uygunluk zamanına göre
+        Index(
+            "ix_notification_outbox_pending",
+            "channel", "available_at",
+            postgresql_where=text("delivered_at IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    channel: Mapped[str] = mapped_column(String(16), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    idempotency_key: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Kiralama (lease) ve geri çekilme: satır bu zamandan önce tekrar alınmaz
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<NotificationOutbox id={self.id} key={self.idempotency_key!r} attempts={self.attempts}>"
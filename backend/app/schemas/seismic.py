@@ -4,6 +4,8 @@ rules.md: type hints zorunlu, `any` kullanma.
 """
 
 from datetime import datetime
+from typing import List
+
 from pydantic import BaseModel, Field
 
 
@@ -15,12 +17,13 @@ class SeismicReportIn(BaseModel):
     sta_lta_ratio: float = Field(..., gt=0, description="STA/LTA tetikleme oranı")
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
+    triggered_at: datetime | None = Field(None, description="Cihazın STA/LTA tetik zamanı (P varışı)")
 
 
 class SeismicReportOut(BaseModel):
     """Rapor kabul yanıtı."""
 
-    id: int
+    id: int | None = Field(None, description="DB kaydı asenkron oluşturulduğu için None")
     device_id: str
     cluster_id: int | None
     cluster_size: int
@@ -35,8 +38,43 @@ class SeismicClusterOut(BaseModel):
 
     cluster_id: int
     report_count: int
+    device_count: int = Field(..., description="Cluster'daki benzersiz cihaz sayısı")
     center_latitude: float
     center_longitude: float
     max_acceleration: float
     is_likely_earthquake: bool
     first_report_at: datetime
+
+
+class WaveformWindowIn(BaseModel):
+    """Tek cihazın sıkıştırılmış 3 eksen ivme penceresi."""
+
+    device_id: str = Field(..., min_length=4, max_length=128, description="Benzersiz cihaz ID")
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    scale: float = Field(0.001, gt=0, description="int16 sayım başına ivme (m/s²)")
+    start_at: datetime | None = Field(None, description="İlk örneğin zamanı; yoksa pencere şimdi biter")
+    data: str = Field(
+        ..., min_length=8, max_length=200_000,
+        description="base64(zlib(int16 little-endian, x/y/z sıralı örnekler))",
+    )
+
+
+class WaveformBatchIn(BaseModel):
+    """Aynı örnekleme hızındaki pencere grubu (bir veya çok cihaz)."""
+
+    sample_rate_hz: float = Field(100.0, ge=10, le=200)
+    windows: List[WaveformWindowIn] = Field(..., min_length=1)
+
+
+class WaveformVerdictOut(BaseModel):
+    """Pencere başına sunucu tarafı analiz sonucu."""
+
+    device_id: str
+    accepted: bool = Field(..., description="Veri çözülebildi mi")
+    triggered: bool
+    sta_lta_ratio: float
+    peak_acceleration: float
+    cluster_id: int | None = None
+    cluster_size: int = 0
+    is_likely_earthquake: bool = False
@@ -69,6 +69,8 @@ class SOSAudioResponse(BaseModel):
     whatsapp_sent: int = 0
     sms_sent: int = 0
     fallback_used: bool = False
+    transcript_sent: bool = False          # Metinli takip mesajı en az bir kişiye ulaştı
+    first_alert_ms: Optional[float] = None  # İstekten konumlu ilk uyarının gönderimine
     message: str = ""
 
 
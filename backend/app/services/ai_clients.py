@@ -0,0 +1,130 @@
+"""
+Konuşma (Groq Whisper) ve LLM (Anthropic) sağlayıcıları için süreç başına
+paylaşılan client'lar.
+
+Her sağlayıcının client'ı süreçte bir kez kurulur; SDK'ların içindeki httpx
+havuzu sayesinde TLS bağlantıları çağrılar arasında açık kalır (her S.O.S'ta
+yeni client + el sıkışma yok). API süreçleri ve Celery worker'ları aynı kodu
+kullanır; worker açılışında ve uygulama başlangıcında warm_ai_clients ile
+bağlantı önceden kurulur.
+
+provider_call: sağlayıcı başına eşzamanlılık sınırı (AI_MAX_CONCURRENCY; slot
+AI_QUEUE_TIMEOUT_SECONDS içinde boşalmazsa ProviderBusyError) ve çağrı süresinin
+aşama histogramına (ai_latency, app.services.metrics) yazılması. Zaman aşımı her
+çağrıda SDK'ya ayrıca verilir.
+rules.md: type hints, logging.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import settings
+from app.services.metrics import incr_counters, observe_latencies
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAME = "ai_latency"
+STAGES = ("transcribe", "extract")
+PROVIDERS = ("groq", "anthropic")
+
+
+class ProviderBusyError(Exception):
+    """Sağlayıcının eşzamanlılık sınırı dolu ve süre içinde boşalmadı."""
+    pass
+
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def _build(provider: str) -> Any:
+    if provider == "groq":
+        if not settings.GROQ_API_KEY:
+            raise ValueError("GROQ_API_KEY yapılandırılmamış")
+        from groq import Groq
+        return Groq(api_key=settings.GROQ_API_KEY, max_retries=settings.AI_MAX_RETRIES)
+    if provider == "anthropic":
+        if not settings.ANTHROPIC_API_KEY:
+            raise ValueError("ANTHROPIC_API_KEY yapılandırılmamış")
+        import anthropic
+        return anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY, max_retries=settings.AI_MAX_RETRIES)
+    raise ValueError(f"Bilinmeyen sağlayıcı: {provider}")
+
+
+def get_client(provider: str) -> Any:
+    """
+    Sağlayıcının süreç başına tek client'ını döndürür ("groq" | "anthropic").
+
+    Raises:
+        ValueError: API anahtarı yoksa veya sağlayıcı bilinmiyorsa.
+        ImportError: SDK yüklü değilse.
+    """
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = _build(provider)
+                logger.info("AI client kuruldu: %s", provider)
+    return client
+
+
+def _limit(provider: str) -> threading.BoundedSemaphore:
+    semaphore = _limits.get(provider)
+    if semaphore is None:
+        with _clients_lock:
+            semaphore = _limits.setdefault(provider, threading.BoundedSemaphore(settings.AI_MAX_CONCURRENCY))
+    return semaphore
+
+
+@contextmanager
+def provider_call(provider: str, stage: str) -> Iterator[Any]:
+    """
+    Sağlayıcı çağrısını sarar: eşzamanlılık slotu alır, client'ı verir ve
+    süreyi (başarılı/başarısız) `stage` histogramına yazar; hata ve slot
+    reddi `<stage>:errors` / `<stage>:rejected` sayaçlarına gider.
+
+        with provider_call("groq", "transcribe") as client:
+            client.audio.transcriptions.create(..., timeout=timeout)
+    """
+    semaphore = _limit(provider)
+    if not semaphore.acquire(timeout=settings.AI_QUEUE_TIMEOUT_SECONDS):
+        incr_counters(METRIC_NAME, **{f"{stage}:rejected": 1})
+        raise ProviderBusyError(f"{provider} eşzamanlılık sınırı dolu ({settings.AI_MAX_CONCURRENCY})")
+    t0 = time.perf_counter()
+    try:
+        yield get_client(provider)
+    except Exception:
+        incr_counters(METRIC_NAME, **{f"{stage}:errors": 1})
+        raise
+    finally:
+        semaphore.release()
+        observe_latencies(METRIC_NAME, **{stage: (time.perf_counter() - t0) * 1000.0})
+
+
+def warm_ai_clients(timeout: Optional[float] = 5.0) -> None:
+    """
+    Anahtarı tanımlı sağlayıcıların client'larını kurar ve ucuz bir uç noktaya
+    (models.list) istek atarak TLS bağlantısını havuzda açık bırakır.
+    Hatalar loglanır; ısıtma asıl işi engellemez.
+    """
+    keys = {"groq": settings.GROQ_API_KEY, "anthropic": settings.ANTHROPIC_API_KEY}
+    for provider in PROVIDERS:
+        if not keys[provider]:
+            continue
+        try:
+            get_client(provider).models.list(timeout=timeout)
+            logger.info("AI bağlantısı ısıtıldı: %s", provider)
+        except Exception as exc:
+            logger.warning("AI bağlantısı ısıtılamadı (%s): %s", provider, exc)
+
+
+def reset_ai_clients() -> None:
+    """Client'ları ve sınırları bir sonraki kullanımda yeniden kurar (ayar değişikliği, test)."""
+    with _clients_lock:
+        _clients.clear()
+        _limits.clear()
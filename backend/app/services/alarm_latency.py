@@ -0,0 +1,70 @@
+"""
+Alarm yolu gecikme zaman çizelgesi (SLO takibi).
+
+Aşama zaman damgaları (epoch sn):
+  algılandı → kuyruğa alındı → alarm worker'ı başladı → ilk token gönderildi → son token gönderildi
+
+Ardışık farklar ve uçtan uca süreler app.services.metrics histogramlarına
+(alarm_latency:<kaynak>) yazılır; admin /metrics/alarms okur. Kaynak: "shake"
+(cihaz kümesi doğrulaması) veya "catalog" (AFAD/Kandilli vb. katalog).
+rules.md: type hints, logging.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.services.metrics import observe_latencies
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "alarm_latency"
+STAGES = ("enqueue", "queue_wait", "first_token", "fanout", "to_first_token", "to_last_token")
+
+
+def metric_name(source: str) -> str:
+    return f"{METRIC_PREFIX}:{source}"
+
+
+def _span_ms(start: Optional[float], end: Optional[float]) -> Optional[float]:
+    return None if start is None or end is None else (end - start) * 1000.0
+
+
+@dataclass
+class AlarmTimeline:
+    """Tek alarmın aşama zaman damgaları."""
+
+    source: str
+    detected_ts: float
+    enqueued_ts: Optional[float] = None
+    started_ts: Optional[float] = None
+    first_sent_ts: Optional[float] = None
+    last_sent_ts: Optional[float] = None
+
+    def mark_sent(self, first_ts: Optional[float], last_ts: Optional[float]) -> None:
+        """Bir gönderim dalgasının ilk/son başarılı parça zamanlarını birleştirir."""
+        if first_ts is not None:
+            self.first_sent_ts = first_ts if self.first_sent_ts is None else min(self.first_sent_ts, first_ts)
+        if last_ts is not None:
+            self.last_sent_ts = last_ts if self.last_sent_ts is None else max(self.last_sent_ts, last_ts)
+
+    def stages_ms(self) -> Dict[str, Optional[float]]:
+        """Aşama süreleri (ms); eksik damgalı aşama None."""
+        return {
+            "enqueue": _span_ms(self.detected_ts, self.enqueued_ts),
+            "queue_wait": _span_ms(self.enqueued_ts, self.started_ts),
+            "first_token": _span_ms(self.started_ts, self.first_sent_ts),
+            "fanout": _span_ms(self.first_sent_ts, self.last_sent_ts),
+            "to_first_token": _span_ms(self.detected_ts, self.first_sent_ts),
+            "to_last_token": _span_ms(self.detected_ts, self.last_sent_ts),
+        }
+
+    def record(self) -> None:
+        """Histogramlara yazar ve tek satır özet loglar."""
+        stages = self.stages_ms()
+        observe_latencies(metric_name(self.source), **stages)
+        logger.info(
+            "[AlarmSLO %s] %s",
+            self.source,
+            " ".join(f"{k}={v:.0f}ms" for k, v in stages.items() if v is not None) or "gönderim yok",
+        )
@@ -1,24 +1,62 @@
 """
 S.O.S ses dosyalarını saklama ve erişim servisi.
 Dosyalar organize directory structure'da saklanır.
+
+Yüklemeler (stream_upload) parça parça doğrudan nihai gün dizinindeki geçici
+dosyaya yazılır, yazarken SHA-256 hesaplanır ve boyut SOS_AUDIO_MAX_BYTES ile
+sınırlanır; tamamlanınca os.replace ile atomik olarak nihai adına taşınır.
+Dosya hiçbir aşamada belleğe tamamen alınmaz ve kopyalanmaz. save_audio
+(Celery yolu) kopya yerine hardlink kullanır; dosya zaten depodaysa dokunmaz.
 """
 
+import errno
+import hashlib
 import logging
+import os
 import shutil
+import uuid
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Protocol
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+_CHUNK_BYTES = 64 * 1024
+
+
 class AudioStorageError(Exception):
     """Audio storage hatası."""
     pass
 
 
+class AudioTooLargeError(AudioStorageError):
+    """Yükleme SOS_AUDIO_MAX_BYTES sınırını aştı."""
+    pass
+
+
+class AudioEmptyError(AudioStorageError):
+    """Yüklenen dosya boş."""
+    pass
+
+
+class _AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+@dataclass(frozen=True)
+class StoredAudio:
+    """Depoya yazılmış ses dosyası."""
+    path: Path
+    audio_url: str
+    audio_filename: str
+    size: int
+    sha256: str
+
+
 class AudioStorage:
     """S.O.S audio file storage manager."""
 
@@ -33,6 +71,78 @@ class AudioStorage:
         except Exception as exc:
             logger.error("Audio storage base path oluşturulamadı: %s", exc)
 
+    def _day_dir(self, dt: datetime, create: bool = True) -> Path:
+        # Directory structure: /sos_audio/2024/01/15/
+        dir_path = self.base_path / str(dt.year) / f"{dt.month:02d}" / f"{dt.day:02d}"
+        if create:
+            dir_path.mkdir(parents=True, exist_ok=True)
+        return dir_path
+
+    def _url(self, dt: datetime, filename: str) -> str:
+        return f"{self.base_url}/{dt.year}/{dt.month:02d}/{dt.day:02d}/{filename}"
+
+    async def stream_upload(
+        self,
+        upload: _AsyncReadable,
+        user_id: int,
+        timestamp: str,
+        ext: str,
+    ) -> StoredAudio:
+        """
+        Yüklenen dosyayı parça parça nihai gün dizinine yazar (bellekte tamponlamaz).
+
+        Args:
+            upload: read(size) destekleyen async kaynak (FastAPI UploadFile)
+            user_id: Kullanıcı ID
+            timestamp: ISO 8601 format timestamp
+            ext: Dosya uzantısı (".m4a")
+
+        Returns:
+            StoredAudio (yol, URL, dosya adı, boyut, SHA-256)
+
+        Raises:
+            AudioTooLargeError: Boyut SOS_AUDIO_MAX_BYTES'ı aşarsa (kısmi dosya silinir)
+            AudioEmptyError: Dosya boşsa
+            AudioStorageError: Dosya yazılamazsa
+        """
+        limit = settings.SOS_AUDIO_MAX_BYTES
+        digest = hashlib.sha256()
+        size = 0
+        part: Optional[Path] = None
+        try:
+            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            dir_path = self._day_dir(dt)
+            # Aynı dizinde geçici dosya → os.replace aynı dosya sisteminde atomik
+            part = dir_path / f".upload-{uuid.uuid4().hex}.part"
+            with open(part, "wb") as fh:
+                while chunk := await upload.read(_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > limit:
+                        raise AudioTooLargeError(f"Ses dosyası {limit} bayt sınırını aşıyor")
+                    digest.update(chunk)
+                    fh.write(chunk)
+            if size == 0:
+                raise AudioEmptyError("Ses dosyası boş")
+
+            sha256 = digest.hexdigest()
+            # Aynı saniyedeki iki kayıt birbirini ezmesin: içerik özetinin ilk 8 hanesi
+            filename = f"sos_user{user_id}_{dt.strftime('%Y%m%d_%H%M%S')}_{sha256[:8]}{ext}"
+            dest_path = dir_path / filename
+            os.replace(part, dest_path)
+            part = None
+
+            logger.info("Audio stored: %s (%d bytes, sha256=%s)", dest_path, size, sha256[:12])
+            return StoredAudio(dest_path, self._url(dt, filename), filename, size, sha256)
+
+        except AudioStorageError:
+            raise
+        except Exception as exc:
+            logger.error("Audio stream hatası: %s", exc)
+            raise AudioStorageError(f"Failed to store audio: {exc}")
+        finally:
+            if part is not None:
+                part.unlink(missing_ok=True)
+
     def save_audio(
         self,
         audio_path: str,
@@ -43,7 +153,7 @@ class AudioStorage:
         Ses dosyasını organize directory structure'da saklar.
 
         Args:
-            audio_path: Geçici ses dosyası yolu
+            audio_path: Geçici ses dosyası yolu (veya stream_upload ile yazılmış dosya)
             user_id: Kullanıcı ID
             timestamp: ISO 8601 format timestamp
 
@@ -56,25 +166,29 @@ class AudioStorage:
         try:
             # Parse timestamp
             dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            source = Path(audio_path)
 
-            # Create directory structure: /sos_audio/2024/01/15/
-            dir_path = self.base_path / str(dt.year) / f"{dt.month:02d}" / f"{dt.day:02d}"
-            dir_path.mkdir(parents=True, exist_ok=True)
+            # stream_upload ile zaten depoya yazılmış dosya → yerinde kullan
+            if source.parent.resolve() == self._day_dir(dt, create=False).resolve():
+                return self._url(dt, source.name), source.name
+
+            dir_path = self._day_dir(dt)
 
             # Generate filename: sos_user123_20240115_143022.m4a
-            ext = Path(audio_path).suffix
-            filename = f"sos_user{user_id}_{dt.strftime('%Y%m%d_%H%M%S')}{ext}"
+            filename = f"sos_user{user_id}_{dt.strftime('%Y%m%d_%H%M%S')}{source.suffix}"
 
-            # Copy file to storage
+            # Kopya yerine hardlink (aynı dosya sistemi); değilse kopyala
             dest_path = dir_path / filename
-            shutil.copy(audio_path, dest_path)
-
-            # Generate URL
-            relative_path = f"{dt.year}/{dt.month:02d}/{dt.day:02d}/{filename}"
-            audio_url = f"{self.base_url}/{relative_path}"
+            dest_path.unlink(missing_ok=True)
+            try:
+                os.link(source, dest_path)
+            except OSError as exc:
+                if exc.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP):
+                    raise
+                shutil.copy(source, dest_path)
 
             logger.info("Audio saved: %s → %s", filename, dest_path)
-            return audio_url, filename
+            return self._url(dt, filename), filename
 
         except Exception as exc:
             logger.error("Audio save hatası: %s", exc)
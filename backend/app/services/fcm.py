@@ -4,11 +4,21 @@ Deprem uyarısı ve test bildirimleri için kullanılır.
 Firebase Admin SDK yapılandırması config'den okunur.
 """
 
+import asyncio
 import json
 import logging
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from app.config import settings
+from app.utils.seismology import DEFAULT_DEPTH_KM, s_wave_arrivals
+
+if TYPE_CHECKING:
+    from app.services.alarm_latency import AlarmTimeline
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +26,9 @@ logger = logging.getLogger(__name__)
 try:
     import firebase_admin
     from firebase_admin import credentials, messaging
+    from firebase_admin import exceptions as firebase_exceptions
+    # Token'ın kalıcı olarak geçersiz olduğunu bildiren hatalar
+    _DEAD_TOKEN_ERRORS: tuple = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
     _FIREBASE_AVAILABLE = True
 except ImportError:
     _FIREBASE_AVAILABLE = False
@@ -32,6 +45,8 @@ def _init_firebase() -> bool:
     """
     if not _FIREBASE_AVAILABLE:
         return False
+    if settings.FCM_TRANSPORT == "local":
+        return True  # Yerel stand-in: kimlik bilgisi gerekmez
     if firebase_admin._apps:
         return True  # Zaten başlatıldı
 
@@ -58,6 +73,225 @@ def _init_firebase() -> bool:
         return False
 
 
+def _transport() -> Any:
+    """
+    FCM gönderim arayüzü (send, send_each, send_each_for_multicast):
+    firebase_admin.messaging veya FCM_TRANSPORT=local ise yerel stand-in.
+    """
+    if settings.FCM_TRANSPORT == "local":
+        from app.services.local_transports import get_local_fcm
+        return get_local_fcm()
+    return messaging
+
+
+# ─── Toplu gönderim katmanı (olay döngüsü dışı, sınırlı eşzamanlılık) ─────────
+
+# FCM send_each / send_each_for_multicast istek başına üst sınır
+FCM_MAX_BATCH: int = 500
+
+
+@dataclass(frozen=True)
+class TokenResult:
+    """Toplu gönderimde tek token'ın sonucu."""
+
+    token: str
+    success: bool
+    error: Optional[str] = None
+    dead: bool = False           # Token kalıcı geçersiz → users.fcm_token temizlenmeli
+
+
+def _is_dead_token_error(exc: Optional[BaseException]) -> bool:
+    """
+    UNREGISTERED (uygulama silindi / token yenilendi) ve token kaynaklı
+    INVALID_ARGUMENT hataları kalıcıdır. Payload kaynaklı INVALID_ARGUMENT
+    (ör. boyut aşımı) token'ı geçersiz kılmaz; mesajında token geçmez.
+    """
+    if exc is None or not _FIREBASE_AVAILABLE:
+        return False
+    if isinstance(exc, _DEAD_TOKEN_ERRORS):
+        return True
+    return (
+        isinstance(exc, firebase_exceptions.InvalidArgumentError)
+        and "registration token" in str(exc).lower()
+    )
+
+
+@dataclass(frozen=True)
+class ChunkOutcome:
+    """Tek send_each / send_each_for_multicast çağrısının sonucu."""
+
+    success_count: int
+    results: List[TokenResult]   # Yanıttaki token sonuçları (istek düştüyse hepsi hatalı)
+    latency_ms: float
+    finished_ts: float = 0.0     # Yanıtın alındığı an (epoch sn) — alarm SLO damgaları
+
+
+def _sent_window(outcomes: Sequence[ChunkOutcome]) -> Tuple[Optional[float], Optional[float]]:
+    """Başarılı parçaların ilk ve son tamamlanma anı (hiç yoksa None, None)."""
+    done = [o.finished_ts for o in outcomes if o.success_count]
+    return (min(done), max(done)) if done else (None, None)
+
+
+@dataclass
+class DispatchReport:
+    """Parçalı gönderimin özeti."""
+
+    success_count: int = 0
+    failures: List[TokenResult] = field(default_factory=list)
+    chunk_latencies_ms: List[float] = field(default_factory=list)
+    outcomes: List[ChunkOutcome] = field(default_factory=list, repr=False)
+
+    def add(self, outcome: ChunkOutcome) -> None:
+        self.success_count += outcome.success_count
+        self.failures.extend(r for r in outcome.results if not r.success)
+        self.chunk_latencies_ms.append(outcome.latency_ms)
+        self.outcomes.append(outcome)
+
+    @property
+    def sent_window(self) -> Tuple[Optional[float], Optional[float]]:
+        """İlk ve son başarılı parçanın tamamlanma anı."""
+        return _sent_window(self.outcomes)
+
+    @property
+    def dead_tokens(self) -> List[str]:
+        return [r.token for r in self.failures if r.dead]
+
+    def log(self, label: str, total: int) -> None:
+        latencies = sorted(self.chunk_latencies_ms) or [0.0]
+        logger.info(
+            "[FCM %s] %d token, %d parça → %d başarılı / %d başarısız | "
+            "parça gecikmesi p50=%.0fms max=%.0fms",
+            label, total, len(self.chunk_latencies_ms), self.success_count, len(self.failures),
+            latencies[len(latencies) // 2], latencies[-1],
+        )
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _fcm_executor() -> ThreadPoolExecutor:
+    """Süreç başına tek FCM gönderim havuzu (settings.FCM_FANOUT_WORKERS thread)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.FCM_FANOUT_WORKERS, thread_name_prefix="fcm")
+    return _executor
+
+
+def _send_chunk(tokens: Sequence[str], send: Callable[[], Any]) -> ChunkOutcome:
+    """
+    Bir parçayı gönderir (thread içinde çalışır); istek tümden başarısızsa
+    parçadaki her token hatalı sayılır.
+    """
+    t0 = time.perf_counter()
+    try:
+        response = send()
+    except Exception as exc:
+        logger.error("FCM parça gönderimi başarısız (%d token): %s", len(tokens), exc)
+        return ChunkOutcome(0, [TokenResult(t, False, str(exc)) for t in tokens],
+                            (time.perf_counter() - t0) * 1000, time.time())
+    results = [
+        TokenResult(token, True) if res.success
+        else TokenResult(token, False, str(res.exception), _is_dead_token_error(res.exception))
+        for token, res in zip(tokens, response.responses)
+    ]
+    return ChunkOutcome(response.success_count, results, (time.perf_counter() - t0) * 1000, time.time())
+
+
+def _record_outcome(attempted: int, success: int, failures: Sequence[TokenResult]) -> None:
+    """
+    Gönderim sayaçlarını yazar ve kalıcı geçersiz token'ları tek toplu
+    temizlik işine (prune_fcm_tokens) verir. Thread havuzunda, gönderenin
+    dönüşünü bekletmeden çalışır.
+    """
+    from app.services.metrics import incr_counters
+    dead = [r.token for r in failures if r.dead]
+    incr_counters("fcm", attempted=attempted, success=success, failed=len(failures), dead=len(dead))
+    if not dead:
+        return
+    try:
+        from app.tasks.prune_fcm_tokens import prune_fcm_tokens
+        prune_fcm_tokens.delay(dead)
+        logger.info("FCM: %d geçersiz token temizliğe gönderildi", len(dead))
+    except Exception as exc:
+        logger.error("FCM token temizliği kuyruğa alınamadı: %s", exc)
+
+
+def _chunk_bounds(n: int) -> List[Tuple[int, int]]:
+    return [(i, min(i + FCM_MAX_BATCH, n)) for i in range(0, n, FCM_MAX_BATCH)]
+
+
+async def dispatch_chunks(
+    tokens: Sequence[str],
+    send_range: Callable[[int, int], Any],
+    label: str,
+    timeline: Optional["AlarmTimeline"] = None,
+) -> DispatchReport:
+    """
+    Token listesini FCM_MAX_BATCH'lik parçalara böler ve her parçayı olay
+    döngüsünü bloklamadan paylaşılan thread havuzunda gönderir. Aynı anda en
+    fazla FCM_FANOUT_WORKERS parça uçuştadır; mesajlar thread içinde, parça
+    gönderilirken oluşturulur (1M token'da bellek parça boyutuyla sınırlı).
+
+    Args:
+        tokens: Hedef token'lar.
+        send_range: (başlangıç, bitiş) → BatchResponse; thread içinde çağrılır.
+        label: Log etiketi.
+        timeline: Verilirse ilk/son başarılı parça anları işlenir (alarm SLO).
+    """
+    report = DispatchReport()
+    if not tokens:
+        return report
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(settings.FCM_FANOUT_WORKERS)
+
+    async def run(start: int, stop: int) -> None:
+        async with in_flight:
+            outcome = await loop.run_in_executor(
+                _fcm_executor(), _send_chunk, tokens[start:stop], lambda: send_range(start, stop),
+            )
+        report.add(outcome)
+
+    await asyncio.gather(*(run(start, stop) for start, stop in _chunk_bounds(len(tokens))))
+    report.log(label, len(tokens))
+    if timeline is not None:
+        timeline.mark_sent(*report.sent_window)
+    _fcm_executor().submit(_record_outcome, len(tokens), report.success_count, report.failures)
+    return report
+
+
+def send_each_batched(
+    tokens: Sequence[str],
+    messages: Sequence["messaging.Message"],
+    timeline: Optional["AlarmTimeline"] = None,
+) -> List[TokenResult]:
+    """
+    dispatch_chunks'ın senkron karşılığı (Celery task'ları için): token başına
+    hazırlanmış mesajları parçalar halinde paylaşılan havuzda eşzamanlı gönderir.
+
+    Args:
+        tokens: messages ile aynı sırada hedef token'lar (sonuç eşlemesi için).
+        messages: messaging.Message listesi.
+        timeline: Verilirse ilk/son başarılı parça anları işlenir (alarm SLO).
+
+    Returns:
+        Giriş sırasıyla token başına TokenResult; Firebase yoksa boş liste.
+    """
+    if not messages or not _init_firebase():
+        return []
+    outcomes = list(_fcm_executor().map(
+        lambda b: _send_chunk(tokens[b[0]:b[1]], lambda: _transport().send_each(list(messages[b[0]:b[1]]))),
+        _chunk_bounds(len(messages)),
+    ))
+    results = [result for outcome in outcomes for result in outcome.results]
+    if timeline is not None:
+        timeline.mark_sent(*_sent_window(outcomes))
+    _fcm_executor().submit(
+        _record_outcome, len(messages), sum(o.success_count for o in outcomes),
+        [r for r in results if not r.success],
+    )
+    return results
+
+
 async def send_earthquake_push(
     fcm_token: str,
     magnitude: float,
@@ -112,7 +346,9 @@ async def send_earthquake_push(
                 ),
             ),
         )
-        response = messaging.send(message)
+        response = await asyncio.get_running_loop().run_in_executor(
+            _fcm_executor(), _transport().send, message,
+        )
         logger.info("FCM bildirim gönderildi: %s → %s", fcm_token[:12], response)
         return True
     except Exception as exc:
@@ -126,9 +362,12 @@ async def send_earthquake_push_multicast(
     location: str,
     depth: float,
     occurred_at: str,
+    timeline: Optional["AlarmTimeline"] = None,
 ) -> int:
     """
     Birden fazla FCM token'a aynı anda deprem bildirimi gönderir (multicast).
+    Token listesi 500'lük parçalar halinde dispatch_chunks ile gönderilir;
+    timeline verilirse (M≥4 alarm hattı) ilk/son token damgaları işlenir.
 
     Returns:
         Başarıyla gönderilen bildirim sayısı.
@@ -139,36 +378,82 @@ async def send_earthquake_push_multicast(
         title = f"🔴 Deprem M{magnitude:.1f}"
         body = f"{location} — Derinlik: {depth:.0f} km"
 
-        message = messaging.MulticastMessage(
-            notification=messaging.Notification(title=title, body=body),
-            data={
-                "type": "NEW_EARTHQUAKE",
-                "magnitude": str(magnitude),
-                "location": location,
-                "depth": str(depth),
-                "occurred_at": occurred_at,
-            },
-            tokens=fcm_tokens[:500],  # FCM max 500 token/istek
-            android=messaging.AndroidConfig(
-                priority="high",
-                notification=messaging.AndroidNotification(
-                    channel_id="earthquake_alerts",
-                    priority="max",
-                ),
+        notification = messaging.Notification(title=title, body=body)
+        data = {
+            "type": "NEW_EARTHQUAKE",
+            "magnitude": str(magnitude),
+            "location": location,
+            "depth": str(depth),
+            "occurred_at": occurred_at,
+        }
+        android = messaging.AndroidConfig(
+            priority="high",
+            notification=messaging.AndroidNotification(
+                channel_id="earthquake_alerts",
+                priority="max",
             ),
         )
-        response = messaging.send_each_for_multicast(message)
-        logger.info(
-            "FCM multicast: %d başarılı / %d başarısız",
-            response.success_count,
-            response.failure_count,
+        report = await dispatch_chunks(
+            fcm_tokens,
+            lambda start, stop: _transport().send_each_for_multicast(messaging.MulticastMessage(
+                notification=notification, data=data, tokens=fcm_tokens[start:stop], android=android,
+            )),
+            "multicast",
+            timeline,
         )
-        return response.success_count
+        return report.success_count
     except Exception as exc:
         logger.error("FCM multicast hatası: %s", exc)
         return 0
 
 
+async def send_quake_summary_multicast(
+    fcm_tokens: list[str],
+    count: int,
+    max_magnitude: float,
+    location: str,
+    window_minutes: int,
+) -> int:
+    """
+    Birleştirilmiş depremlerin tek özet push'u (app.services.push_coalescing).
+    Aynı özeti alan token'lar tek multicast'te, 500'lük parçalarla gönderilir.
+
+    Returns:
+        Başarıyla gönderilen bildirim sayısı.
+    """
+    if not fcm_tokens or not _init_firebase():
+        return 0
+    try:
+        if count == 1:
+            title = f"🔴 Deprem M{max_magnitude:.1f}"
+            body = location
+        else:
+            title = f"🔴 {count} yeni deprem, en büyüğü M{max_magnitude:.1f}"
+            body = f"Son {window_minutes} dk — en büyüğü: {location}"
+        notification = messaging.Notification(title=title, body=body)
+        data = {
+            "type": "EARTHQUAKE_SUMMARY",
+            "count": str(count),
+            "max_magnitude": str(max_magnitude),
+            "location": location,
+        }
+        android = messaging.AndroidConfig(
+            priority="high",
+            notification=messaging.AndroidNotification(channel_id="earthquake_alerts"),
+        )
+        report = await dispatch_chunks(
+            fcm_tokens,
+            lambda start, stop: _transport().send_each_for_multicast(messaging.MulticastMessage(
+                notification=notification, data=data, tokens=fcm_tokens[start:stop], android=android,
+            )),
+            "summary",
+        )
+        return report.success_count
+    except Exception as exc:
+        logger.error("FCM özet multicast hatası: %s", exc)
+        return 0
+
+
 async def send_i_am_safe(
     sender_email: str,
     latitude: float | None,
@@ -196,24 +481,21 @@ async def send_i_am_safe(
     )
 
     try:
-        message = messaging.MulticastMessage(
-            notification=messaging.Notification(title=title, body=body),
-            data={
-                "type": "I_AM_SAFE",
-                "sender": sender_email,
-                "location": location_str,
-            },
-            tokens=fcm_tokens[:500],
-            android=messaging.AndroidConfig(priority="normal"),
-        )
-        response = messaging.send_each_for_multicast(message)
-        logger.info(
-            "Ben İyiyim FCM: %s → %d başarılı / %d başarısız",
-            sender_email,
-            response.success_count,
-            response.failure_count,
+        notification = messaging.Notification(title=title, body=body)
+        data = {
+            "type": "I_AM_SAFE",
+            "sender": sender_email,
+            "location": location_str,
+        }
+        android = messaging.AndroidConfig(priority="normal")
+        report = await dispatch_chunks(
+            fcm_tokens,
+            lambda start, stop: _transport().send_each_for_multicast(messaging.MulticastMessage(
+                notification=notification, data=data, tokens=fcm_tokens[start:stop], android=android,
+            )),
+            f"I_AM_SAFE {sender_email}",
         )
-        return response.success_count
+        return report.success_count
     except Exception as exc:
         logger.error("Ben İyiyim FCM hatası: %s", exc)
         return 0
@@ -231,6 +513,7 @@ async def send_rich_multicast(
     """
     Zengin içerikli multicast bildirim — görsel, başlık, mesaj ve ek veri.
     Admin panelinden broadcast veya tek kullanıcıya gönderim için kullanılır.
+    Token sayısı sınırsızdır; gönderim parçalar halinde olay döngüsü dışında yapılır.
 
     Returns:
         Başarıyla gönderilen bildirim sayısı.
@@ -248,37 +531,34 @@ async def send_rich_multicast(
         str_data = {k: str(v) for k, v in (data or {}).items()}
         str_data["type"] = str_data.get("type", "ADMIN_BROADCAST")
 
-        message = messaging.MulticastMessage(
-            notification=notification,
-            data=str_data,
-            tokens=tokens[:500],
-            android=messaging.AndroidConfig(
+        android = messaging.AndroidConfig(
+            priority="high",
+            notification=messaging.AndroidNotification(
+                channel_id="admin_notifications",
                 priority="high",
-                notification=messaging.AndroidNotification(
-                    channel_id="admin_notifications",
-                    priority="high",
-                    image=image_url,
-                    click_action="OPEN_APP",
-                ),
+                image=image_url,
+                click_action="OPEN_APP",
             ),
-            apns=messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(
-                        alert=messaging.ApsAlert(title=title, body=body),
-                        sound="default",
-                        content_available=True,
-                        mutable_content=True,
-                    )
-                ),
+        )
+        apns = messaging.APNSConfig(
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(
+                    alert=messaging.ApsAlert(title=title, body=body),
+                    sound="default",
+                    content_available=True,
+                    mutable_content=True,
+                )
             ),
         )
-        response = messaging.send_each_for_multicast(message)
-        logger.info(
-            "Rich multicast: %d başarılı / %d başarısız",
-            response.success_count,
-            response.failure_count,
+        report = await dispatch_chunks(
+            tokens,
+            lambda start, stop: _transport().send_each_for_multicast(messaging.MulticastMessage(
+                notification=notification, data=str_data, tokens=tokens[start:stop],
+                android=android, apns=apns,
+            )),
+            "rich multicast",
         )
-        return response.success_count
+        return report.success_count
     except Exception as exc:
         logger.error("Rich multicast hatası: %s", exc)
         return 0
@@ -304,12 +584,50 @@ async def send_raw_multicast(tokens: list[str], title: str, body: str) -> int:
 
 # ─── EARTHQUAKE_CONFIRMED — Nükleer Alarm Tetikleyici Push ───────────────────
 
+def s_wave_countdown_fields(
+    latitude: float,
+    longitude: float,
+    origin_ts: float,
+    recipient_coords: Sequence[Optional[Tuple[float, float]]],
+    depth_km: float = DEFAULT_DEPTH_KM,
+    now_ts: Optional[float] = None,
+) -> List[Dict[str, str]]:
+    """
+    Her alıcı için "güçlü sarsıntıya kalan süre" data alanlarını üretir.
+    Mesafe ve S varışları tüm alıcılar için tek vektörize geçişte hesaplanır.
+
+    Alanlar (konumu bilinmeyen alıcı için boş sözlük):
+      s_wave_eta_sec    → gönderim anına göre kalan sn (geçtiyse 0)
+      s_wave_arrival_ms → S varışı (epoch ms); istemci kendi saatiyle geri sayar
+      distance_km       → episantr uzaklığı
+    """
+    lats = np.array([c[0] if c else np.nan for c in recipient_coords], dtype=float)
+    lons = np.array([c[1] if c else np.nan for c in recipient_coords], dtype=float)
+    distances, arrivals = s_wave_arrivals(latitude, longitude, origin_ts, lats, lons, depth_km)
+    now = time.time() if now_ts is None else now_ts
+    eta = np.round(np.maximum(arrivals - now, 0.0), 1).tolist()
+    arrival_ms = np.round(arrivals * 1000.0).tolist()
+    dist = np.round(distances, 1).tolist()
+
+    fields: List[Dict[str, str]] = []
+    for e, a, d in zip(eta, arrival_ms, dist):
+        if d != d:  # NaN → konum bilinmiyor
+            fields.append({})
+            continue
+        fields.append({"s_wave_eta_sec": str(e), "s_wave_arrival_ms": str(int(a)), "distance_km": str(d)})
+    return fields
+
+
 async def send_earthquake_confirmed_push(
     fcm_tokens: list[str],
     latitude: float,
     longitude: float,
     device_count: int,
     occurred_at: str,
+    recipient_coords: Optional[Sequence[Optional[Tuple[float, float]]]] = None,
+    origin_ts: Optional[float] = None,
+    depth_km: float = DEFAULT_DEPTH_KM,
+    timeline: Optional["AlarmTimeline"] = None,
 ) -> int:
     """
     EARTHQUAKE_CONFIRMED tipinde yüksek öncelikli FCM data push gönderir.
@@ -323,12 +641,21 @@ async def send_earthquake_confirmed_push(
     Notification alanı kasıtlı olarak BOŞ bırakılır — yalnızca data payload.
     Bu sayede sistem notification yerine app içi tam ekran alarm gösterilir.
 
+    recipient_coords ve origin_ts verilirse her token'a kendi S dalgası geri
+    sayımı eklenir (s_wave_countdown_fields) ve mesajlar token başına send_each
+    ile, aksi halde multicast ile gönderilir. Her iki yolda da token listesi
+    dispatch_chunks ile 500'lük parçalar halinde olay döngüsü dışında işlenir.
+
     Args:
-        fcm_tokens: Hedef kullanıcıların FCM token listesi (max 500).
+        fcm_tokens: Hedef kullanıcıların FCM token listesi.
         latitude: Deprem/alarm merkezi latitude.
         longitude: Deprem/alarm merkezi longitude.
         device_count: Tetikleyen cihaz sayısı.
         occurred_at: ISO 8601 deprem zamanı.
+        recipient_coords: fcm_tokens ile aynı sırada (lat, lon) veya None.
+        origin_ts: Oluş zamanı (epoch sn).
+        depth_km: Odak derinliği (km).
+        timeline: Alarm SLO zaman çizelgesi (ilk/son token damgaları işlenir).
 
     Returns:
         Başarıyla gönderilen token sayısı.
@@ -345,57 +672,75 @@ async def send_earthquake_confirmed_push(
             "timestamp": occurred_at,
         }
 
-        message = messaging.MulticastMessage(
-            # Notification alanı YOK — sadece data payload (app içi alarm tetikler)
-            data=data_payload,
-            tokens=fcm_tokens[:500],
-
-            android=messaging.AndroidConfig(
-                priority="high",          # FCM yüksek öncelik → Doze Mode'u deler
-                ttl=30,                   # 30 saniye geçerlilik — deprem uyarısı gecikmez
-                collapse_key="earthquake_confirmed",  # Birden fazla varsa son mesajı gönder
-                restricted_package_name="com.quakesense",
-            ),
-
-            apns=messaging.APNSConfig(
-                headers={
-                    "apns-priority": "10",        # Maksimum öncelik
-                    "apns-push-type": "background", # Arka plan uyandırma
-                },
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(
-                        content_available=True,   # iOS arka plan uyandırma
-                        mutable_content=True,     # Notification Service Extension
-                        sound=messaging.CriticalSound(
-                            name="earthquake_alarm.caf",
-                            critical=True,        # iOS sessiz mod bypass
-                            volume=1.0,
-                        ),
-                        category="EARTHQUAKE_ALARM",
-                    )
-                ),
+        android = messaging.AndroidConfig(
+            priority="high",          # FCM yüksek öncelik → Doze Mode'u deler
+            ttl=30,                   # 30 saniye geçerlilik — deprem uyarısı gecikmez
+            collapse_key="earthquake_confirmed",  # Birden fazla varsa son mesajı gönder
+            restricted_package_name="com.quakesense",
+        )
+        apns = messaging.APNSConfig(
+            headers={
+                "apns-priority": "10",        # Maksimum öncelik
+                "apns-push-type": "background", # Arka plan uyandırma
+            },
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(
+                    content_available=True,   # iOS arka plan uyandırma
+                    mutable_content=True,     # Notification Service Extension
+                    sound=messaging.CriticalSound(
+                        name="earthquake_alarm.caf",
+                        critical=True,        # iOS sessiz mod bypass
+                        volume=1.0,
+                    ),
+                    category="EARTHQUAKE_ALARM",
+                )
             ),
         )
 
-        response = messaging.send_each_for_multicast(message)
+        if recipient_coords is not None and origin_ts is not None:
+            countdowns = await asyncio.to_thread(
+                s_wave_countdown_fields, latitude, longitude, origin_ts, recipient_coords, depth_km,
+            )
+
+            def send_range(start: int, stop: int) -> Any:
+                return _transport().send_each([
+                    messaging.Message(
+                        # Notification alanı YOK — sadece data payload (app içi alarm tetikler)
+                        data={**data_payload, **countdowns[i]},
+                        token=fcm_tokens[i],
+                        android=android,
+                        apns=apns,
+                    )
+                    for i in range(start, stop)
+                ])
+        else:
+            def send_range(start: int, stop: int) -> Any:
+                return _transport().send_each_for_multicast(messaging.MulticastMessage(
+                    # Notification alanı YOK — sadece data payload (app içi alarm tetikler)
+                    data=data_payload,
+                    tokens=fcm_tokens[start:stop],
+                    android=android,
+                    apns=apns,
+                ))
+
+        report = await dispatch_chunks(fcm_tokens, send_range, "EARTHQUAKE_CONFIRMED", timeline)
+        success_count, failures = report.success_count, report.failures
         logger.info(
             "[FCM EARTHQUAKE_CONFIRMED] Gönderildi: %d başarılı / %d başarısız | "
             "Koordinat: %.4f,%.4f | Cihaz: %d",
-            response.success_count, response.failure_count,
+            success_count, len(failures),
             latitude, longitude, device_count,
         )
 
         # Başarısız token'ları logla (temizlik için kullanılabilir)
-        if response.failure_count > 0:
-            for i, res in enumerate(response.responses):
-                if not res.success and i < len(fcm_tokens):
-                    logger.warning(
-                        "[FCM EARTHQUAKE_CONFIRMED] Token başarısız: %s... → %s",
-                        fcm_tokens[i][:12],
-                        res.exception,
-                    )
-
-        return response.success_count
+        for res in failures:
+            logger.warning(
+                "[FCM EARTHQUAKE_CONFIRMED] Token başarısız: %s... → %s",
+                res.token[:12],
+                res.error,
+            )
+
+        return success_count
 
     except Exception as exc:
         logger.error("[FCM EARTHQUAKE_CONFIRMED] Kritik hata: %s", exc, exc_info=True)
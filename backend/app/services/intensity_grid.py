@@ -0,0 +1,173 @@
+"""
+Etki bazlı hedefleme için ShakeMap benzeri yer hareketi şiddet ızgarası.
+
+Ulusal ızgara (settings.INTENSITY_GRID_*) süreç başına bir kez kurulur. Her
+deprem için GMPE (app.utils.seismology.predict_mmi) tüm hücrelerde NumPy ile
+tek geçişte değerlendirilir: düzenli lat/lon ağında Haversine'in enlem ve boylam
+terimleri ayrışır, mesafe matrisi iki vektörün dış çarpımından elde edilir.
+
+Sonuç MMI raster'ı deprem başına süreç içi LRU'da tutulur; hedefleme kullanıcı
+konumlarını hücre indeksine çevirip "beklenen MMI ≥ X" sorgusunu kullanıcı
+başına Haversine yerine tek dizi lookup'ı ile yapar. Izgara dışındaki konumlar
+için GMPE doğrudan (yine vektörize) değerlendirilir.
+rules.md: type hints, logging, magic number yasak.
+"""
+
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.geo import haversine_distances_km
+from app.utils.seismology import DEFAULT_DEPTH_KM, predict_mmi
+
+logger = logging.getLogger(__name__)
+
+_EARTH_RADIUS_KM: float = 6371.0
+
+
+@dataclass(frozen=True)
+class NationalGrid:
+    """Düzenli lat/lon ızgarası; düğümler hücre merkezleridir."""
+
+    lat_min: float
+    lon_min: float
+    step_deg: float
+    lats: np.ndarray   # (nlat,)
+    lons: np.ndarray   # (nlon,)
+
+    @classmethod
+    def build(cls, lat_min: float, lat_max: float, lon_min: float, lon_max: float, step_deg: float) -> "NationalGrid":
+        nlat = int(round((lat_max - lat_min) / step_deg)) + 1
+        nlon = int(round((lon_max - lon_min) / step_deg)) + 1
+        return cls(
+            lat_min=lat_min,
+            lon_min=lon_min,
+            step_deg=step_deg,
+            lats=lat_min + step_deg * np.arange(nlat),
+            lons=lon_min + step_deg * np.arange(nlon),
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.lats), len(self.lons)
+
+    def distances_km(self, latitude: float, longitude: float) -> np.ndarray:
+        """
+        (nlat, nlon) episantr uzaklık matrisi. Haversine'in
+        sin²(Δφ/2) ve cosφ terimleri satıra, sin²(Δλ/2) terimi sütuna bağlıdır.
+        """
+        phi = np.radians(self.lats)
+        phi0 = math.radians(latitude)
+        row_a = np.sin((phi - phi0) / 2) ** 2
+        row_b = math.cos(phi0) * np.cos(phi)
+        col = np.sin(np.radians(self.lons - longitude) / 2) ** 2
+        a = np.minimum(row_a[:, None] + row_b[:, None] * col[None, :], 1.0)
+        return 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def cell_index(self, latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Koordinatları (satır, sütun, ızgara içinde mi) dizilerine çevirir."""
+        with np.errstate(invalid="ignore"):
+            rows = np.rint((latitudes - self.lat_min) / self.step_deg)
+            cols = np.rint((longitudes - self.lon_min) / self.step_deg)
+            nlat, nlon = self.shape
+            inside = (rows >= 0) & (rows < nlat) & (cols >= 0) & (cols < nlon)
+        rows = np.where(inside, rows, 0).astype(np.intp)
+        cols = np.where(inside, cols, 0).astype(np.intp)
+        return rows, cols, inside
+
+
+@dataclass(frozen=True)
+class IntensityRaster:
+    """Tek depremin beklenen MMI raster'ı."""
+
+    event_id: str
+    magnitude: float
+    latitude: float
+    longitude: float
+    depth_km: float
+    grid: NationalGrid
+    mmi: np.ndarray    # (nlat, nlon) float32
+
+    def mmi_at(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+        """
+        Konumlardaki beklenen MMI. Izgara içi → raster lookup, dışı → doğrudan
+        GMPE; konumu bilinmeyen (NaN) için NaN.
+        """
+        lats = np.asarray(latitudes, dtype=float)
+        lons = np.asarray(longitudes, dtype=float)
+        rows, cols, inside = self.grid.cell_index(lats, lons)
+        out = np.where(inside, self.mmi[rows, cols], np.nan)
+        outside = ~inside & ~np.isnan(lats) & ~np.isnan(lons)
+        if outside.any():
+            distances = haversine_distances_km(self.latitude, self.longitude, lats[outside], lons[outside])
+            out[outside] = predict_mmi(self.magnitude, distances, self.depth_km)
+        return out
+
+    def at_least(self, latitudes: Sequence[float], longitudes: Sequence[float], min_mmi: float) -> np.ndarray:
+        """Beklenen MMI ≥ min_mmi olan konumların maskesi (konumsuzlar False)."""
+        with np.errstate(invalid="ignore"):
+            return self.mmi_at(latitudes, longitudes) >= min_mmi
+
+
+def compute_intensity_raster(
+    event_id: str,
+    magnitude: float,
+    latitude: float,
+    longitude: float,
+    depth_km: Optional[float] = None,
+    grid: Optional[NationalGrid] = None,
+) -> IntensityRaster:
+    """Depremin MMI raster'ını ulusal ızgarada tek vektörize geçişte hesaplar."""
+    grid = grid or get_national_grid()
+    depth = depth_km if depth_km is not None and depth_km > 0 else DEFAULT_DEPTH_KM
+    mmi = predict_mmi(magnitude, grid.distances_km(latitude, longitude), depth).astype(np.float32)
+    return IntensityRaster(event_id, magnitude, latitude, longitude, depth, grid, mmi)
+
+
+_grid: Optional[NationalGrid] = None
+_cache: "OrderedDict[tuple, IntensityRaster]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_national_grid() -> NationalGrid:
+    """Süreç başına tek ulusal ızgara (settings.INTENSITY_GRID_*)."""
+    global _grid
+    if _grid is None:
+        _grid = NationalGrid.build(
+            settings.INTENSITY_GRID_LAT_MIN, settings.INTENSITY_GRID_LAT_MAX,
+            settings.INTENSITY_GRID_LON_MIN, settings.INTENSITY_GRID_LON_MAX,
+            settings.INTENSITY_GRID_STEP_DEG,
+        )
+        logger.info("Ulusal şiddet ızgarası kuruldu: %s hücre", _grid.shape)
+    return _grid
+
+
+def get_intensity_raster(
+    event_id: str,
+    magnitude: float,
+    latitude: float,
+    longitude: float,
+    depth_km: Optional[float] = None,
+) -> IntensityRaster:
+    """
+    Deprem başına önbellekli raster. Anahtar kaynak parametrelerini de içerir:
+    revize edilen büyüklük/konum yeni raster üretir.
+    """
+    key = (event_id, magnitude, latitude, longitude, depth_km)
+    with _cache_lock:
+        raster = _cache.get(key)
+        if raster is not None:
+            _cache.move_to_end(key)
+            return raster
+    raster = compute_intensity_raster(event_id, magnitude, latitude, longitude, depth_km)
+    with _cache_lock:
+        _cache[key] = raster
+        while len(_cache) > settings.INTENSITY_RASTER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return raster
@@ -1,13 +1,26 @@
 """
 Anthropic Claude LLM servisi.
 Transcribed text'ten yapılandırılmış S.O.S verisi çıkarır.
+Client süreç başına paylaşılır (app.services.ai_clients); çağrı süresi
+ai_latency histogramının "extract" aşamasına yazılır.
+
+Sıra: önbellek (normalize transkript SHA-256, Redis) → kural tabanlı çıkarıcı
+(app.services.sos_rules; güveni SOS_RULES_MIN_CONFIDENCE üstündeyse) → Claude.
+Hangi yolun kullanıldığı sos_extract sayaçlarına (cache/rules/llm) yazılır.
 """
 
+import asyncio
 import json
 import logging
 from typing import Dict, Optional, Any
 
 from app.config import settings
+from app.services.ai_clients import provider_call
+from app.services.metrics import incr_counters
+from app.services.sos_rules import extract_rule_based, transcript_key
+
+EXTRACT_CACHE_PREFIX = "sos:extract"
+EXTRACT_METRIC = "sos_extract"
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +30,32 @@ class LLMExtractorError(Exception):
     pass
 
 
+def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        from app.core.redis import get_redis_sync
+        raw = get_redis_sync().get(f"{EXTRACT_CACHE_PREFIX}:{key}")
+        if not raw:
+            return None
+        incr_counters(EXTRACT_METRIC, cache=1)
+        return json.loads(raw)
+    except Exception as exc:
+        # Cache hatası çıkarımı durdurmamalı
+        logger.warning("S.O.S çıkarım cache okuma hatası: %s", exc)
+        return None
+
+
+def _cache_set(key: str, data: Dict[str, Any], source: str) -> None:
+    try:
+        from app.core.redis import get_redis_sync
+        get_redis_sync().set(
+            f"{EXTRACT_CACHE_PREFIX}:{key}", json.dumps(data, ensure_ascii=False),
+            ex=settings.SOS_EXTRACT_CACHE_TTL_SECONDS,
+        )
+    except Exception as exc:
+        logger.warning("S.O.S çıkarım cache yazma hatası: %s", exc)
+    incr_counters(EXTRACT_METRIC, **{source: 1})
+
+
 class LLMExtractor:
     """Anthropic Claude API client for S.O.S data extraction."""
 
@@ -25,26 +64,6 @@ class LLMExtractor:
         self.model = settings.ANTHROPIC_MODEL
         self.timeout = 15  # seconds
 
-        # Anthropic client'ı lazy load
-        self.client: Optional[Any] = None
-
-    def _init_client(self):
-        """Anthropic client'ı başlatır."""
-        if self.client is not None:
-            return
-
-        if not self.api_key:
-            raise LLMExtractorError("Anthropic API key yapılandırılmamış")
-
-        try:
-            import anthropic
-            self.client = anthropic.Anthropic(api_key=self.api_key)
-            logger.info("Anthropic client başlatıldı")
-        except ImportError:
-            raise LLMExtractorError("anthropic paketi yüklü değil")
-        except Exception as exc:
-            raise LLMExtractorError(f"Anthropic client başlatma hatası: {exc}")
-
     async def extract_sos_data(
         self,
         transcription: str,
@@ -63,7 +82,26 @@ class LLMExtractor:
         Raises:
             LLMExtractorError: Extraction başarısız olursa
         """
-        self._init_client()
+        key = transcript_key(transcription)
+        cached = await asyncio.to_thread(_cache_get, key)
+        if cached is not None:
+            logger.info("S.O.S çıkarım cache'ten: %s", cached)
+            return cached
+
+        rules = extract_rule_based(transcription)
+        if rules.confidence >= settings.SOS_RULES_MIN_CONFIDENCE:
+            logger.info("S.O.S kural tabanlı çıkarım (güven=%.2f): %s", rules.confidence, rules.data)
+            await asyncio.to_thread(_cache_set, key, rules.data, "rules")
+            return rules.data
+
+        result = await self._extract_llm(transcription, timeout)
+        await asyncio.to_thread(_cache_set, key, result, "llm")
+        return result
+
+    async def _extract_llm(self, transcription: str, timeout: Optional[int]) -> Dict[str, Any]:
+        """Claude ile çıkarım (kural güveni düşükse)."""
+        if not self.api_key:
+            raise LLMExtractorError("Anthropic API key yapılandırılmamış")
         timeout = timeout or self.timeout
 
         prompt = f"""Sen bir acil durum analiz asistanısın. Aşağıdaki deprem sırasında kaydedilmiş ses metninden yapılandırılmış veri çıkar.
@@ -86,16 +124,21 @@ Sadece JSON döndür, başka açıklama ekleme.
   "lokasyon": "Atatürk Mahallesi, Bina 15, Daire 3"
 }}"""
 
+        def create():
+            # Paylaşılan client; senkron SDK çağrısı olay döngüsünü bloke etmesin diye thread'de
+            with provider_call("anthropic", "extract") as client:
+                return client.messages.create(
+                    model=self.model,
+                    max_tokens=500,
+                    temperature=0,
+                    timeout=timeout,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+
         try:
             import anthropic
 
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=500,
-                temperature=0,
-                timeout=timeout,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            message = await asyncio.to_thread(create)
 
             response_text = message.content[0].text.strip()
             logger.info("Claude response: %s", response_text)
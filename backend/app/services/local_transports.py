@@ -0,0 +1,285 @@
+"""
+Yerel FCM ve Twilio stand-in'leri — bildirim fanout'unun yük testi için.
+
+Google ve Twilio'ya gitmeden gerçek gönderim kodunu (fcm.dispatch_chunks,
+twilio_fallback, twilio_sms) sürmek için SDK arayüzlerini taklit eder:
+
+  LocalFcmTransport   → messaging.send / send_each / send_each_for_multicast;
+                        firebase_admin'in BatchResponse/SendResponse ve hata
+                        sınıflarını döner (UnregisteredError, QuotaExceededError,
+                        UnavailableError).
+  LocalTwilioClient   → client.messages.create / create_async; TwilioRestException fırlatır
+                        (21211 geçersiz numara, 20429 kota, 30008 geçici hata).
+
+Davranış StandInProfile ile ayarlanır (settings.LOCAL_FCM_* / LOCAL_TWILIO_*):
+istek başına gecikme + rastgele ek gecikme, geçici hata oranı, kalıcı geçersiz
+alıcı oranı (alıcının crc32 özetinden, tekrar denemede aynı sonuç) ve token
+bucket ile saniyelik kota. Etkinleştirme: FCM_TRANSPORT=local, TWILIO_TRANSPORT=local.
+Sayaçlar (stats) benchmark raporu içindir; thread-safe'tir.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from twilio.base.exceptions import TwilioRestException
+except ImportError:  # twilio yoksa stand-in yine çalışır, çağıran genel hata yakalar
+    class TwilioRestException(Exception):  # type: ignore[no-redef]
+        def __init__(self, status: int, uri: str, msg: str = "", code: Optional[int] = None, **_: Any):
+            super().__init__(msg)
+            self.status, self.uri, self.msg, self.code = status, uri, msg, code
+
+_TWILIO_MESSAGES_URI = "/2010-04-01/Accounts/ACLOCAL/Messages.json"
+
+
+@dataclass(frozen=True)
+class StandInProfile:
+    """Stand-in'in gecikme, hata ve kota davranışı."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0        # Geçici hata (tekrar denemede başarılı olabilir)
+    invalid_rate: float = 0.0      # Kalıcı geçersiz alıcı (token/numara)
+    rate_per_second: float = 0.0   # 0 = sınırsız
+
+    @classmethod
+    def fcm(cls) -> "StandInProfile":
+        return cls(
+            settings.LOCAL_FCM_LATENCY_MS, settings.LOCAL_FCM_JITTER_MS, settings.LOCAL_FCM_ERROR_RATE,
+            settings.LOCAL_FCM_INVALID_RATE, settings.LOCAL_FCM_RATE_PER_SECOND,
+        )
+
+    @classmethod
+    def twilio(cls) -> "StandInProfile":
+        return cls(
+            settings.LOCAL_TWILIO_LATENCY_MS, settings.LOCAL_TWILIO_JITTER_MS, settings.LOCAL_TWILIO_ERROR_RATE,
+            settings.LOCAL_TWILIO_INVALID_RATE, settings.LOCAL_TWILIO_RATE_PER_SECOND,
+        )
+
+
+@dataclass
+class StandInStats:
+    """Stand-in sayaçları ve istek gecikmeleri (ms)."""
+
+    requests: int = 0
+    messages: int = 0
+    delivered: int = 0
+    invalid: int = 0
+    throttled: int = 0
+    errors: int = 0
+    max_in_flight: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+
+        def pct(q: float) -> Optional[float]:
+            return round(latencies[min(int(q * len(latencies)), len(latencies) - 1)], 1) if latencies else None
+
+        return {
+            "requests": self.requests, "messages": self.messages, "delivered": self.delivered,
+            "invalid": self.invalid, "throttled": self.throttled, "errors": self.errors,
+            "max_in_flight": self.max_in_flight,
+            "request_p50_ms": pct(0.50), "request_p99_ms": pct(0.99),
+        }
+
+
+class _StandIn:
+    """Ortak gecikme, kota (token bucket) ve sonuç seçimi."""
+
+    def __init__(
+        self,
+        profile: StandInProfile,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.profile = profile
+        self.stats = StandInStats()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._clock = clock  # Kota dolumu saati (testte sabitlenir)
+        self._tokens = profile.rate_per_second
+        self._refilled = clock()
+        self._in_flight = 0
+
+    def _take_quota(self, n: int) -> int:
+        """Kotadan en fazla n birim alır; alınan birim sayısını döner."""
+        rate = self.profile.rate_per_second
+        if rate <= 0:
+            return n
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(rate, self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            granted = min(n, int(self._tokens))
+            self._tokens -= granted
+            return granted
+
+    def _is_invalid(self, recipient: str) -> bool:
+        return zlib.crc32(recipient.encode()) / 0xFFFFFFFF < self.profile.invalid_rate
+
+    def _is_transient_error(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.profile.error_rate
+
+    def _start(self) -> Tuple[float, float]:
+        """İsteği uçuşta sayar; (başlangıç anı, gecikme sn) döner."""
+        with self._lock:
+            self._in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+            delay = self.profile.latency_ms + self._random.random() * self.profile.jitter_ms
+        return time.perf_counter(), delay / 1000.0
+
+    def _request(self) -> float:
+        """Bir API isteğinin ağ gecikmesini uygular; başlangıç anını döner."""
+        t0, delay = self._start()
+        time.sleep(delay)
+        return t0
+
+    async def _request_async(self) -> float:
+        """_request'in olay döngüsünü bloke etmeyen karşılığı."""
+        t0, delay = self._start()
+        await asyncio.sleep(delay)
+        return t0
+
+    def _finish(self, t0: float, n_messages: int, counts: Dict[str, int]) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.stats.requests += 1
+            self.stats.messages += n_messages
+            self.stats.latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+            for name, value in counts.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+
+class LocalFcmTransport(_StandIn):
+    """firebase_admin.messaging gönderim fonksiyonlarının yerel karşılığı."""
+
+    def __init__(
+        self,
+        profile: StandInProfile,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(profile, seed, clock)
+        self._ids = itertools.count(1)
+
+    def _outcomes(self, tokens: Sequence[str]) -> Tuple[List[Any], Dict[str, int]]:
+        from firebase_admin import exceptions, messaging
+
+        granted = self._take_quota(len(tokens))
+        responses, counts = [], {"delivered": 0, "invalid": 0, "throttled": 0, "errors": 0}
+        for i, token in enumerate(tokens):
+            if self._is_invalid(token):
+                counts["invalid"] += 1
+                exc: Optional[Exception] = messaging.UnregisteredError("Requested entity was not found.")
+            elif i >= granted:
+                counts["throttled"] += 1
+                exc = messaging.QuotaExceededError("Sending quota exceeded.")
+            elif self._is_transient_error():
+                counts["errors"] += 1
+                exc = exceptions.UnavailableError("The service is currently unavailable.")
+            else:
+                counts["delivered"] += 1
+                exc = None
+            name = None if exc else f"projects/local/messages/{next(self._ids)}"
+            responses.append(messaging.SendResponse({"name": name} if name else None, exc))
+        return responses, counts
+
+    def send_each(self, messages: Sequence[Any], dry_run: bool = False) -> Any:
+        from firebase_admin import messaging
+
+        t0 = self._request()
+        responses, counts = self._outcomes([m.token for m in messages])
+        self._finish(t0, len(messages), counts)
+        return messaging.BatchResponse(responses)
+
+    def send_each_for_multicast(self, multicast_message: Any, dry_run: bool = False) -> Any:
+        from firebase_admin import messaging
+
+        tokens = multicast_message.tokens
+        t0 = self._request()
+        responses, counts = self._outcomes(tokens)
+        self._finish(t0, len(tokens), counts)
+        return messaging.BatchResponse(responses)
+
+    def send(self, message: Any, dry_run: bool = False) -> str:
+        response = self.send_each([message], dry_run).responses[0]
+        if response.exception is not None:
+            raise response.exception
+        return response.message_id
+
+
+class _LocalMessages:
+    def __init__(self, owner: "LocalTwilioClient"):
+        self._owner = owner
+
+    def create(self, body: str, to: str, from_: Optional[str] = None, **_: Any) -> SimpleNamespace:
+        return self._owner._respond(self._owner._request(), body, to, from_)
+
+    async def create_async(self, body: str, to: str, from_: Optional[str] = None, **_: Any) -> SimpleNamespace:
+        return self._owner._respond(await self._owner._request_async(), body, to, from_)
+
+
+class LocalTwilioClient(_StandIn):
+    """twilio.rest.Client'ın messages.create / create_async yüzeyinin yerel karşılığı."""
+
+    def __init__(self, profile: StandInProfile, seed: Optional[int] = None):
+        super().__init__(profile, seed)
+        self.messages = _LocalMessages(self)
+        self._ids = itertools.count(1)
+
+    def _respond(self, t0: float, body: str, to: str, from_: Optional[str]) -> SimpleNamespace:
+        number = to.removeprefix("whatsapp:")
+        if self._is_invalid(number):
+            self._finish(t0, 1, {"invalid": 1})
+            raise TwilioRestException(400, _TWILIO_MESSAGES_URI, "Invalid 'To' Phone Number", code=21211, method="POST")
+        if not self._take_quota(1):
+            self._finish(t0, 1, {"throttled": 1})
+            raise TwilioRestException(429, _TWILIO_MESSAGES_URI, "Too Many Requests", code=20429, method="POST")
+        if self._is_transient_error():
+            self._finish(t0, 1, {"errors": 1})
+            raise TwilioRestException(500, _TWILIO_MESSAGES_URI, "Unknown error", code=30008, method="POST")
+        self._finish(t0, 1, {"delivered": 1})
+        return SimpleNamespace(sid=f"SMLOCAL{next(self._ids):026d}", status="queued", to=to, from_=from_, body=body)
+
+
+_local_fcm: Optional[LocalFcmTransport] = None
+_local_twilio: Optional[LocalTwilioClient] = None
+
+
+def get_local_fcm() -> LocalFcmTransport:
+    """Süreç başına tek FCM stand-in'i (profil settings.LOCAL_FCM_*'dan)."""
+    global _local_fcm
+    if _local_fcm is None:
+        _local_fcm = LocalFcmTransport(StandInProfile.fcm())
+        logger.warning("FCM yerel stand-in kullanılıyor (FCM_TRANSPORT=local): %s", _local_fcm.profile)
+    return _local_fcm
+
+
+def get_local_twilio() -> LocalTwilioClient:
+    """Süreç başına tek Twilio stand-in'i (profil settings.LOCAL_TWILIO_*'dan)."""
+    global _local_twilio
+    if _local_twilio is None:
+        _local_twilio = LocalTwilioClient(StandInProfile.twilio())
+        logger.warning("Twilio yerel stand-in kullanılıyor (TWILIO_TRANSPORT=local): %s", _local_twilio.profile)
+    return _local_twilio
+
+
+def reset_local_transports() -> None:
+    """Stand-in'leri (profil ve sayaçlar) bir sonraki kullanımda yeniden kurar."""
+    global _local_fcm, _local_twilio
+    _local_fcm = None
+    _local_twilio = None
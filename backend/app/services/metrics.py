@@ -0,0 +1,141 @@
+"""
+Hafif operasyonel metrikler — Redis üzerinde saat bazlı sayaç kovaları.
+API süreçleri ve Celery worker'ları aynı sayaçlara yazar; admin API okur.
+
+Anahtar: metrics:<ad>:<YYYYMMDDHH> → HASH {alan: sayı}, METRICS_RETENTION_HOURS
+sonra kendiliğinden silinir. Yazma hataları yutulur (metrik, asıl işi bozmamalı).
+Gecikme histogramları (observe_latencies) aynı kovalarda sabit ms sınırlı
+sayaçlar olarak tutulur; yüzdelikler okuma tarafında kestirilir.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY_PREFIX = "metrics"
+
+
+def _bucket(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).strftime("%Y%m%d%H")
+
+
+def _key(name: str, bucket: str) -> str:
+    return f"{METRICS_KEY_PREFIX}:{name}:{bucket}"
+
+
+def incr_counters(name: str, redis=None, **fields: int) -> None:
+    """
+    Sayaçları içinde bulunulan saat kovasında artırır (senkron, tek pipeline).
+
+    Args:
+        name: Metrik grubu (ör. "fcm").
+        redis: Senkron istemci; verilmezse core.redis.get_redis_sync().
+        fields: alan=artış çiftleri; sıfırlar yazılmaz.
+    """
+    fields = {k: v for k, v in fields.items() if v}
+    if not fields:
+        return
+    try:
+        if redis is None:
+            from app.core.redis import get_redis_sync
+            redis = get_redis_sync()
+        key = _key(name, _bucket(datetime.now(timezone.utc)))
+        pipe = redis.pipeline(transaction=False)
+        for field_name, amount in fields.items():
+            pipe.hincrby(key, field_name, amount)
+        pipe.expire(key, settings.METRICS_RETENTION_HOURS * 3600)
+        pipe.execute()
+    except Exception as exc:
+        logger.debug("Metrik yazılamadı (%s): %s", name, exc)
+
+
+async def read_counters(redis, name: str, hours: int, now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Son `hours` saatin kovalarını eskiden yeniye döner (async istemci).
+    Her eleman: {"hour": ISO saat, <alan>: int, ...}; boş saatler de listelenir.
+    """
+    now = now or datetime.now(timezone.utc)
+    hours_list = [
+        (now - timedelta(hours=h)).replace(minute=0, second=0, microsecond=0)
+        for h in range(hours - 1, -1, -1)
+    ]
+    pipe = redis.pipeline(transaction=False)
+    for hour in hours_list:
+        pipe.hgetall(_key(name, _bucket(hour)))
+    raw = await pipe.execute()
+    return [
+        {"hour": hour.isoformat(), **{k: int(v) for k, v in (values or {}).items()}}
+        for hour, values in zip(hours_list, raw)
+    ]
+
+
+# ─── Gecikme histogramları ───────────────────────────────────────────────────
+# Aynı saat kovası HASH'inde aşama başına alanlar:
+#   <aşama>:le:<üst sınır ms> (kova sayısı, kümülatif değil), <aşama>:count, <aşama>:sum_ms
+
+LATENCY_BUCKETS_MS: Tuple[int, ...] = (50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+_OVERFLOW_BUCKET = "inf"
+
+
+def _bucket_label(value_ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if value_ms <= bound:
+            return str(bound)
+    return _OVERFLOW_BUCKET
+
+
+def observe_latencies(name: str, redis=None, **stages_ms: Optional[float]) -> None:
+    """
+    Aşama gecikmelerini (ms) içinde bulunulan saatin histogramına ekler.
+    None veya negatif (saat kayması) değerler atlanır; yazım incr_counters gibi
+    tek pipeline'dır ve hataları yutulur.
+    """
+    fields: Dict[str, int] = {}
+    for stage, value in stages_ms.items():
+        if value is None or value < 0:
+            continue
+        fields[f"{stage}:le:{_bucket_label(value)}"] = 1
+        fields[f"{stage}:count"] = 1
+        fields[f"{stage}:sum_ms"] = int(round(value))
+    incr_counters(name, redis=redis, **fields)
+
+
+def summarize_latencies(rows: Sequence[Dict], stage: str, slo_ms: Optional[float] = None) -> Dict[str, Optional[float]]:
+    """
+    read_counters satırlarından bir aşamanın özeti: adet, ortalama ve kova üst
+    sınırından kestirilen p50/p95/p99 (taşma kovası için None). slo_ms verilirse
+    SLO sınırı içindeki oran (sınır bir kova sınırı olmalı).
+    """
+    buckets = {label: 0 for label in [*map(str, LATENCY_BUCKETS_MS), _OVERFLOW_BUCKET]}
+    count = total_ms = 0
+    for row in rows:
+        count += row.get(f"{stage}:count", 0)
+        total_ms += row.get(f"{stage}:sum_ms", 0)
+        for label in buckets:
+            buckets[label] += row.get(f"{stage}:le:{label}", 0)
+
+    def quantile(q: float) -> Optional[float]:
+        if not count:
+            return None
+        seen = 0
+        for label, n in buckets.items():
+            seen += n
+            if seen >= q * count:
+                return None if label == _OVERFLOW_BUCKET else float(label)
+        return None
+
+    summary: Dict[str, Optional[float]] = {
+        "count": count,
+        "mean_ms": round(total_ms / count, 1) if count else None,
+        "p50_ms": quantile(0.50),
+        "p95_ms": quantile(0.95),
+        "p99_ms": quantile(0.99),
+    }
+    if slo_ms is not None:
+        within = sum(n for label, n in buckets.items() if label != _OVERFLOW_BUCKET and float(label) <= slo_ms)
+        summary["within_slo"] = round(within / count, 4) if count else None
+    return summary
@@ -0,0 +1,190 @@
+"""
+Transactional outbox — deprem ingest'ini bildirim teslimatından ayırır.
+
+Ingest, deprem satırlarıyla aynı transaction'da kanal başına (push, ws) birer
+outbox satırı yazar ve commit eder; teslimat app.tasks.outbox.drain_outbox ile
+kanal başına bağımsız worker'larda yapılır. Böylece yavaş bir FCM gönderimi
+sonraki fetch'i geciktirmez.
+
+Satırlar FOR UPDATE SKIP LOCKED ile kiralanır (OUTBOX_LEASE_SECONDS); worker
+teslimattan önce ölürse kira dolunca satır yeniden alınır (en az bir kez).
+Uzun süren batch'lerde (ulusal push fanout'u) her olay teslim edilir edilmez
+işaretlenir ve kalanların kirası uzatılır (settle), böylece kira batch ortasında
+dolup satırlar ikinci kez alınmaz.
+Tekrar teslimat Redis'teki outbox:done:<idempotency_key> işaretiyle atlanır.
+rules.md: type hints, logging, magic number yok.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.notification_outbox import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PUSH = "push"              # M<ALARM_MIN_MAGNITUDE hedefli push (varsayılan kuyruk)
+CHANNEL_PUSH_ALARM = "push_alarm"  # M≥ALARM_MIN_MAGNITUDE hedefli push + EARTHQUAKE_CONFIRMED (alarm kuyruğu)
+CHANNEL_WS = "ws"
+CHANNELS = (CHANNEL_PUSH, CHANNEL_PUSH_ALARM, CHANNEL_WS)
+
+EVENT_EARTHQUAKE = "earthquake.new"
+# M≥ALARM_MIN_MAGNITUDE için ayrı satır: alarm ve hedefli push ayrı settle edilir
+EVENT_EARTHQUAKE_CONFIRMED = "earthquake.confirmed"
+
+DONE_KEY_PREFIX = "outbox:done:"
+
+
+@dataclass
+class OutboxEvent:
+    """Kiralanmış (teslim edilecek) outbox satırı."""
+
+    id: int
+    idempotency_key: str
+    event_type: str
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: datetime
+
+
+def idempotency_key(channel: str, event_type: str, aggregate_id: str) -> str:
+    return f"{channel}:{event_type}:{aggregate_id}"
+
+
+def push_channel(magnitude: float) -> str:
+    """Deprem push'unun kanalı: alarm büyüklüğündekiler ayrı kanalda (ve kuyrukta)."""
+    return CHANNEL_PUSH_ALARM if magnitude >= settings.ALARM_MIN_MAGNITUDE else CHANNEL_PUSH
+
+
+def channel_queue(channel: str) -> str:
+    """Kanalın boşaltma görevinin kuyruğu: push_alarm alarm worker'ında, diğerleri varsayılanda."""
+    return settings.ALARM_QUEUE if channel == CHANNEL_PUSH_ALARM else "default"
+
+
+def add_events(session: Session, event_type: str, aggregate_id: str, payloads: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Olayı kanal başına outbox'a ekler (commit çağıranın transaction'ında).
+
+    Args:
+        payloads: kanal → o kanalın teslim edeceği veri.
+    """
+    for channel, payload in payloads.items():
+        session.add(NotificationOutbox(
+            channel=channel,
+            event_type=event_type,
+            idempotency_key=idempotency_key(channel, event_type, aggregate_id),
+            payload=payload,
+        ))
+
+
+def claim_batch(session: Session, channel: str, limit: Optional[int] = None) -> List[OutboxEvent]:
+    """
+    Kanalın teslim bekleyen en eski satırlarını kiralar (attempts+1, available_at
+    kira sonuna alınır). Eşzamanlı worker'lar SKIP LOCKED ile farklı satırlar alır;
+    kiralama çağıranın commit'iyle kalıcı olur.
+    """
+    pending = (
+        select(NotificationOutbox.id)
+        .where(
+            NotificationOutbox.channel == channel,
+            NotificationOutbox.delivered_at.is_(None),
+            NotificationOutbox.available_at <= func.now(),
+            NotificationOutbox.attempts < settings.OUTBOX_MAX_ATTEMPTS,
+        )
+        .order_by(NotificationOutbox.id)
+        .limit(limit or settings.OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    result = session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(pending))
+        .values(
+            attempts=NotificationOutbox.attempts + 1,
+            available_at=func.now() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+        )
+        .returning(
+            NotificationOutbox.id,
+            NotificationOutbox.idempotency_key,
+            NotificationOutbox.event_type,
+            NotificationOutbox.payload,
+            NotificationOutbox.attempts,
+            NotificationOutbox.created_at,
+        )
+    )
+    return sorted((OutboxEvent(*row) for row in result.all()), key=lambda e: e.id)
+
+
+def mark_delivered(session: Session, ids: Iterable[int]) -> None:
+    ids = list(ids)
+    if ids:
+        session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(ids))
+            .values(delivered_at=func.now(), last_error=None)
+        )
+
+
+def extend_lease(session: Session, ids: Iterable[int]) -> None:
+    """Henüz teslim edilmemiş kiralı satırların kirasını OUTBOX_LEASE_SECONDS kadar yeniler."""
+    ids = list(ids)
+    if ids:
+        session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(ids), NotificationOutbox.delivered_at.is_(None))
+            .values(available_at=func.now() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS))
+        )
+
+
+def mark_failed(session: Session, event: OutboxEvent, error: str) -> None:
+    """Satırı üstel geri çekilmeyle yeniden denemeye bırakır (OUTBOX_MAX_ATTEMPTS'e kadar)."""
+    delay = min(
+        settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** max(event.attempts - 1, 0),
+        settings.OUTBOX_RETRY_MAX_SECONDS,
+    )
+    session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id == event.id)
+        .values(available_at=func.now() + timedelta(seconds=delay), last_error=error[:500])
+    )
+    if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        logger.error("Outbox olayı denemeler tükendi: %s → %s", event.idempotency_key, error)
+
+
+def purge_delivered(session: Session) -> int:
+    """OUTBOX_RETENTION_HOURS'tan eski teslim edilmiş satırları siler."""
+    result = session.execute(
+        delete(NotificationOutbox).where(
+            NotificationOutbox.delivered_at < func.now() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        )
+    )
+    return result.rowcount or 0
+
+
+def filter_undelivered(redis, events: List[OutboxEvent]) -> List[OutboxEvent]:
+    """Daha önce teslim edildiği işaretlenmiş olayları çıkarır (Redis yoksa hepsi döner)."""
+    if not events or redis is None:
+        return events
+    try:
+        done = redis.mget([DONE_KEY_PREFIX + e.idempotency_key for e in events])
+    except Exception as exc:
+        logger.warning("Outbox tekilleştirme okunamadı: %s", exc)
+        return events
+    return [e for e, flag in zip(events, done) if not flag]
+
+
+def remember_delivered(redis, events: List[OutboxEvent]) -> None:
+    """Teslim edilen olayların anahtarlarını OUTBOX_DEDUPE_TTL_SECONDS boyunca işaretler."""
+    if not events or redis is None:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for event in events:
+            pipe.set(DONE_KEY_PREFIX + event.idempotency_key, 1, ex=settings.OUTBOX_DEDUPE_TTL_SECONDS)
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("Outbox teslim işareti yazılamadı: %s", exc)
@@ -0,0 +1,401 @@
+"""
+Push kitle segmentleri — deprem hedeflemesi için Redis'te materyalize kitle.
+
+Her ingest turunda tüm kullanıcıları (fcm_token + selectin tercihler) taramak
+yerine token'lar Redis SET'lerinde tutulur:
+
+  {aud}:seg:<hücre>:<kademe>  → token SET'i. Hücre: konumun GeoHash'i
+                                (PUSH_AUDIENCE_GEOHASH_PRECISION), konumsuz
+                                kullanıcılar için "-". Kademe: min_magnitude'un
+                                PUSH_AUDIENCE_TIER_STEP'e aşağı yuvarlanmışı.
+  {aud}:segments              → mevcut "<hücre>:<kademe>" segmentlerinin indeksi
+  {aud}:disabled              → push_enabled=False kullanıcıların token'ları
+  {aud}:member:<user_id>      → kullanıcının güncel "<segment>|<token>" kaydı
+  {aud}:ready                 → tam kurulum tamamlandı işareti (yoksa çağıran
+                                tablo taramasına döner ve kurulumu tetikler)
+
+Kitle; FCM token kaydı, konum ve tercih güncellemelerinde artımlı
+(refresh_user_audience), geçersiz token temizliğinde ve periyodik tam kurulumda
+(app.tasks.push_audience) toplu olarak güncellenir. Deprem hedeflemesi: episantra
+en yakın hücre noktasında beklenen MMI ≥ X olan hücreler seçilir, her hücrenin
+kademe ≤ M segmentleri SUNIONSTORE ile birleştirilip disabled ile SDIFF alınır —
+tek MULTI turu.
+
+Kademe aşağı yuvarlandığından min_magnitude'u adımın katı olmayan kullanıcı en
+fazla bir adım küçük depremleri de alabilir (eksik değil fazla uyarı). Tüm
+anahtarlar {aud} hash tag'ini paylaşır; çok anahtarlı komutlar Redis Cluster'da
+da tek slot'ta çalışır.
+rules.md: type hints, logging, magic number yasak.
+"""
+
+import logging
+import math
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.redis import get_redis
+from app.models.notification_pref import NotificationPref
+from app.models.user import User
+from app.utils.geo import geohash_bounds, geohash_encode
+
+if TYPE_CHECKING:
+    from app.services.intensity_grid import IntensityRaster
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "{aud}"
+SEGMENTS_KEY = f"{_PREFIX}:segments"
+DISABLED_KEY = f"{_PREFIX}:disabled"
+READY_KEY = f"{_PREFIX}:ready"
+REBUILD_CLAIM_KEY = f"{_PREFIX}:rebuild_claimed"
+MEMBER_KEY_PATTERN = f"{_PREFIX}:member:*"
+NO_CELL = "-"
+DEFAULT_MIN_MAGNITUDE: float = 3.0   # NotificationPref.min_magnitude varsayılanı
+_MEMBER_SEP = "|"                    # FCM token'larında geçmeyen ayraç
+_TIER_EPSILON: float = 1e-9          # 0.3 / 0.1 = 2.999… kayan nokta hatası
+_REBUILD_CLAIM_TTL_SECONDS: int = 600
+_WATCH_RETRIES: int = 5              # Üye kaydı yarışında MULTI yeniden deneme sayısı
+
+
+@dataclass(frozen=True)
+class Membership:
+    """Kullanıcının kitledeki yeri."""
+
+    segment: str    # "<hücre>:<kademe>"
+    token: str
+    disabled: bool
+
+
+@dataclass(frozen=True)
+class AudienceCell:
+    """Bir hücrenin hedeflenen token'ları."""
+
+    cell: str
+    tokens: List[str]
+
+    def center(self) -> Optional[Tuple[float, float]]:
+        """Hücre merkezi (konumsuz segment için None)."""
+        if self.cell == NO_CELL:
+            return None
+        lat_min, lat_max, lon_min, lon_max = geohash_bounds(self.cell)
+        return (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+
+
+def tier_for(min_magnitude: float) -> str:
+    """min_magnitude'u kademe etiketine ("3.5") yuvarlar."""
+    step = settings.PUSH_AUDIENCE_TIER_STEP
+    return f"{math.floor(min_magnitude / step + _TIER_EPSILON) * step:.1f}"
+
+
+def membership_for(
+    token: Optional[str],
+    latitude: Optional[float],
+    longitude: Optional[float],
+    min_magnitude: Optional[float],
+    push_enabled: Optional[bool],
+) -> Optional[Membership]:
+    """Kullanıcı alanlarından segment üyeliği; token yoksa None (kitleden çıkar)."""
+    if not token:
+        return None
+    if latitude is not None and longitude is not None:
+        cell = geohash_encode(latitude, longitude, settings.PUSH_AUDIENCE_GEOHASH_PRECISION)
+    else:
+        cell = NO_CELL
+    tier = tier_for(DEFAULT_MIN_MAGNITUDE if min_magnitude is None else min_magnitude)
+    return Membership(f"{cell}:{tier}", token, push_enabled is False)
+
+
+def audience_query() -> Select:
+    """membership_for alanlarını (user_id ile) veren sorgu; tercih kaydı yoksa NULL."""
+    return (
+        select(
+            User.id, User.fcm_token, User.latitude, User.longitude,
+            NotificationPref.min_magnitude, NotificationPref.push_enabled,
+        )
+        .outerjoin(NotificationPref, NotificationPref.user_id == User.id)
+    )
+
+
+def _segment_key(segment: str) -> str:
+    return f"{_PREFIX}:seg:{segment}"
+
+
+def _member_key(user_id: int) -> str:
+    return f"{_PREFIX}:member:{user_id}"
+
+
+def member_user_id(key: str) -> int:
+    """{aud}:member:<id> anahtarından kullanıcı kimliği."""
+    return int(key.rsplit(":", 1)[1])
+
+
+def _queue_move(pipe, user_id: int, old: Optional[str], new: Optional[Membership]) -> None:
+    """Eski üyeliği silip yenisini ekleyen komutları pipeline'a ekler (sync/async ortak)."""
+    if old:
+        segment, _, token = old.partition(_MEMBER_SEP)
+        pipe.srem(_segment_key(segment), token)
+        pipe.srem(DISABLED_KEY, token)
+    if new is None:
+        pipe.delete(_member_key(user_id))
+        return
+    pipe.sadd(_segment_key(new.segment), new.token)
+    pipe.sadd(SEGMENTS_KEY, new.segment)
+    if new.disabled:
+        pipe.sadd(DISABLED_KEY, new.token)
+    pipe.set(_member_key(user_id), f"{new.segment}{_MEMBER_SEP}{new.token}")
+
+
+def _member_keys(changes: Sequence[Tuple[int, Optional[Membership]]]) -> List[str]:
+    return [_member_key(user_id) for user_id, _ in changes]
+
+
+def _queue_moves(pipe, changes: Sequence[Tuple[int, Optional[Membership]]], olds: Sequence[Optional[str]]) -> None:
+    pipe.multi()
+    for (user_id, new), old in zip(changes, olds):
+        _queue_move(pipe, user_id, old, new)
+
+
+async def apply_memberships(redis, changes: Sequence[Tuple[int, Optional[Membership]]]) -> None:
+    """
+    (user_id, yeni üyelik) değişikliklerini tek MGET + tek MULTI ile uygular.
+    Üye kayıtları WATCH'lanır: MGET ile EXEC arasında aynı kullanıcıyı başka bir
+    güncelleme taşırsa EXEC düşer ve güncel kayıtla yeniden denenir (aksi halde
+    aradaki token eski segmentte kalırdı).
+    """
+    if not changes:
+        return
+    keys = _member_keys(changes)
+    for _ in range(_WATCH_RETRIES):
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(*keys)
+                _queue_moves(pipe, changes, await pipe.mget(keys))
+                await pipe.execute()
+                return
+            except WatchError:
+                continue
+    raise WatchError(f"Push kitlesi {_WATCH_RETRIES} denemede güncellenemedi")
+
+
+def apply_memberships_sync(redis, changes: Sequence[Tuple[int, Optional[Membership]]]) -> None:
+    """apply_memberships'in senkron (Celery) karşılığı."""
+    if not changes:
+        return
+    keys = _member_keys(changes)
+    for _ in range(_WATCH_RETRIES):
+        with redis.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(*keys)
+                _queue_moves(pipe, changes, pipe.mget(keys))
+                pipe.execute()
+                return
+            except WatchError:
+                continue
+    raise WatchError(f"Push kitlesi {_WATCH_RETRIES} denemede güncellenemedi")
+
+
+def prune_unreferenced_sync(redis, batch_size: int) -> int:
+    """
+    Hiçbir üye kaydının göstermediği token'ları segmentlerden ve disabled'dan siler
+    (tam kurulumun son adımı). Segmentlerin anlık görüntüsü üye kayıtlarından
+    ÖNCE alınır: görüntüdeki bir token'ı ekleyen MULTI üye kaydını da yazdığından
+    eşzamanlı artımlı güncellemenin eklediği token referanssız sayılmaz.
+    """
+    segment_keys = [_segment_key(segment) for segment in redis.smembers(SEGMENTS_KEY)]
+    pipe = redis.pipeline(transaction=False)
+    for key in segment_keys + [DISABLED_KEY]:
+        pipe.smembers(key)
+    snapshot = dict(zip(segment_keys + [DISABLED_KEY], pipe.execute()))
+
+    referenced: Dict[str, set] = {}
+    keys = list(redis.scan_iter(match=MEMBER_KEY_PATTERN, count=batch_size))
+    for start in range(0, len(keys), batch_size):
+        for record in redis.mget(keys[start:start + batch_size]):
+            if record:
+                segment, _, token = record.partition(_MEMBER_SEP)
+                referenced.setdefault(_segment_key(segment), set()).add(token)
+                referenced.setdefault(DISABLED_KEY, set()).add(token)
+
+    pipe = redis.pipeline(transaction=False)
+    pruned = 0
+    for key, tokens in snapshot.items():
+        orphans = set(tokens) - referenced.get(key, set())
+        if orphans:
+            pipe.srem(key, *orphans)
+            pruned += len(orphans)
+    pipe.execute()
+    return pruned
+
+
+async def refresh_user_audience(db: AsyncSession, user_id: int) -> None:
+    """
+    Kullanıcının kitle kaydını DB'deki güncel token/konum/tercihle eşitler.
+    Endpoint'lerde commit sonrası çağrılır; silinen kullanıcı kitleden çıkar.
+    Redis hatası isteği bozmaz — periyodik tam kurulum kaymayı onarır.
+    """
+    row = (await db.execute(audience_query().where(User.id == user_id))).one_or_none()
+    membership = membership_for(*row[1:]) if row else None
+    try:
+        await apply_memberships(await get_redis(), [(user_id, membership)])
+    except (RedisError, OSError) as exc:
+        logger.warning("Push kitlesi güncellenemedi: user_id=%d hata=%s", user_id, exc)
+
+
+async def is_ready(redis) -> bool:
+    """Tam kurulum en az bir kez tamamlandı mı?"""
+    return bool(await redis.exists(READY_KEY))
+
+
+async def claim_rebuild(redis) -> bool:
+    """Kitle hazır değilken yalnız bir yeniden kurulum kuyruğa alınsın diye kısa süreli kilit."""
+    return bool(await redis.set(REBUILD_CLAIM_KEY, "1", nx=True, ex=_REBUILD_CLAIM_TTL_SECONDS))
+
+
+def felt_cells(cells: Sequence[str], raster: "IntensityRaster", min_mmi: float) -> List[str]:
+    """
+    Episantra en yakın noktasında beklenen MMI ≥ min_mmi olan hücreler.
+    Hücre içindeki en yüksek şiddet değerlendirildiğinden sınır hücreleri dışarıda kalmaz.
+    """
+    located = [c for c in cells if c != NO_CELL]
+    if not located:
+        return []
+    bounds = np.array([geohash_bounds(c) for c in located])
+    lats = np.clip(raster.latitude, bounds[:, 0], bounds[:, 1])
+    lons = np.clip(raster.longitude, bounds[:, 2], bounds[:, 3])
+    hits = raster.at_least(lats, lons, min_mmi).tolist()
+    return [cell for cell, hit in zip(located, hits) if hit]
+
+
+async def resolve_audience(
+    redis,
+    magnitude: Optional[float] = None,
+    raster: Optional["IntensityRaster"] = None,
+    min_mmi: float = 0.0,
+    include_disabled: bool = False,
+) -> List[AudienceCell]:
+    """
+    Hedef kitleyi hücre bazında döner.
+
+    Args:
+        magnitude: Verilirse yalnız kademesi ≤ magnitude olan segmentler.
+        raster: Verilirse yalnız hissedilir hücreler (konumsuz kullanıcılar her zaman dahil).
+        min_mmi: raster için beklenen en düşük MMI.
+        include_disabled: True ise push_enabled=False kullanıcılar da dahil (onaylı alarm).
+    """
+    by_cell: Dict[str, List[str]] = {}
+    for segment in await redis.smembers(SEGMENTS_KEY):
+        cell, _, tier = segment.rpartition(":")
+        if magnitude is not None and float(tier) > magnitude + _TIER_EPSILON:
+            continue
+        by_cell.setdefault(cell, []).append(_segment_key(segment))
+    if raster is not None:
+        wanted = set(felt_cells(list(by_cell), raster, min_mmi)) | {NO_CELL}
+        by_cell = {cell: keys for cell, keys in by_cell.items() if cell in wanted}
+    if not by_cell:
+        return []
+
+    cells = list(by_cell)
+    pipe = redis.pipeline(transaction=True)
+    if include_disabled:
+        for cell in cells:
+            pipe.sunion(by_cell[cell])
+        members = await pipe.execute()
+    else:
+        scratch = f"{_PREFIX}:tmp:{uuid.uuid4().hex}"
+        for cell in cells:
+            pipe.sunionstore(scratch, by_cell[cell])
+            pipe.sdiff([scratch, DISABLED_KEY])
+        pipe.delete(scratch)
+        members = (await pipe.execute())[1:-1:2]
+    return [AudienceCell(cell, list(tokens)) for cell, tokens in zip(cells, members) if tokens]
+
+
+# ─── Hedefleme arayüzü (segmentler veya tablo taraması) ──────────────────────
+
+Coords = Optional[Tuple[float, float]]
+
+
+class SegmentAudience:
+    """Redis segmentlerinden hedefleme (kitle hazırken)."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def targets(self, magnitude: float, raster: "IntensityRaster") -> List[str]:
+        """Kademe ≤ M, hissedilir hücrede ve push'u açık kullanıcıların token'ları."""
+        cells = await resolve_audience(self.redis, magnitude, raster, settings.INTENSITY_ALERT_MIN_MMI)
+        return [token for cell in cells for token in cell.tokens]
+
+    async def everyone(self) -> Tuple[List[str], List[Coords]]:
+        """Tüm token'lar; konum hücre merkezidir (S dalgası geri sayımı için yeterli)."""
+        cells = await resolve_audience(self.redis, include_disabled=True)
+        return (
+            [token for cell in cells for token in cell.tokens],
+            [cell.center() for cell in cells for _ in cell.tokens],
+        )
+
+
+class TableScanAudience:
+    """
+    Kitle hazır olmadığında kullanılan tablo taraması
+    (fcm_token'ı olan tüm kullanıcılar, tercihler selectin ile).
+    """
+
+    def __init__(self, users: Sequence[User]):
+        self.users = list(users)
+        self.lats = np.array([np.nan if u.latitude is None else u.latitude for u in self.users], dtype=float)
+        self.lons = np.array([np.nan if u.longitude is None else u.longitude for u in self.users], dtype=float)
+
+    @classmethod
+    def load(cls) -> "TableScanAudience":
+        from app.database import SyncSessionLocal
+
+        with SyncSessionLocal() as session:
+            # Note: notification_pref zaten lazy='selectin' olduğu için yüklenecektir
+            users = session.execute(select(User).where(User.fcm_token.isnot(None))).scalars().all()
+        return cls(users)
+
+    async def targets(self, magnitude: float, raster: "IntensityRaster") -> List[str]:
+        """Tercihe ve beklenen şiddete uyan token'lar."""
+        tokens: List[str] = []
+        for user, mmi in zip(self.users, raster.mmi_at(self.lats, self.lons).tolist()):
+            pref = user.notification_pref
+            min_mag = pref.min_magnitude if pref else DEFAULT_MIN_MAGNITUDE
+            enabled = pref.push_enabled if pref else True
+            if not enabled or magnitude < min_mag:
+                continue
+            # Konumu bilinen kullanıcı yalnızca hissedilebilir şiddette bildirim alır
+            if not math.isnan(mmi) and mmi < settings.INTENSITY_ALERT_MIN_MMI:
+                continue
+            tokens.append(user.fcm_token)
+        return tokens
+
+    async def everyone(self) -> Tuple[List[str], List[Coords]]:
+        """Tüm token'lar ve S dalgası geri sayımı için konumları."""
+        return [u.fcm_token for u in self.users], [
+            (u.latitude, u.longitude) if u.latitude is not None and u.longitude is not None else None
+            for u in self.users
+        ]
+
+
+async def load_audience(redis) -> "SegmentAudience | TableScanAudience":
+    """
+    Kitle hazırsa segmentleri, değilse tablo taramasını döner; ikinci durumda
+    (Redis erişilebilirse) tek bir tam kurulum kuyruğa alınır.
+    """
+    try:
+        if await is_ready(redis):
+            return SegmentAudience(redis)
+        if await claim_rebuild(redis):
+            from app.tasks.push_audience import rebuild_push_audience
+            rebuild_push_audience.delay()
+    except Exception as exc:
+        logger.warning("Push kitlesi okunamadı, tablo taramasına dönülüyor: %s", exc)
+    return TableScanAudience.load()
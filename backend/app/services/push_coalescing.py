@@ -0,0 +1,248 @@
+"""
+Artçı fırtınasında kullanıcı başına push birleştirme.
+
+Büyük bir depremden sonra saatte onlarca artçı yayımlanır; her biri için ayrı
+NEW_EARTHQUAKE push'u (ve her M≥4 için nükleer alarm) en yoğun anda FCM
+hacmini katlar. Token başına pencere (COALESCE_WINDOW_SECONDS):
+
+  - Penceresi olmayan token'a deprem hemen gider ve pencere açılır.
+  - Pencere içindeki sonraki depremler bekletilir; pencere sonunda tek özet
+    push ("5 yeni deprem, en büyüğü M4.6") gönderilir (flush_coalesced_pushes).
+  - M ≥ COALESCE_BYPASS_MAGNITUDE birleştirilmez: herkese hemen gider ve
+    pencereyi yeniler (ardından gelen artçılar özetlenir).
+
+Anahtarlar ({coal} hash tag'i, Redis Cluster'da tek slot):
+  {coal}:win:<token>   → "<pencere bitişi (epoch sn)>:<pencereyi açan deprem id>", TTL = pencere
+  {coal}:pend:<token>  → bekleyen depremler ZSET (üye: deprem id, skor: M)
+  {coal}:due           → özet zamanı gelen token'lar ZSET (skor: bitiş)
+  {coal}:ev:<id>       → özet metni için deprem büyüklüğü/yeri
+  {coal}:alarms        → son nükleer alarmların episantrları ZSET (skor: zaman)
+
+Outbox yeniden denemesi idempotenttir: penceresini aynı deprem açmış token'lar
+yine hemen gönderilecekler sayılır (ilk deneme onlara iletilememiş olabilir),
+kendi özetlerine eklenmez.
+
+Redis hatasında birleştirme devre dışı kalır (fail-open: herkese hemen gönder).
+rules.md: type hints, logging, magic number yasak.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils.geo import haversine_distance_km
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "{coal}"
+DUE_KEY = f"{_PREFIX}:due"
+ALARMS_KEY = f"{_PREFIX}:alarms"
+
+
+def _window_key(token: str) -> str:
+    return f"{_PREFIX}:win:{token}"
+
+
+def _pending_key(token: str) -> str:
+    return f"{_PREFIX}:pend:{token}"
+
+
+def _event_key(event_id: str) -> str:
+    return f"{_PREFIX}:ev:{event_id}"
+
+
+def _window_value(window_end: float, opener_id: str) -> str:
+    return f"{window_end}:{opener_id}"
+
+
+def _parse_window(value: str) -> Tuple[float, str]:
+    """Pencere değeri → (bitiş, açan deprem id)."""
+    end, _, opener_id = value.partition(":")
+    return float(end), opener_id
+
+
+def _chunks(items: Sequence[str]) -> List[Sequence[str]]:
+    size = settings.COALESCE_PIPELINE_CHUNK
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+@dataclass(frozen=True)
+class CoalescedSummary:
+    """Bir token'ın pencere içinde bekletilen depremlerinin özeti."""
+
+    count: int
+    max_magnitude: float
+    location: str
+    event_id: str    # En büyük depremin id'si (aynı özeti alan token'ları gruplar)
+
+
+def is_bypass(magnitude: float) -> bool:
+    return magnitude >= settings.COALESCE_BYPASS_MAGNITUDE
+
+
+async def admit(redis, quake: Dict[str, Any], tokens: List[str], now: Optional[float] = None) -> List[str]:
+    """
+    Hedef token'lardan şimdi gönderilecekleri döner; diğerleri pencerelerinin
+    özetine eklenir.
+
+    Args:
+        quake: id, magnitude, location alanları.
+        tokens: audience.targets çıktısı.
+    """
+    if not tokens:
+        return tokens
+    now = time.time() if now is None else now
+    window = settings.COALESCE_WINDOW_SECONDS
+    window_end = now + window
+    window_value = _window_value(window_end, quake["id"])
+    bypass = is_bypass(quake["magnitude"])
+    try:
+        send_now: List[str] = []
+        held = 0
+        for chunk in _chunks(tokens):
+            pipe = redis.pipeline(transaction=False)
+            for token in chunk:
+                pipe.set(_window_key(token), window_value, ex=window, nx=not bypass)
+            opened = await pipe.execute()
+
+            leaders = [t for t, ok in zip(chunk, opened) if ok]
+            followers = [t for t, ok in zip(chunk, opened) if not ok]
+            if followers:
+                # Yeniden deneme: penceresini bu deprem açmışsa token hâlâ lider
+                pipe = redis.pipeline(transaction=False)
+                for token in followers:
+                    pipe.get(_window_key(token))
+                openers = await pipe.execute()
+                own = [bool(v) and _parse_window(v)[1] == str(quake["id"]) for v in openers]
+                leaders.extend(t for t, mine in zip(followers, own) if mine)
+                followers = [t for t, mine in zip(followers, own) if not mine]
+            pipe = redis.pipeline(transaction=False)
+            if leaders:
+                # NX: önceki pencerenin bekleyen özeti varsa onun (daha erken) zamanı korunur
+                pipe.zadd(DUE_KEY, {t: window_end for t in leaders}, nx=True)
+            if followers:
+                pipe.hset(_event_key(quake["id"]), mapping={
+                    "magnitude": quake["magnitude"], "location": quake["location"],
+                })
+                pipe.expire(_event_key(quake["id"]), 2 * window)
+                for token in followers:
+                    pipe.zadd(_pending_key(token), {quake["id"]: quake["magnitude"]})
+                    pipe.expire(_pending_key(token), 2 * window)
+            await pipe.execute()
+            send_now.extend(leaders)
+            held += len(followers)
+    except (RedisError, OSError) as exc:
+        logger.warning("Push birleştirme devre dışı (Redis): %s", exc)
+        return tokens
+    if held:
+        logger.info(
+            "[Birleştirme] M%.1f %s: %d hemen, %d özete eklendi",
+            quake["magnitude"], quake["location"], len(send_now), held,
+        )
+    return send_now
+
+
+async def should_alarm(redis, quake: Dict[str, Any], now: Optional[float] = None) -> bool:
+    """
+    Nükleer alarm (EARTHQUAKE_CONFIRMED) verilsin mi? M<bypass deprem, son
+    pencerede COALESCE_ALARM_RADIUS_KM içinde alarm verilmiş bir depremin
+    artçısı sayılır ve alarm tekrarlanmaz. Aynı depremin kendi kaydı (outbox
+    yeniden denemesi) alarmı engellemez.
+    """
+    now = time.time() if now is None else now
+    try:
+        await redis.zremrangebyscore(ALARMS_KEY, "-inf", now - settings.COALESCE_WINDOW_SECONDS)
+        if not is_bypass(quake["magnitude"]):
+            for member in await redis.zrange(ALARMS_KEY, 0, -1):
+                lat, lon, alarm_id = member.split(":", 2)
+                if alarm_id == str(quake["id"]):
+                    continue
+                distance = haversine_distance_km(float(lat), float(lon), quake["latitude"], quake["longitude"])
+                if distance <= settings.COALESCE_ALARM_RADIUS_KM:
+                    logger.info(
+                        "[Birleştirme] M%.1f %s: %.0f km içinde yakın tarihli alarm var, nükleer alarm atlandı",
+                        quake["magnitude"], quake["location"], distance,
+                    )
+                    return False
+        await redis.zadd(ALARMS_KEY, {f"{quake['latitude']}:{quake['longitude']}:{quake['id']}": now})
+        await redis.expire(ALARMS_KEY, settings.COALESCE_WINDOW_SECONDS)
+    except (RedisError, OSError) as exc:
+        logger.warning("Alarm birleştirme kontrolü yapılamadı: %s", exc)
+    return True
+
+
+async def take_due(redis, now: Optional[float] = None) -> List[Tuple[str, CoalescedSummary, List[str]]]:
+    """
+    Pencere sonu gelen token'ların bekleyen depremlerini özetler.
+    Bekleyenler silinmez: token'lar due'da COALESCE_FLUSH_INTERVAL_SECONDS
+    kiralanır ve gönderim başarılıysa ack_due ile temizlenir; gönderim başarısız
+    olursa (veya worker ölürse) kira dolunca sonraki flush yeniden dener.
+    Bekleyeni olmayan token'lar hemen bırakılır.
+
+    Returns:
+        (token, özet, özete giren deprem id'leri) listesi.
+    """
+    now = time.time() if now is None else now
+    tokens = await redis.zrangebyscore(DUE_KEY, "-inf", now)
+    summaries: List[Tuple[str, List[Tuple[str, float]]]] = []
+    idle: List[str] = []
+    for chunk in _chunks(tokens):
+        pipe = redis.pipeline(transaction=False)
+        for token in chunk:
+            pipe.zrange(_pending_key(token), 0, -1, withscores=True)
+        taken: List[str] = []
+        for token, pending in zip(chunk, await pipe.execute()):
+            if pending:
+                summaries.append((token, pending))
+                taken.append(token)
+            else:
+                idle.append(token)
+        if taken:
+            lease = now + settings.COALESCE_FLUSH_INTERVAL_SECONDS
+            await redis.zadd(DUE_KEY, {token: lease for token in taken}, xx=True)
+    await _release(redis, idle)
+
+    event_ids = sorted({max(p, key=lambda e: e[1])[0] for _, p in summaries})
+    pipe = redis.pipeline(transaction=False)
+    for event_id in event_ids:
+        pipe.hget(_event_key(event_id), "location")
+    locations = dict(zip(event_ids, await pipe.execute()))
+    result = []
+    for token, pending in summaries:
+        top_id, top_mag = max(pending, key=lambda e: e[1])
+        summary = CoalescedSummary(len(pending), top_mag, locations.get(top_id) or "", top_id)
+        result.append((token, summary, [event_id for event_id, _ in pending]))
+    return result
+
+
+async def ack_due(redis, sent: Sequence[Tuple[str, Sequence[str]]]) -> None:
+    """
+    Özeti iletilen token'ların gönderilen depremlerini siler ve token'ları
+    due'dan bırakır (gönderim sırasında eklenen depremler bir sonraki özete kalır).
+
+    Args:
+        sent: (token, take_due'nun verdiği deprem id'leri).
+    """
+    for chunk in _chunks(list(sent)):
+        pipe = redis.pipeline(transaction=False)
+        for token, event_ids in chunk:
+            pipe.zrem(_pending_key(token), *event_ids)
+        await pipe.execute()
+    await _release(redis, [token for token, _ in sent])
+
+
+async def _release(redis, tokens: Sequence[str]) -> None:
+    """Token'ları due'dan çıkarır; yeni penceresi açık olanlar o pencerenin sonuna yeniden eklenir."""
+    for chunk in _chunks(tokens):
+        pipe = redis.pipeline(transaction=True)
+        for token in chunk:
+            pipe.get(_window_key(token))
+        pipe.zrem(DUE_KEY, *chunk)
+        windows = (await pipe.execute())[:-1]
+        reopen = {token: _parse_window(value)[0] for token, value in zip(chunk, windows) if value is not None}
+        if reopen:
+            await redis.zadd(DUE_KEY, reopen, nx=True)
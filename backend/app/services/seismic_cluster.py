@@ -2,69 +2,323 @@
 Sismik cluster servisi — coğrafi ve zamansal kümeleme.
 Yakın zamanda ve yakın konumda gelen raporları gruplayarak
 olası depremi tespit eder.
+
+Kümeleme Redis üzerinde akış halinde (streaming) yapılır — rapor başına DB
+sorgusu yoktur:
+  - Mekânsal grid: ~50 km'lik hücreler, her hücre aktif cluster'ları
+    son aktivite zamanına göre sıralı (ZSET) tutar.
+  - Yeni rapor komşu hücrelerdeki aktif cluster'lardan merkezi 50 km
+    içinde olana katılır (DBSCAN benzeri artımlı kümeleme), yoksa INCR ile
+    atomik yeni cluster ID alır.
+  - Cluster açılışı hücre başına SET NX "claim" ile korunur: aynı anda gelen
+    ilk raporların hepsi arayıp bulamasa da hücrede tek cluster açılır, diğerleri
+    ona katılır (yoksa gerçek depremde tekil cluster'lar eşiğe hiç ulaşmaz).
+  - Raporlar bekleme listesine yazılır; persist_seismic_reports task'ı
+    toplu (batch) olarak seismic_reports tablosuna aktarır.
+  - Cluster özetleri (merkez, rapor/cihaz sayısı, tepe ivme) rapor geldikçe
+    artımlı güncellenir; aktif cluster indeksi (ZSET) sayesinde anlık görüntü
+    rapor trafiğinden bağımsız, aktif cluster sayısıyla orantılı maliyetlidir.
 rules.md: max 50 satır/fonksiyon, type hints, logging.
 """
 
+import json
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Optional
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
 
+from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
 from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.seismic_report import SeismicReport
+from app.utils.epicenter import EpicenterSolution, locate_epicenter
+from app.utils.geo import haversine_distance_km
 
 logger = logging.getLogger(__name__)
 
 # Sabitler — rules.md: magic number yasak
-_RADIUS_DEG: float = 50.0 / 111.0   # ~50 km → derece cinsinden
+_RADIUS_KM: float = 50.0
+_RADIUS_DEG: float = _RADIUS_KM / 111.0   # ~50 km → derece cinsinden (grid hücre boyu)
 _TIME_WINDOW_SEC: int = 60
 _MIN_CLUSTER_SIZE: int = 3
+_CLUSTER_TTL_SEC: int = 10 * 60           # Cluster durumu Redis'te 10 dk tutulur
+_CLAIM_TTL_SEC: int = 5                   # Yeni cluster hücre ZSET'ine yazılana kadarki yarış penceresi
+
+# Redis anahtarları
+CELL_PREFIX = "seis:cell"
+CLUSTER_PREFIX = "seis:cluster"
+CLUSTER_SEQ_KEY = "seis:cluster_seq"
+PENDING_REPORTS_KEY = "seis:pending_reports"
+# İşlenen batch (LMOVE hedefi); hash tag bekleme listesiyle aynı slot'u verir (Redis Cluster)
+PROCESSING_REPORTS_KEY = "{seis:pending_reports}:processing"
+ACTIVE_CLUSTERS_KEY = "seis:active_clusters"  # ZSET: cluster_id → son rapor zamanı
+
+
+@dataclass
+class ClusterAssignment:
+    """Bir raporun kümeleme sonucu."""
+
+    cluster_id: int
+    cluster_size: int
+    center_latitude: float
+    center_longitude: float
+
 
+@dataclass(frozen=True)
+class ClusterSummary:
+    """Aktif cluster'ın artımlı tutulan özeti (GET /seismic/clusters)."""
 
-async def find_nearby_cluster_id(
-    latitude: float,
-    longitude: float,
-    reported_at: datetime,
-    db: AsyncSession,
-) -> Optional[int]:
+    cluster_id: int
+    report_count: int
+    device_count: int
+    center_latitude: float
+    center_longitude: float
+    max_acceleration: float
+    first_report_at: datetime
+    last_report_at: datetime
+
+
+def diff_cluster_snapshots(
+    previous: Dict[int, ClusterSummary],
+    current: Dict[int, ClusterSummary],
+) -> Tuple[List[ClusterSummary], List[int]]:
     """
-    Son 60 saniye içinde 50 km yarıçapındaki mevcut cluster'ı döner.
-    Yoksa None döner.
+    İki anlık görüntü arasındaki farkı döner.
+
+    Returns:
+        (yeni veya değişen cluster'lar, artık aktif olmayan cluster ID'leri)
     """
-    since = reported_at - timedelta(seconds=_TIME_WINDOW_SEC)
-    result = await db.execute(
-        select(SeismicReport.cluster_id)
-        .where(
-            SeismicReport.reported_at >= since,
-            SeismicReport.cluster_id.is_not(None),
-            SeismicReport.latitude.between(latitude - _RADIUS_DEG, latitude + _RADIUS_DEG),
-            SeismicReport.longitude.between(longitude - _RADIUS_DEG, longitude + _RADIUS_DEG),
-        )
-        .limit(1)
-    )
-    row = result.scalar_one_or_none()
-    return int(row) if row is not None else None
-
-
-async def get_next_cluster_id(db: AsyncSession) -> int:
-    """Yeni cluster için max+1 ID üretir."""
-    result = await db.execute(
-        select(func.max(SeismicReport.cluster_id))
-    )
-    current_max = result.scalar_one_or_none()
-    return (int(current_max) + 1) if current_max is not None else 1
-
-
-async def get_cluster_size(cluster_id: int, db: AsyncSession) -> int:
-    """Bir cluster'daki benzersiz cihaz sayısını döner."""
-    result = await db.execute(
-        select(func.count(SeismicReport.id)).where(
-            SeismicReport.cluster_id == cluster_id
+    upserts = [s for cid, s in current.items() if previous.get(cid) != s]
+    removed = [cid for cid in previous if cid not in current]
+    return upserts, removed
+
+
+def _cell_index(latitude: float, longitude: float) -> tuple[int, int]:
+    return math.floor(latitude / _RADIUS_DEG), math.floor(longitude / _RADIUS_DEG)
+
+
+def _neighbor_cells(latitude: float, longitude: float) -> List[str]:
+    """Noktanın _RADIUS_KM çevresini kapsayan grid hücre anahtarları."""
+    i, _ = _cell_index(latitude, longitude)
+    lon_span = _RADIUS_DEG / max(math.cos(math.radians(latitude)), 0.1)
+    j_min = math.floor((longitude - lon_span) / _RADIUS_DEG)
+    j_max = math.floor((longitude + lon_span) / _RADIUS_DEG)
+    return [
+        f"{CELL_PREFIX}:{row}:{col}"
+        for row in (i - 1, i, i + 1)
+        for col in range(j_min, j_max + 1)
+    ]
+
+
+def _claim_key(cell: str) -> str:
+    """String: 'cluster_id,lat,lon,ts' — hücrede yeni açılan cluster (SET NX)."""
+    return f"{cell}:claim"
+
+
+def _parse_claim(raw: str, now_ts: float) -> Optional[Tuple[int, float, float]]:
+    """Claim'i çözer; zaman penceresi dışındaysa (eski deprem) None."""
+    cid, lat, lon, ts = raw.split(",")
+    if float(ts) < now_ts - _TIME_WINDOW_SEC:
+        return None
+    return int(cid), float(lat), float(lon)
+
+
+def _cluster_key(cluster_id: int) -> str:
+    return f"{CLUSTER_PREFIX}:{cluster_id}"
+
+
+def _devices_key(cluster_id: int) -> str:
+    """Hash: device_id → 'lat,lon,tetik_ts' (tekil cihaz sayısı + varış zamanları)."""
+    return f"{CLUSTER_PREFIX}:{cluster_id}:devices"
+
+
+def _max_accel_key(cluster_id: int) -> str:
+    """Tek üyeli ZSET — ZADD GT ile tepe ivme atomik olarak güncellenir."""
+    return f"{CLUSTER_PREFIX}:{cluster_id}:max_accel"
+
+
+class SeismicClusterEngine:
+    """
+    Redis tabanlı artımlı sismik kümeleme motoru.
+    Rapor başına ~3 Redis round trip (pipeline), sıfır DB sorgusu.
+    """
+
+    def __init__(self, redis: Union[Redis, RedisCluster]):
+        self._redis = redis
+
+    async def _find_cluster(
+        self, latitude: float, longitude: float, now_ts: float
+    ) -> Optional[int]:
+        """
+        Komşu hücrelerde merkezi _RADIUS_KM içinde olan en yakın aktif cluster.
+        Henüz özeti yazılmamış yeni cluster'lar hücre claim'indeki konumla değerlendirilir.
+        """
+        pipe = self._redis.pipeline(transaction=False)
+        for cell in _neighbor_cells(latitude, longitude):
+            pipe.zrangebyscore(cell, now_ts - _TIME_WINDOW_SEC, "+inf")
+            pipe.get(_claim_key(cell))
+        res = await pipe.execute()
+        claims = (_parse_claim(raw, now_ts) for raw in res[1::2] if raw)
+        claimed = {claim[0]: claim[1:] for claim in claims if claim}
+        candidates = sorted({int(cid) for ids in res[0::2] for cid in ids} | set(claimed))
+        if not candidates:
+            return None
+
+        pipe = self._redis.pipeline(transaction=False)
+        for cid in candidates:
+            pipe.hmget(_cluster_key(cid), "n", "lat_sum", "lon_sum")
+        best: Optional[tuple[float, int]] = None
+        for cid, (n, lat_sum, lon_sum) in zip(candidates, await pipe.execute()):
+            if n:
+                center = float(lat_sum) / int(n), float(lon_sum) / int(n)
+            elif cid in claimed:
+                center = claimed[cid]
+            else:
+                continue
+            dist = haversine_distance_km(latitude, longitude, *center)
+            if dist <= _RADIUS_KM and (best is None or dist < best[0]):
+                best = (dist, cid)
+        return best[1] if best else None
+
+    async def _open_cluster(self, cell: str, latitude: float, longitude: float, now_ts: float) -> int:
+        """
+        Hücrede yeni cluster açar. Aynı anda açan başka rapor claim'i aldıysa ve
+        konumu _RADIUS_KM içindeyse onun cluster'ına katılınır (ayrılan ID boşa
+        gider; ID boşlukları zararsızdır).
+        """
+        cluster_id = await self._allocate_cluster_id()
+        claim = f"{cluster_id},{latitude:.5f},{longitude:.5f},{now_ts:.3f}"
+        if await self._redis.set(_claim_key(cell), claim, nx=True, ex=_CLAIM_TTL_SEC):
+            return cluster_id
+        raw = await self._redis.get(_claim_key(cell))
+        winner = _parse_claim(raw, now_ts) if raw else None
+        if winner and haversine_distance_km(latitude, longitude, *winner[1:]) <= _RADIUS_KM:
+            return winner[0]
+        return cluster_id
+
+    async def _allocate_cluster_id(self) -> int:
+        """
+        INCR ile atomik yeni cluster ID. Sayaç Redis'te yoksa (ilk kurulum,
+        Redis sıfırlanması) DB'deki en büyük cluster_id'den devam eder.
+        """
+        if not await self._redis.exists(CLUSTER_SEQ_KEY):
+            from app.database import AsyncSessionLocal
+            async with AsyncSessionLocal() as db:
+                current_max = (await db.execute(select(func.max(SeismicReport.cluster_id)))).scalar_one_or_none()
+            await self._redis.set(CLUSTER_SEQ_KEY, int(current_max or 0), nx=True)
+        return int(await self._redis.incr(CLUSTER_SEQ_KEY))
+
+    async def add_report(
+        self,
+        device_id: str,
+        peak_acceleration: float,
+        sta_lta_ratio: float,
+        latitude: float,
+        longitude: float,
+        reported_at: datetime,
+        triggered_at: Optional[datetime] = None,
+    ) -> ClusterAssignment:
+        """
+        Raporu kümeye ekler, cluster özetini günceller ve raporu toplu
+        persist için bekleme listesine yazar. triggered_at (cihazın tetik
+        zamanı) yoksa varış zamanı olarak reported_at kullanılır.
+        """
+        now_ts = reported_at.timestamp()
+        cell = f"{CELL_PREFIX}:{':'.join(map(str, _cell_index(latitude, longitude)))}"
+        cluster_id = await self._find_cluster(latitude, longitude, now_ts)
+        if cluster_id is None:
+            cluster_id = await self._open_cluster(cell, latitude, longitude, now_ts)
+
+        ckey = _cluster_key(cluster_id)
+        dkey = _devices_key(cluster_id)
+        pending = {
+            "device_id": device_id,
+            "peak_acceleration": peak_acceleration,
+            "sta_lta_ratio": sta_lta_ratio,
+            "latitude": latitude,
+            "longitude": longitude,
+            "cluster_id": cluster_id,
+            "reported_at": reported_at.isoformat(),
+        }
+
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hincrby(ckey, "n", 1)
+        pipe.hincrbyfloat(ckey, "lat_sum", latitude)
+        pipe.hincrbyfloat(ckey, "lon_sum", longitude)
+        pipe.hsetnx(ckey, "first_at", now_ts)
+        pipe.hset(ckey, "last_at", now_ts)
+        pipe.expire(ckey, _CLUSTER_TTL_SEC)
+        pick_ts = (triggered_at or reported_at).timestamp()
+        pipe.hset(dkey, device_id, f"{latitude:.5f},{longitude:.5f},{pick_ts:.3f}")
+        pipe.expire(dkey, _CLUSTER_TTL_SEC)
+        pipe.hlen(dkey)
+        pipe.zadd(_max_accel_key(cluster_id), {"max": peak_acceleration}, gt=True)
+        pipe.expire(_max_accel_key(cluster_id), _CLUSTER_TTL_SEC)
+        pipe.zadd(cell, {str(cluster_id): now_ts})
+        pipe.zremrangebyscore(cell, "-inf", now_ts - _CLUSTER_TTL_SEC)
+        pipe.expire(cell, _CLUSTER_TTL_SEC)
+        pipe.zadd(ACTIVE_CLUSTERS_KEY, {str(cluster_id): now_ts})
+        pipe.zremrangebyscore(ACTIVE_CLUSTERS_KEY, "-inf", now_ts - _CLUSTER_TTL_SEC)
+        pipe.rpush(PENDING_REPORTS_KEY, json.dumps(pending))
+        res = await pipe.execute()
+
+        n, lat_sum, lon_sum, size = int(res[0]), float(res[1]), float(res[2]), int(res[8])
+        return ClusterAssignment(
+            cluster_id=cluster_id,
+            cluster_size=size,
+            center_latitude=lat_sum / n,
+            center_longitude=lon_sum / n,
         )
-    )
-    count = result.scalar_one_or_none()
-    return int(count) if count else 0
+
+    async def active_clusters(self, now_ts: float) -> List[ClusterSummary]:
+        """
+        Son _TIME_WINDOW_SEC içinde rapor alan cluster'ların özetleri,
+        cihaz sayısına göre azalan sırada. Rapor tablosu taranmaz.
+        """
+        ids = await self._redis.zrangebyscore(ACTIVE_CLUSTERS_KEY, now_ts - _TIME_WINDOW_SEC, "+inf")
+        if not ids:
+            return []
+
+        pipe = self._redis.pipeline(transaction=False)
+        for cid in ids:
+            pipe.hgetall(_cluster_key(int(cid)))
+            pipe.hlen(_devices_key(int(cid)))
+            pipe.zscore(_max_accel_key(int(cid)), "max")
+        res = await pipe.execute()
+
+        summaries = []
+        for idx, cid in enumerate(ids):
+            data, devices, max_accel = res[3 * idx: 3 * idx + 3]
+            if not data or not data.get("n"):
+                continue  # TTL ile silinmiş
+            n = int(data["n"])
+            summaries.append(ClusterSummary(
+                cluster_id=int(cid),
+                report_count=n,
+                device_count=int(devices),
+                center_latitude=float(data["lat_sum"]) / n,
+                center_longitude=float(data["lon_sum"]) / n,
+                max_acceleration=float(max_accel or 0.0),
+                first_report_at=datetime.fromtimestamp(float(data["first_at"]), tz=timezone.utc),
+                last_report_at=datetime.fromtimestamp(float(data["last_at"]), tz=timezone.utc),
+            ))
+        summaries.sort(key=lambda s: s.device_count, reverse=True)
+        return summaries
+
+    async def locate(self, cluster_id: int) -> Optional[EpicenterSolution]:
+        """Cluster cihazlarının varış zamanı farklarından episantr kestirir."""
+        lats, lons, picks = [], [], []
+        for raw in await self._redis.hvals(_devices_key(cluster_id)):
+            try:
+                lat, lon, ts = (float(v) for v in raw.split(","))
+            except ValueError:
+                continue
+            lats.append(lat)
+            lons.append(lon)
+            picks.append(ts)
+        return locate_epicenter(lats, lons, picks)
 
 
 def is_likely_earthquake(cluster_size: int) -> bool:
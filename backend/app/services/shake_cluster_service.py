@@ -1,25 +1,66 @@
 """
 Sarsıntı sinyallerini Redis sliding window ile toplar ve deprem doğrulama mantığını uygular.
 EARTHQUAKE_DETECTION_ALGORITHM.md: 5 sn pencere, aynı bölge (GeoHash), en az 10 cihaz.
+Doğrulamada pencerede biriken cihaz konum/şiddetlerinden episantr ve kaba büyüklük kestirilir;
+yeterli cihazın tetik zamanı varsa episantr varış zamanı farklarından konumlanır.
 """
 
 import logging
+import statistics
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple, Union
 
 from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
 from redis.exceptions import TimeoutError as RedisTimeoutError, RedisError
 
 from app.config import settings
-from app.utils.geo import geohash_encode
+from app.utils.epicenter import MIN_STATIONS, EpicenterSolution, locate_epicenter
+from app.utils.geo import geohash_encode, haversine_distance_km, weighted_centroid
+from app.utils.seismology import estimate_magnitude_from_pga
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ShakeSample:
+    """Pencere içindeki tek cihaz sinyali (konum + opsiyonel şiddet ve tetik zamanı)."""
+
+    latitude: float
+    longitude: float
+    intensity: Optional[float] = None
+    triggered_at: Optional[float] = None  # Cihazın tetik zamanı (epoch sn)
+
+    def encode(self) -> str:
+        """Redis hash değeri: 'lat,lon,intensity,triggered_at' (olmayan alan boş)."""
+        intensity = "" if self.intensity is None else f"{self.intensity:.4f}"
+        triggered_at = "" if self.triggered_at is None else f"{self.triggered_at:.3f}"
+        return f"{self.latitude:.5f},{self.longitude:.5f},{intensity},{triggered_at}"
+
+    @classmethod
+    def decode(cls, raw: str) -> Optional["ShakeSample"]:
+        """encode() çıktısını çözer (eski 3 alanlı biçim dahil); bozuk kayıtta None döner."""
+        try:
+            lat, lon, intensity, *rest = raw.split(",")
+            triggered_at = rest[0] if rest else ""
+            return cls(
+                float(lat), float(lon),
+                float(intensity) if intensity else None,
+                float(triggered_at) if triggered_at else None,
+            )
+        except ValueError:
+            return None
+
+
 @dataclass
 class ConfirmedShakeEvent:
-    """Doğrulanmış deprem olayı (kümeleme sonucu)."""
+    """
+    Doğrulanmış deprem olayı (kümeleme sonucu).
+    latitude/longitude kestirilen episantrdır: location_method "arrival_times" ise
+    varış zamanı farklarından konumlanmıştır (origin_time ve belirsizlik elipsi dolu),
+    "centroid" ise şiddet ağırlıklı küme merkezidir.
+    """
 
     geohash: str
     latitude: float
@@ -27,19 +68,92 @@ class ConfirmedShakeEvent:
     device_count: int
     window_start_ts: int
     timestamp: datetime
+    extent_km: float = 0.0
+    max_intensity: Optional[float] = None
+    estimated_magnitude: Optional[float] = None
+    location_method: str = "centroid"
+    origin_time: Optional[datetime] = None
+    uncertainty_major_km: Optional[float] = None
+    uncertainty_minor_km: Optional[float] = None
+    uncertainty_azimuth_deg: Optional[float] = None
+
+
+def locate_from_arrivals(samples: List[ShakeSample]) -> Optional[EpicenterSolution]:
+    """
+    Tetik zamanı olan örneklerden varış zamanı farklarıyla episantr konumlar.
+    Cihaz sayısı yetersizse veya artıklar SHAKE_LOCATION_MAX_RMS_SECONDS'ı
+    aşıyorsa (tutarsız saatler) None döner.
+    """
+    timed = [s for s in samples if s.triggered_at is not None]
+    if len(timed) < MIN_STATIONS:
+        return None
+    solution = locate_epicenter(
+        [s.latitude for s in timed],
+        [s.longitude for s in timed],
+        [s.triggered_at for s in timed],  # type: ignore[misc]
+        pick_sigma_sec=settings.SHAKE_LOCATION_PICK_SIGMA_SECONDS,
+    )
+    if solution is None or solution.rms_residual_sec > settings.SHAKE_LOCATION_MAX_RMS_SECONDS:
+        return None
+    return solution
+
+
+def estimate_cluster_source(
+    samples: List[ShakeSample],
+    epicenter: Optional[Tuple[float, float]] = None,
+) -> tuple[float, float, float, Optional[float]]:
+    """
+    Pencere örneklerinden episantr, yayılım ve kaba büyüklük kestirir.
+
+    epicenter verilmezse merkez şiddet ağırlıklıdır (şiddeti olmayan cihazın
+    ağırlığı 1.0 kabul edilir, diğerleri şiddet / medyan şiddet). Yayılım merkeze
+    en uzak cihazın mesafesidir. Büyüklük, şiddet bildiren her cihaz için GMPE
+    tersinin medyanıdır.
+
+    Returns:
+        (latitude, longitude, extent_km, estimated_magnitude | None)
+    """
+    if epicenter is not None:
+        lat, lon = epicenter
+    else:
+        intensities = [s.intensity for s in samples if s.intensity is not None and s.intensity > 0]
+        ref = statistics.median(intensities) if intensities else 1.0
+        points = [
+            (s.latitude, s.longitude, (s.intensity / ref) if s.intensity and s.intensity > 0 else 1.0)
+            for s in samples
+        ]
+        lat, lon = weighted_centroid(points)
+
+    distances = [haversine_distance_km(lat, lon, s.latitude, s.longitude) for s in samples]
+    extent_km = max(distances) if distances else 0.0
+
+    magnitudes = [
+        m for s, d in zip(samples, distances)
+        if s.intensity is not None
+        and (m := estimate_magnitude_from_pga(s.intensity, d)) is not None
+    ]
+    magnitude = round(statistics.median(magnitudes), 1) if magnitudes else None
+    return lat, lon, extent_km, magnitude
 
 
 class ShakeClusterService:
     """
     Redis üzerinde 5 saniyelik sliding window ile sarsıntı sinyallerini kümeleyen servis.
     Aynı GeoHash bölgesinde en az MIN_DEVICES sinyal gelirse deprem doğrulanır.
+
+    Pencere anahtarı bir hash'tir: alan = device_id, değer = ShakeSample.encode().
+    Böylece cihaz tekilliği (HLEN) ve episantr kestirimi için örnekler tek anahtarda tutulur.
+
+    Redis Cluster: hücre anahtarları GeoHash önekiyle hash tag'lenir
+    (örn. shakes:{sxk}:sxk9w:1700000000) — aynı bölgenin pencere ve doğrulama
+    anahtarları aynı slot'ta tutulur, pipeline'lar tek node'a gider.
     """
 
     KEY_PREFIX = "shakes"
     RATE_LIMIT_PREFIX = "shake_rl"
     CONFIRMED_PREFIX = "shake_confirmed"
 
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Union[Redis, RedisCluster]):
         self._redis = redis
         self._window_sec = settings.SHAKE_WINDOW_SECONDS
         self._window_ttl = settings.SHAKE_WINDOW_TTL_SECONDS
@@ -47,19 +161,24 @@ class ShakeClusterService:
         self._geohash_precision = settings.SHAKE_GEOHASH_PRECISION
         self._radius_km = settings.SHAKE_CLUSTER_RADIUS_KM
         self._rate_limit_sec = settings.SHAKE_RATE_LIMIT_PER_DEVICE_SECONDS
+        self._hash_tag_precision = min(settings.SHAKE_REDIS_HASH_TAG_PRECISION, self._geohash_precision)
 
     def _window_ts(self, ts: datetime) -> int:
         """Zaman damgasına göre pencere ID (sliding window bucket)."""
         return int(ts.timestamp() // self._window_sec) * self._window_sec
 
+    def _hash_tag(self, geohash: str) -> str:
+        """Redis Cluster hash tag'i: GeoHash öneki süslü parantez içinde."""
+        return "{" + geohash[: self._hash_tag_precision] + "}"
+
     def _key(self, geohash: str, window_ts: int) -> str:
-        return f"{self.KEY_PREFIX}:{geohash}:{window_ts}"
+        return f"{self.KEY_PREFIX}:{self._hash_tag(geohash)}:{geohash}:{window_ts}"
 
     def _rate_limit_key(self, device_id: str) -> str:
         return f"{self.RATE_LIMIT_PREFIX}:{device_id}"
 
     def _confirmed_key(self, geohash: str, window_ts: int) -> str:
-        return f"{self.CONFIRMED_PREFIX}:{geohash}:{window_ts}"
+        return f"{self.CONFIRMED_PREFIX}:{self._hash_tag(geohash)}:{geohash}:{window_ts}"
 
     async def add_shake(
         self,
@@ -81,21 +200,23 @@ class ShakeClusterService:
             return None
 
         try:
-            # Rate limit: aynı cihaz çok sık göndermesin
+            # Rate limit: aynı cihaz çok sık göndermesin (SET NX — tek round trip, atomik)
             rl_key = self._rate_limit_key(device_id)
-            if await self._redis.get(rl_key):
+            if not await self._redis.set(rl_key, "1", nx=True, ex=self._rate_limit_sec):
                 logger.debug("Shake rate limit: device_id=%s", device_id[:16])
                 return None
-            await self._redis.setex(rl_key, self._rate_limit_sec, "1")
 
             geohash = geohash_encode(latitude, longitude, self._geohash_precision)
             window_ts = self._window_ts(timestamp)
             key = self._key(geohash, window_ts)
 
-            pipe = self._redis.pipeline()
-            pipe.sadd(key, device_id)
+            sample = ShakeSample(latitude, longitude, intensity, timestamp.timestamp())
+
+            # transaction=False: MULTI/EXEC yok, Redis Cluster'da da tek round trip
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.hset(key, device_id, sample.encode())
             pipe.expire(key, self._window_ttl)
-            pipe.scard(key)
+            pipe.hlen(key)
             results = await pipe.execute()
 
             unique_count = results[2]
@@ -103,13 +224,8 @@ class ShakeClusterService:
                 confirmed_key = self._confirmed_key(geohash, window_ts)
                 # Sadece ilk doğrulamada tetikle (bir kez per bölge/pencere)
                 if await self._redis.set(confirmed_key, "1", nx=True, ex=self._window_ttl):
-                    return ConfirmedShakeEvent(
-                        geohash=geohash,
-                        latitude=latitude,
-                        longitude=longitude,
-                        device_count=unique_count,
-                        window_start_ts=window_ts,
-                        timestamp=timestamp,
+                    return await self._build_confirmed_event(
+                        key, geohash, window_ts, timestamp, unique_count, sample
                     )
             return None
 
@@ -120,13 +236,52 @@ class ShakeClusterService:
             logger.exception("Shake ekleme hatası: %s", e)
             raise
 
+    async def _build_confirmed_event(
+        self,
+        key: str,
+        geohash: str,
+        window_ts: int,
+        timestamp: datetime,
+        unique_count: int,
+        trigger: ShakeSample,
+    ) -> ConfirmedShakeEvent:
+        """Penceredeki örneklerden episantr kestirip ConfirmedShakeEvent oluşturur."""
+        raw = await self._redis.hvals(key)
+        samples = [s for s in (ShakeSample.decode(r) for r in raw) if s is not None] or [trigger]
+        located = locate_from_arrivals(samples)
+        lat, lon, extent_km, magnitude = estimate_cluster_source(
+            samples, (located.latitude, located.longitude) if located else None
+        )
+        intensities = [s.intensity for s in samples if s.intensity is not None]
+        logger.info(
+            "Shake kümesi doğrulandı: geohash=%s cihaz=%d merkez=%.4f,%.4f (%s) yayılım=%.1fkm M~%s",
+            geohash, unique_count, lat, lon, "varış zamanı" if located else "ağırlıklı merkez",
+            extent_km, magnitude,
+        )
+        return ConfirmedShakeEvent(
+            geohash=geohash,
+            latitude=lat,
+            longitude=lon,
+            device_count=unique_count,
+            window_start_ts=window_ts,
+            timestamp=timestamp,
+            extent_km=round(extent_km, 2),
+            max_intensity=max(intensities) if intensities else None,
+            estimated_magnitude=magnitude,
+            location_method="arrival_times" if located else "centroid",
+            origin_time=datetime.fromtimestamp(located.origin_ts, tz=timezone.utc) if located else None,
+            uncertainty_major_km=located.semi_major_km if located else None,
+            uncertainty_minor_km=located.semi_minor_km if located else None,
+            uncertainty_azimuth_deg=located.azimuth_deg if located else None,
+        )
+
     async def get_device_count_in_window(
         self, geohash: str, window_ts: int
     ) -> int:
         """Belirli bölge ve penceredeki benzersiz cihaz sayısını döner."""
         try:
             key = self._key(geohash, window_ts)
-            return await self._redis.scard(key) or 0
+            return await self._redis.hlen(key) or 0
         except (RedisTimeoutError, RedisError) as e:
-            logger.error("Redis hatası (scard): %s", e)
+            logger.error("Redis hatası (hlen): %s", e)
             return 0
@@ -0,0 +1,147 @@
+"""
+Sesli S.O.S hattı (/sos/audio) — eşzamanlı aşamalar.
+
+Yükleme depoya düştüğü anda:
+  1. Transkripsiyon (Groq Whisper) arka planda başlar,
+  2. acil kişilere yalnız konumlu ilk uyarı gider (transkripsiyonu beklemez),
+  3. transkripsiyon bitince metinli takip mesajı gönderilir.
+
+Whisper 12 sn'ye kadar sürebilir; ilk uyarı artık bu süreye bağlı değildir.
+Aşama süreleri (isteğin alınmasından itibaren, ms) app.services.metrics
+histogramlarına (sos_latency) yazılır; admin /metrics/sos okur.
+rules.md: type hints, logging.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Dict, List, Optional
+
+from app.services.metrics import observe_latencies
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAME = "sos_latency"
+STAGES = ("first_alert", "transcription", "followup")
+
+
+@dataclass
+class SOSPipelineResult:
+    """İlk uyarı ve takip mesajının şelale sonuçları ve aşama süreleri."""
+
+    transcription: Optional[str]
+    first: Dict
+    followup: Optional[Dict] = None
+    first_alert_ms: Optional[float] = None
+    transcription_ms: Optional[float] = None
+    followup_ms: Optional[float] = None
+
+    def stages_ms(self) -> Dict[str, Optional[float]]:
+        return {
+            "first_alert": self.first_alert_ms,
+            "transcription": self.transcription_ms,
+            "followup": self.followup_ms,
+        }
+
+
+def start_transcription(audio_path: str, timeout: int = 12) -> "asyncio.Task[Optional[str]]":
+    """
+    Transkripsiyonu arka planda başlatır; görev metni veya (hata durumunda) None döner.
+    Senkron Groq çağrısı varsayılan thread havuzunda koşar.
+    """
+    from app.services.whisper_service import get_whisper_service
+
+    async def run() -> Optional[str]:
+        try:
+            whisper = get_whisper_service()
+            text = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: whisper.transcribe(audio_path, timeout=timeout),
+            )
+            logger.info("[SOS Hattı] Transkripsiyon OK: %d karakter", len(text))
+            return text
+        except Exception as exc:
+            logger.warning("[SOS Hattı] Transkripsiyon başarısız: %s", exc)
+            return None
+
+    return asyncio.create_task(run())
+
+
+def location_message(sender: str, latitude: float, longitude: float) -> str:
+    maps_link = f"https://maps.google.com/?q={latitude:.6f},{longitude:.6f}"
+    return (
+        f"🆘 ACİL DURUM S.O.S: {sender}\n"
+        f"Sesli mesaj çözümleniyor, ayrıca iletilecek.\n"
+        f"📍 Konum: {maps_link}"
+    )
+
+
+def transcript_message(sender: str, transcription: str, latitude: float, longitude: float) -> str:
+    maps_link = f"https://maps.google.com/?q={latitude:.6f},{longitude:.6f}"
+    return (
+        f"🆘 S.O.S SESLİ MESAJ: {sender}\n"
+        f"Mesaj: {transcription}\n"
+        f"📍 Konum: {maps_link}"
+    )
+
+
+async def run_sos_pipeline(
+    transcription: Awaitable[Optional[str]],
+    phone_numbers: List[str],
+    sender: str,
+    latitude: float,
+    longitude: float,
+    user_id: int,
+    received_ts: float,
+) -> SOSPipelineResult:
+    """
+    İlk (konumlu) uyarıyı hemen gönderir, transkripsiyon hazır olunca metinli
+    takip mesajını gönderir ve aşama sürelerini histograma yazar.
+
+    Args:
+        transcription: start_transcription görevi (zaten koşuyor).
+        phone_numbers: Acil kişi numaraları (boş olmamalı).
+        sender: Mesajlarda görünen kullanıcı (e-posta).
+        received_ts: İsteğin alındığı an (epoch sn) — sürelerin başlangıcı.
+    """
+    from app.services.twilio_fallback import send_waterfall_emergency_async
+
+    def since_received() -> float:
+        return (time.time() - received_ts) * 1000.0
+
+    async def transcribe() -> Optional[str]:
+        text = await transcription
+        result.transcription_ms = since_received()
+        return text
+
+    result = SOSPipelineResult(transcription=None, first={})
+    transcribed = asyncio.ensure_future(transcribe())
+    try:
+        result.first = await send_waterfall_emergency_async(
+            phone_numbers=phone_numbers,
+            message=location_message(sender, latitude, longitude),
+            channel="waterfall",
+            user_id=user_id,
+            event_type="SOS_AUDIO",
+        )
+        result.first_alert_ms = since_received()
+        logger.info(
+            "[SOS Hattı] İlk uyarı: user=%d, WA=%d, SMS=%d, %.0f ms",
+            user_id, result.first["whatsapp_sent"], result.first["sms_sent"], result.first_alert_ms,
+        )
+
+        result.transcription = await transcribed
+        # Çözümlenemeyen ses için takip mesajı gönderilmez; ilk uyarı konumu zaten iletti
+        if result.transcription:
+            result.followup = await send_waterfall_emergency_async(
+                phone_numbers=phone_numbers,
+                message=transcript_message(sender, result.transcription, latitude, longitude),
+                channel="waterfall",
+                user_id=user_id,
+                event_type="SOS_AUDIO_TRANSCRIPT",
+            )
+            result.followup_ms = since_received()
+    finally:
+        transcribed.cancel()
+        await asyncio.to_thread(observe_latencies, METRIC_NAME, **result.stages_ms())
+    return result
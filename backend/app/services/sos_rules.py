@@ -0,0 +1,155 @@
+"""
+Kural tabanlı S.O.S çıkarıcı — LLM'e gitmeden kalıp mesajları çözer.
+
+"enkaz altındayım, 3 kişiyiz" gibi kısa ve kalıp transkriptlerde durum,
+kişi sayısı, aciliyet ve lokasyon Türkçe anahtar kelime/sayı kalıplarıyla
+mikrosaniyeler içinde çıkarılır. Güven skoru SOS_RULES_MIN_CONFIDENCE altındaysa
+(çelişkili ifadeler, olumsuzluk, uzun serbest anlatım, belirsiz kişi sayısı)
+çağıran LLM'e düşer (app.services.llm_extractor).
+
+Kişi sayısı yalnız konuşanı kapsayan açık ifadeden ("3 kişiyiz") veya yalnızlık
+ifadesinden ("yalnızım") kesin kabul edilir. Sayısız çoğul birinci şahıs
+("altındayız") ve başka kişilerin sayımı ("iki çocuk", "yanımdaki bir kişi")
+kurtarma verisinde kişi eksik sayılmasın diye LLM'e bırakılır.
+
+normalize_transcript / transcript_key: önbellek anahtarı için Türkçe küçük harf,
+noktalamasız, tek boşluklu metin ve SHA-256 özeti.
+rules.md: type hints, logging.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+DURUM_TRAPPED = "Enkaz Altında"
+DURUM_SAFE = "Güvende"
+
+# Normalize metin üzerinde (küçük harf, noktalamasız) aranır
+_TRAPPED = re.compile(
+    r"\b(enkaz|göçük|moloz)\w* alt|\bsıkış\w*|\bmahsur\w*|\bkurtar(ın|sın|ın bizi)\b|\bçıkamıyor\w*|\bkapalı kaldı\w*"
+)
+_SAFE = re.compile(
+    r"\bgüvende(yim|yiz)?\b|\biyiyi(m|z)\b|\bsağ salim\b|\bbir şeyim yok\b|\bdışarı(dayım|dayız|ya çıktı\w*)\b"
+)
+_INJURED = re.compile(r"\byaral\w*|\bkanı?yor\w*|\bnefes alamı\w*|\bbayıl\w*|\bkırıl\w*|\bacil yardım\b")
+_NEGATION = re.compile(r"\bdeğil\w*")
+_SOLO = re.compile(r"\b(yalnızım|tek başıma\w*|sadece ben)\b")
+
+_NUMBER_WORDS = {
+    "bir": 1, "iki": 2, "üç": 3, "dört": 4, "beş": 5,
+    "altı": 6, "yedi": 7, "sekiz": 8, "dokuz": 9, "on": 10,
+}
+_NUMBER = r"(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")"
+# Konuşanı kapsayan toplam: "3 kişiyiz"
+_SELF_COUNT = re.compile(r"\b" + _NUMBER + r" kişiyiz\b")
+# Sayı + kişi adı: "iki çocuk", "bir kişi", "3 yaralı"
+_PERSON_COUNT = re.compile(
+    r"\b" + _NUMBER + r" (kişi|çocu|bebe|yaşlı|kadın|adam|insan|yaralı|arkadaş|komşu|kardeş)\w*"
+)
+# Çoğul birinci şahıs: "biz", "-yız/-ız", "-dık/-tık"
+_PLURAL = re.compile(r"\bbiz\w*|\b\w{2,}(?:y[ıiuü]z|[ıiuü]z|[dt][ıiuü]k)\b")
+_NOT_PLURAL = {"deniz", "sekiz", "dokuz", "otuz", "yıldız", "yalnız"}
+# Yalnızlık ifadesiyle birlikte başka biri: "sadece ben ve annem", "yanımda eşim"
+_COMPANION = re.compile(r"\b(ve|ile|birlikte|yanımda\w*)\b")
+
+# Lokasyon orijinal metinde aranır (büyük/küçük harf korunur)
+_LOCATION_PARTS = [
+    re.compile(r"[\wçğıöşüÇĞİÖŞÜ]+ (?:mahallesi|mah\.?)", re.IGNORECASE),
+    re.compile(r"[\wçğıöşüÇĞİÖŞÜ]+ (?:sokak|sokağı|sk\.?|caddesi|cadde|cad\.?|bulvarı)", re.IGNORECASE),
+    re.compile(r"[\wçğıöşüÇĞİÖŞÜ]+ (?:apartmanı|sitesi|blok)", re.IGNORECASE),
+    re.compile(r"(?:bina|no|numara|daire|kat) ?:? ?\d+", re.IGNORECASE),
+    re.compile(r"\d+\. ?kat", re.IGNORECASE),
+]
+
+_SHORT_WORDS = 20
+
+
+def _tr_lower(text: str) -> str:
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def normalize_transcript(text: str) -> str:
+    """Önbellek için: Türkçe küçük harf, noktalama yok, tek boşluk."""
+    return " ".join(re.sub(r"[^\w\s]", " ", _tr_lower(text)).split())
+
+
+def transcript_key(text: str) -> str:
+    return hashlib.sha256(normalize_transcript(text).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class RuleExtraction:
+    """Kural sonucu; confidence 0–1 (LLM'e düşme kararı için)."""
+
+    data: Dict[str, Any]
+    confidence: float
+
+
+def _number(raw: str) -> int:
+    return int(raw) if raw.isdigit() else _NUMBER_WORDS[raw]
+
+
+def _head_count(norm: str) -> Tuple[Optional[int], bool]:
+    """
+    (kişi sayısı, kesin mi). Kesin: tek başına "N kişiyiz" veya başka kişi/çoğul
+    ipucu olmayan yalnızlık ifadesi. Diğer sayımlar konuşanı kapsayıp kapsamadığı
+    belli olmadığından sayı vermez.
+    """
+    own = _SELF_COUNT.search(norm)
+    others = [m for m in _PERSON_COUNT.finditer(norm) if own is None or m.start() != own.start()]
+    if own is not None:
+        value = _number(own.group(1))
+        return (value, not others) if value >= 1 else (None, False)
+    if _SOLO.search(norm):
+        plural = any(m.group(0) not in _NOT_PLURAL for m in _PLURAL.finditer(norm))
+        return 1, not (plural or others or _COMPANION.search(norm))
+    return None, False
+
+
+def _location(text: str) -> str:
+    spans: List[tuple] = []
+    for pattern in _LOCATION_PARTS:
+        for match in pattern.finditer(text):
+            if not any(s <= match.start() < e for s, e, _ in spans):
+                spans.append((match.start(), match.end(), match.group(0).strip()))
+    return ", ".join(part for _, _, part in sorted(spans))
+
+
+def extract_rule_based(transcription: str) -> RuleExtraction:
+    """
+    Transkriptten {durum, kisi_sayisi, aciliyet, lokasyon} çıkarır.
+
+    Güven: durum bulunamaz, iki yönlü ipucu veya olumsuzluk varsa 0; kişi sayısı
+    kesin değilse (_head_count) 0.6; kesinse 0.8 + kısa mesaj (≤ 20 kelime) için 0.2.
+    Güvende + yaralanma ipucu gibi karışık durumlar 0.6'da kalır.
+    """
+    norm = normalize_transcript(transcription)
+    trapped, safe = bool(_TRAPPED.search(norm)), bool(_SAFE.search(norm))
+    injured = bool(_INJURED.search(norm))
+    count, certain = _head_count(norm)
+
+    if trapped == safe or _NEGATION.search(norm):
+        durum, confidence = "Bilinmiyor", 0.0
+    else:
+        durum = DURUM_TRAPPED if trapped else DURUM_SAFE
+        confidence = 0.8 + 0.2 * (len(norm.split()) <= _SHORT_WORDS) if certain else 0.6
+        if safe and injured:
+            confidence = min(confidence, 0.6)
+
+    if durum == DURUM_TRAPPED or (durum == "Bilinmiyor" and injured):
+        aciliyet = "Kırmızı"
+    elif durum == DURUM_SAFE and not injured:
+        aciliyet = "Yeşil"
+    else:
+        aciliyet = "Sarı"
+
+    return RuleExtraction(
+        data={
+            "durum": durum,
+            "kisi_sayisi": count or 1,
+            "aciliyet": aciliyet,
+            "lokasyon": _location(transcription),
+        },
+        confidence=round(confidence, 2),
+    )
@@ -0,0 +1,131 @@
+"""
+Async Twilio REST taşıyıcısı — paylaşılan httpx.AsyncClient (keep-alive) üzerinde.
+
+Twilio SDK'sının async yüzeyi (client.messages.create_async) kullanılır; HTTP
+katmanı SDK'nın aiohttp tabanlı istemcisi yerine tek bir havuzlu
+httpx.AsyncClient'tır. Böylece FastAPI endpoint'leri ve async görevler Twilio
+beklerken thread tutmaz (run_in_executor yok) ve bölgesel S.O.S dalgasında
+varsayılan thread havuzu darboğaz olmaz. Hata semantiği senkron SDK ile aynıdır
+(TwilioRestException).
+
+Havuz TWILIO_MAX_CONCURRENCY bağlantıyla sınırlıdır; çağıranlar sınırsız
+asyncio.gather kullanır, fazlası bağlantı boşalana kadar bekler. Bu yüzden
+havuzdan bağlantı alma süresi sınırsızdır (pool=None): istek zaman aşımı
+yalnız bağlantı alındıktan sonra işler, S.O.S dalgasında kuyrukta bekleyen
+mesaj PoolTimeout ile başarısız sayılmaz.
+
+httpx bağlantıları oluşturuldukları olay döngüsüne bağlıdır; client olay döngüsü
+başına bir kez kurulur (FastAPI ve alarm worker'ında süreç boyunca tek döngü).
+TWILIO_TRANSPORT=local ise yerel stand-in'in async yüzeyi döner.
+rules.md: type hints, logging.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from twilio.http import AsyncHttpClient
+    from twilio.http.response import Response as TwilioResponse
+    from twilio.rest import Client as TwilioClient
+    _TWILIO_AVAILABLE = True
+except ImportError:
+    _TWILIO_AVAILABLE = False
+    AsyncHttpClient = object  # type: ignore[assignment,misc]
+    logger.warning("[TwilioAsync] twilio paketi bulunamadı.")
+
+
+def _timeout(seconds: Optional[float]) -> httpx.Timeout:
+    """İstek zaman aşımı; havuzda bağlantı beklemek sınırsız."""
+    return httpx.Timeout(seconds, pool=None)
+
+
+class HttpxTwilioHttpClient(AsyncHttpClient):
+    """Twilio SDK'sının async HTTP arayüzü; istekler paylaşılan httpx havuzundan gider."""
+
+    def __init__(self, timeout: Optional[float] = None, max_connections: Optional[int] = None):
+        super().__init__(logger, True, timeout)
+        limit = max_connections or settings.TWILIO_MAX_CONCURRENCY
+        self.session = httpx.AsyncClient(
+            timeout=_timeout(timeout),
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+        )
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, object]] = None,
+        data: Optional[Dict[str, object]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        auth: Optional[Tuple[str, str]] = None,
+        timeout: Optional[float] = None,
+        allow_redirects: bool = False,
+    ) -> "TwilioResponse":
+        if timeout is not None and timeout <= 0:
+            raise ValueError(timeout)
+        kwargs = {"method": method.upper(), "url": url, "params": params, "headers": headers}
+        self.log_request(kwargs)
+        response = await self.session.request(
+            method.upper(),
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            auth=auth,
+            timeout=_timeout(timeout if timeout is not None else self.timeout),
+            follow_redirects=allow_redirects,
+        )
+        self.log_response(response.status_code, response)
+        return TwilioResponse(response.status_code, response.text, response.headers)
+
+    async def close(self) -> None:
+        await self.session.aclose()
+
+
+_clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+
+
+def get_async_twilio_client() -> Optional[Any]:
+    """
+    Çalışan olay döngüsü için tek async Twilio client'ı döndürür
+    (TWILIO_TRANSPORT=local ise stand-in). Yapılandırma eksikse None.
+    Çağıran `await client.messages.create_async(...)` kullanır.
+    """
+    if settings.TWILIO_TRANSPORT == "local":
+        from app.services.local_transports import get_local_twilio
+        return get_local_twilio()
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is not None:
+        return client
+    if not _TWILIO_AVAILABLE:
+        logger.error("[TwilioAsync] twilio SDK yüklü değil.")
+        return None
+    if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
+        logger.error("[TwilioAsync] TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN eksik.")
+        return None
+    # Kapanmış döngülerin (asyncio.run) client'ları bırakılır; bağlantıları döngüyle gitti
+    for stale in [lp for lp in _clients if lp.is_closed()]:
+        del _clients[stale]
+    client = TwilioClient(
+        settings.TWILIO_ACCOUNT_SID,
+        settings.TWILIO_AUTH_TOKEN,
+        http_client=HttpxTwilioHttpClient(timeout=settings.TWILIO_HTTP_TIMEOUT_SECONDS),
+    )
+    _clients[loop] = client
+    logger.info("[TwilioAsync] Async Twilio client kuruldu (havuz=%d).", settings.TWILIO_MAX_CONCURRENCY)
+    return client
+
+
+async def close_async_twilio() -> None:
+    """Çalışan döngünün httpx havuzunu kapatır (uygulama kapanışında)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.http_client.close()
@@ -6,17 +6,26 @@ Akış:
   2. WhatsApp başarısız olursa (hata, numara uyumsuzluğu vb.) → SMS'e geç.
   3. Her adımın sonucunu notification_log tablosuna kaydet.
 
-Bu servis hem Celery task'ından (send_emergency_twilio.py) hem de
-doğrudan FastAPI endpoint'inden (/sos/test) çağrılabilecek şekilde
-senkron tasarlanmıştır.
+send_waterfall_emergency Celery task'ı (send_emergency_twilio.py) için senkron;
+FastAPI endpoint'leri (/sos/test, /sos/audio, /sos/safe) aynı semantiği
+send_waterfall_emergency_async ile httpx havuzu üzerinden (thread'siz) kullanır.
 
 Test endpoint'i için Celery tamamen bypass edilir; Twilio API doğrudan çağrılır
 ve senkron yanıt döndürülür.
+
+Twilio client süreç başına bir kez kurulur (bağlantı havuzlu requests Session);
+numara başına şelaleler paylaşılan thread havuzunda (TWILIO_MAX_CONCURRENCY)
+eşzamanlı koşar, sonuçlar bittiğinde WaterfallResult'ta toplanır. Beş acil
+kişili bir S.O.S yanıtı on ardışık HTTPS çağrısı yerine en yavaş kişinin
+şelalesi kadar bekler.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import List, Literal, Optional
@@ -29,8 +38,10 @@ Channel = Literal["waterfall", "sms", "whatsapp"]
 
 # Twilio SDK
 try:
+    from requests.adapters import HTTPAdapter
     from twilio.rest import Client as TwilioClient
     from twilio.base.exceptions import TwilioRestException
+    from twilio.http.http_client import TwilioHttpClient
     _TWILIO_AVAILABLE = True
 except ImportError:
     _TWILIO_AVAILABLE = False
@@ -70,115 +81,146 @@ class WaterfallResult:
         }
 
 
+_client: Optional[TwilioClient] = None
+_client_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
 def _get_twilio_client() -> Optional[TwilioClient]:
-    """Twilio client'ı döndürür. Yapılandırma eksikse None döner, log atar."""
+    """
+    Süreç başına tek Twilio client'ı döndürür (TWILIO_TRANSPORT=local ise stand-in).
+    HTTP bağlantıları havuzlanır (TWILIO_MAX_CONCURRENCY); yapılandırma eksikse
+    None döner, log atar ve bir sonraki çağrıda yeniden dener.
+    """
+    global _client
+    if settings.TWILIO_TRANSPORT == "local":
+        from app.services.local_transports import get_local_twilio
+        return get_local_twilio()
+    if _client is not None:
+        return _client
     if not _TWILIO_AVAILABLE:
         logger.error("[TwilioFallback] twilio SDK yüklü değil.")
         return None
     if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
         logger.error("[TwilioFallback] TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN eksik.")
         return None
-    try:
-        return TwilioClient(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-    except Exception as exc:
-        logger.error("[TwilioFallback] Client oluşturulamadı: %s", exc)
-        return None
+    with _client_lock:
+        if _client is None:
+            try:
+                http_client = TwilioHttpClient(
+                    pool_connections=True, timeout=settings.TWILIO_HTTP_TIMEOUT_SECONDS,
+                )
+                # Varsayılan havuz 10 bağlantı; eşzamanlı şelale sayısı kadar açık tutulur
+                http_client.session.mount(
+                    "https://", HTTPAdapter(pool_connections=1, pool_maxsize=settings.TWILIO_MAX_CONCURRENCY),
+                )
+                _client = TwilioClient(
+                    settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client,
+                )
+                logger.info("[TwilioFallback] Twilio client kuruldu (havuz=%d).", settings.TWILIO_MAX_CONCURRENCY)
+            except Exception as exc:
+                logger.error("[TwilioFallback] Client oluşturulamadı: %s", exc)
+                return None
+    return _client
+
+
+def _twilio_executor() -> ThreadPoolExecutor:
+    """Süreç başına tek şelale havuzu; eşzamanlı Twilio çağrılarını sınırlar."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TWILIO_MAX_CONCURRENCY, thread_name_prefix="twilio",
+        )
+    return _executor
 
 
-def _send_whatsapp_single(
-    client: TwilioClient,
-    to_number: str,
-    message: str,
-) -> tuple[bool, Optional[str]]:
-    """
-    Tek bir numaraya WhatsApp mesajı gönderir.
+_CHANNEL_LABELS = {"whatsapp": "WhatsApp", "sms": "SMS"}
 
-    Returns:
-        (success, error_message)
-    """
-    try:
-        wa_to = f"whatsapp:{to_number}"
-        wa_from = f"whatsapp:{settings.TWILIO_PHONE_NUMBER}"
-        msg = client.messages.create(body=message, from_=wa_from, to=wa_to)
-        logger.info("[TwilioFallback] WhatsApp gönderildi: %s → SID: %s", to_number, msg.sid)
-        return True, None
-    except TwilioRestException as exc:
+
+def _message_args(kind: str, to_number: str, message: str) -> dict:
+    """messages.create argümanları; WhatsApp için "whatsapp:" prefix eklenir."""
+    if kind == "whatsapp":
+        return {"body": message, "from_": f"whatsapp:{settings.TWILIO_PHONE_NUMBER}", "to": f"whatsapp:{to_number}"}
+    return {"body": message, "from_": settings.TWILIO_PHONE_NUMBER, "to": to_number}
+
+
+def _sent(kind: str, to_number: str, msg) -> tuple[bool, Optional[str]]:
+    logger.info("[TwilioFallback] %s gönderildi: %s → SID: %s", _CHANNEL_LABELS[kind], to_number, msg.sid)
+    return True, None
+
+
+def _failed(kind: str, to_number: str, exc: Exception) -> tuple[bool, Optional[str]]:
+    if _TWILIO_AVAILABLE and isinstance(exc, TwilioRestException):
         logger.warning(
-            "[TwilioFallback] WhatsApp başarısız: %s → kod=%s mesaj=%s",
-            to_number, exc.code, exc.msg
+            "[TwilioFallback] %s başarısız: %s → kod=%s mesaj=%s",
+            _CHANNEL_LABELS[kind], to_number, exc.code, exc.msg
         )
         return False, f"TwilioREST-{exc.code}: {exc.msg}"
-    except Exception as exc:
-        logger.warning("[TwilioFallback] WhatsApp bilinmeyen hata: %s → %s", to_number, exc)
-        return False, str(exc)
+    logger.warning("[TwilioFallback] %s bilinmeyen hata: %s → %s", _CHANNEL_LABELS[kind], to_number, exc)
+    return False, str(exc)
 
 
-def _send_sms_single(
-    client: TwilioClient,
-    to_number: str,
-    message: str,
-) -> tuple[bool, Optional[str]]:
+def _send_single(client: TwilioClient, kind: str, to_number: str, message: str) -> tuple[bool, Optional[str]]:
     """
-    Tek bir numaraya SMS gönderir.
+    Tek bir numaraya WhatsApp ("whatsapp") veya SMS ("sms") gönderir.
 
     Returns:
         (success, error_message)
     """
     try:
-        msg = client.messages.create(
-            body=message,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=to_number,
-        )
-        logger.info("[TwilioFallback] SMS gönderildi: %s → SID: %s", to_number, msg.sid)
-        return True, None
-    except TwilioRestException as exc:
-        logger.warning(
-            "[TwilioFallback] SMS başarısız: %s → kod=%s mesaj=%s",
-            to_number, exc.code, exc.msg
-        )
-        return False, f"TwilioREST-{exc.code}: {exc.msg}"
+        return _sent(kind, to_number, client.messages.create(**_message_args(kind, to_number, message)))
+    except Exception as exc:
+        return _failed(kind, to_number, exc)
+
+
+async def _send_single_async(client, kind: str, to_number: str, message: str) -> tuple[bool, Optional[str]]:
+    """_send_single'ın async karşılığı (app.services.twilio_async client'ı ile)."""
+    try:
+        return _sent(kind, to_number, await client.messages.create_async(**_message_args(kind, to_number, message)))
     except Exception as exc:
-        logger.warning("[TwilioFallback] SMS bilinmeyen hata: %s → %s", to_number, exc)
-        return False, str(exc)
+        return _failed(kind, to_number, exc)
+
+
+def _notification_log(result: WaterfallResult, user_id: Optional[int], event_type: str):
+    """Gönderim sonucundan NotificationLog satırı kurar (mevcut model — yeni migration gerekmez)."""
+    from app.models.notification_log import NotificationLog
+
+    return NotificationLog(
+        title=f"Twilio {event_type} Bildirimi",
+        body=(
+            f"WhatsApp: {result.whatsapp_sent} gönderildi | "
+            f"SMS: {result.sms_sent} gönderildi | "
+            f"Başarısız: {result.failed} | "
+            f"Fallback: {'Evet' if result.fallback_used else 'Hayır'}"
+        ),
+        target_type="user" if user_id else "broadcast",
+        target_user_id=user_id,
+        total_targets=result.total,
+        sent_count=result.whatsapp_sent + result.sms_sent,
+        failed_count=result.failed,
+        sent_by=user_id,
+        data={
+            "channel": "waterfall",
+            "event_type": event_type,
+            "whatsapp_sent": result.whatsapp_sent,
+            "sms_sent": result.sms_sent,
+            "fallback_used": result.fallback_used,
+            "sent_at": datetime.now(timezone.utc).isoformat(),
+            "details": result.details[:20],   # Max 20 kayıt — DB şişmesin
+        },
+    )
 
 
 def _log_to_db(result: WaterfallResult, user_id: Optional[int], event_type: str) -> None:
     """
     Gönderim sonucunu notification_logs tablosuna kaydeder.
-    Mevcut NotificationLog modeli kullanılır — yeni migration gerekmez.
     Hata olursa sessizce loglar — ana akışı ASLA kesmez.
     """
     try:
         from app.database import SyncSessionLocal
-        from app.models.notification_log import NotificationLog
 
         with SyncSessionLocal() as db:
-            log = NotificationLog(
-                title=f"Twilio {event_type} Bildirimi",
-                body=(
-                    f"WhatsApp: {result.whatsapp_sent} gönderildi | "
-                    f"SMS: {result.sms_sent} gönderildi | "
-                    f"Başarısız: {result.failed} | "
-                    f"Fallback: {'Evet' if result.fallback_used else 'Hayır'}"
-                ),
-                target_type="user" if user_id else "broadcast",
-                target_user_id=user_id,
-                total_targets=result.total,
-                sent_count=result.whatsapp_sent + result.sms_sent,
-                failed_count=result.failed,
-                sent_by=user_id,
-                data={
-                    "channel": "waterfall",
-                    "event_type": event_type,
-                    "whatsapp_sent": result.whatsapp_sent,
-                    "sms_sent": result.sms_sent,
-                    "fallback_used": result.fallback_used,
-                    "sent_at": datetime.now(timezone.utc).isoformat(),
-                    "details": result.details[:20],   # Max 20 kayıt — DB şişmesin
-                },
-            )
-            db.add(log)
+            db.add(_notification_log(result, user_id, event_type))
             db.commit()
             logger.debug("[TwilioFallback] DB log kaydedildi.")
     except Exception as exc:
@@ -186,6 +228,100 @@ def _log_to_db(result: WaterfallResult, user_id: Optional[int], event_type: str)
         logger.error("[TwilioFallback] DB log hatası (mesaj gönderimi etkilenmedi): %s", exc)
 
 
+async def _log_to_db_async(result: WaterfallResult, user_id: Optional[int], event_type: str) -> None:
+    """_log_to_db'nin async karşılığı (AsyncSessionLocal)."""
+    try:
+        from app.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            db.add(_notification_log(result, user_id, event_type))
+            await db.commit()
+            logger.debug("[TwilioFallback] DB log kaydedildi.")
+    except Exception as exc:
+        logger.error("[TwilioFallback] DB log hatası (mesaj gönderimi etkilenmedi): %s", exc)
+
+
+def _should_try_sms(channel: Channel, cr: ContactResult) -> bool:
+    # "waterfall" modunda: WA başarısızsa SMS'e düş
+    # "sms" modunda: Direkt SMS
+    return channel == "sms" or (channel == "waterfall" and not cr.whatsapp_success)
+
+
+def _record_whatsapp(cr: ContactResult, outcome: tuple[bool, Optional[str]]) -> None:
+    cr.whatsapp_attempted = True
+    cr.whatsapp_success, err = outcome
+    if not cr.whatsapp_success:
+        cr.error = err
+
+
+def _record_sms(cr: ContactResult, channel: Channel, outcome: tuple[bool, Optional[str]]) -> None:
+    cr.sms_attempted = True
+    cr.fallback_used = channel == "waterfall"
+    cr.sms_success, err = outcome
+    if not cr.sms_success:
+        cr.error = (cr.error or "") + f" | SMS: {err}"
+
+
+def _finish_contact(cr: ContactResult) -> ContactResult:
+    # Her iki kanal da başarısız
+    if not (cr.whatsapp_success or cr.sms_success):
+        logger.error(
+            "[TwilioFallback] BAŞARISIZ: %s → WA=%s SMS=%s hata=%s",
+            cr.phone, cr.whatsapp_attempted, cr.sms_attempted, cr.error
+        )
+    return cr
+
+
+def _deliver_contact(client: TwilioClient, phone: str, message: str, channel: Channel) -> ContactResult:
+    """
+    Tek numaranın şelalesi (havuz thread'inde çalışır): WhatsApp → gerekirse SMS.
+    """
+    cr = ContactResult(phone=phone)
+    if channel in ("waterfall", "whatsapp"):
+        _record_whatsapp(cr, _send_single(client, "whatsapp", phone, message))
+    if _should_try_sms(channel, cr):
+        _record_sms(cr, channel, _send_single(client, "sms", phone, message))
+    return _finish_contact(cr)
+
+
+async def _deliver_contact_async(client, phone: str, message: str, channel: Channel) -> ContactResult:
+    """_deliver_contact'ın async karşılığı."""
+    cr = ContactResult(phone=phone)
+    if channel in ("waterfall", "whatsapp"):
+        _record_whatsapp(cr, await _send_single_async(client, "whatsapp", phone, message))
+    if _should_try_sms(channel, cr):
+        _record_sms(cr, channel, await _send_single_async(client, "sms", phone, message))
+    return _finish_contact(cr)
+
+
+def _aggregate(result: WaterfallResult, contacts: List[ContactResult]) -> None:
+    """Numara sonuçlarını (giriş sırasıyla) toplam sonuca ekler."""
+    for cr in contacts:
+        result.whatsapp_sent += cr.whatsapp_success
+        result.sms_sent += cr.sms_success
+        result.fallback_used |= cr.fallback_used
+        if not (cr.whatsapp_success or cr.sms_success):
+            result.failed += 1
+        result.details.append({
+            "phone": cr.phone,
+            "whatsapp_attempted": cr.whatsapp_attempted,
+            "whatsapp_success": cr.whatsapp_success,
+            "sms_attempted": cr.sms_attempted,
+            "sms_success": cr.sms_success,
+            "fallback_used": cr.fallback_used,
+            "error": cr.error,
+        })
+
+
+def _no_client(result: WaterfallResult, numbers: List[str]) -> None:
+    result.failed = len(numbers)
+    result.details = [{"phone": p, "error": "Twilio client yok"} for p in numbers]
+    logger.critical(
+        "[TwilioFallback] Twilio client başlatılamadı — %d numara bildirimsiz kaldı!",
+        len(numbers)
+    )
+
+
 def send_waterfall_emergency(
     phone_numbers: list[str],
     message: str,
@@ -202,6 +338,7 @@ def send_waterfall_emergency(
       - "sms":       Sadece SMS
 
     Her numara için bağımsız fallback — bir numaranın başarısızlığı diğerini etkilemez.
+    Numaraların şelaleleri paylaşılan havuzda eşzamanlı koşar.
 
     Returns:
         WaterfallResult.to_dict()
@@ -214,69 +351,50 @@ def send_waterfall_emergency(
 
     client = _get_twilio_client()
     if client is None:
-        result.failed = len(numbers)
-        result.details = [{"phone": p, "error": "Twilio client yok"} for p in numbers]
-        logger.critical(
-            "[TwilioFallback] Twilio client başlatılamadı — %d numara bildirimsiz kaldı!",
-            len(numbers)
-        )
+        _no_client(result, numbers)
         _log_to_db(result, user_id, event_type)
         return result.to_dict()
 
-    for phone in numbers:
-        cr = ContactResult(phone=phone)
-
-        # ── WhatsApp adımı ──────────────────────────────────────────────────
-        if channel in ("waterfall", "whatsapp"):
-            cr.whatsapp_attempted = True
-            success, err = _send_whatsapp_single(client, phone, message)
-            cr.whatsapp_success = success
-            if success:
-                result.whatsapp_sent += 1
-            else:
-                cr.error = err
-
-        # ── SMS Fallback adımı ──────────────────────────────────────────────
-        # "waterfall" modunda: WA başarısızsa SMS'e düş
-        # "sms" modunda: Direkt SMS
-        should_try_sms = (
-            channel == "sms"
-            or (channel == "waterfall" and not cr.whatsapp_success)
-        )
-
-        if should_try_sms:
-            cr.sms_attempted = True
-            if channel == "waterfall":
-                cr.fallback_used = True
-                result.fallback_used = True
-
-            success, err = _send_sms_single(client, phone, message)
-            cr.sms_success = success
-            if success:
-                result.sms_sent += 1
-            else:
-                cr.error = (cr.error or "") + f" | SMS: {err}"
-
-        # Her iki kanal da başarısız ise failed sayacını artır
-        any_success = cr.whatsapp_success or cr.sms_success
-        if not any_success:
-            result.failed += 1
-            logger.error(
-                "[TwilioFallback] BAŞARISIZ: %s → WA=%s SMS=%s hata=%s",
-                phone, cr.whatsapp_attempted, cr.sms_attempted, cr.error
-            )
-
-        result.details.append({
-            "phone": phone,
-            "whatsapp_attempted": cr.whatsapp_attempted,
-            "whatsapp_success": cr.whatsapp_success,
-            "sms_attempted": cr.sms_attempted,
-            "sms_success": cr.sms_success,
-            "fallback_used": cr.fallback_used,
-            "error": cr.error,
-        })
+    _aggregate(result, list(_twilio_executor().map(
+        lambda phone: _deliver_contact(client, phone, message, channel), numbers,
+    )))
 
     # Sonucu DB'ye kaydet (hata olsa da ana akış devam eder)
     _log_to_db(result, user_id, event_type)
 
     return result.to_dict()
+
+
+async def send_waterfall_emergency_async(
+    phone_numbers: list[str],
+    message: str,
+    channel: Channel = "waterfall",
+    user_id: Optional[int] = None,
+    event_type: str = "SOS",
+) -> dict:
+    """
+    send_waterfall_emergency'nin async karşılığı — FastAPI endpoint'leri ve async
+    görevler için. Twilio çağrıları paylaşılan httpx havuzundan gider
+    (app.services.twilio_async); hiçbir thread Twilio'yu beklemez. Numaraların
+    şelaleleri eşzamanlı koşar; eşzamanlı HTTP isteği havuz boyutuyla
+    (TWILIO_MAX_CONCURRENCY) sınırlıdır. Sonuç biçimi senkron sürümle aynıdır.
+    """
+    from app.services.twilio_async import get_async_twilio_client
+
+    numbers = list({p.strip() for p in phone_numbers if p and p.strip()})
+    result = WaterfallResult(total=len(numbers))
+
+    if not numbers:
+        return result.to_dict()
+
+    client = get_async_twilio_client()
+    if client is None:
+        _no_client(result, numbers)
+        await _log_to_db_async(result, user_id, event_type)
+        return result.to_dict()
+
+    _aggregate(result, list(await asyncio.gather(
+        *(_deliver_contact_async(client, phone, message, channel) for phone in numbers)
+    )))
+    await _log_to_db_async(result, user_id, event_type)
+    return result.to_dict()
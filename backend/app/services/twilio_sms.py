@@ -1,22 +1,27 @@
 """
 Twilio SMS/WhatsApp servisi.
 Acil durumlarda emergency contacts'a SMS ve WhatsApp mesajı gönderir.
+
+Çağrılar async Twilio taşıyıcısından (app.services.twilio_async — paylaşılan
+httpx.AsyncClient) gider; olay döngüsü ve thread havuzu Twilio'yu beklemez.
 """
 
+import asyncio
 import logging
 from typing import List, Optional
 
 from app.config import settings
+from app.services.twilio_async import get_async_twilio_client
 
 logger = logging.getLogger(__name__)
 
 # Twilio SDK — opsiyonel
 try:
-    from twilio.rest import Client
     from twilio.base.exceptions import TwilioRestException
     _TWILIO_AVAILABLE = True
 except ImportError:
     _TWILIO_AVAILABLE = False
+    TwilioRestException = Exception  # type: ignore[assignment,misc]
     logger.warning("twilio paketi bulunamadı. SMS/WhatsApp bildirimleri devre dışı.")
 
 
@@ -24,26 +29,7 @@ class TwilioService:
     """Twilio SMS ve WhatsApp mesaj gönderme servisi."""
 
     def __init__(self):
-        self.client: Optional[Client] = None
         self.from_number = settings.TWILIO_PHONE_NUMBER
-        self._init_client()
-
-    def _init_client(self) -> bool:
-        """Twilio client'ı başlatır."""
-        if not _TWILIO_AVAILABLE:
-            return False
-
-        if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
-            logger.warning("Twilio yapılandırması eksik. SMS/WhatsApp devre dışı.")
-            return False
-
-        try:
-            self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            logger.info("Twilio client başlatıldı.")
-            return True
-        except Exception as exc:
-            logger.error("Twilio başlatma hatası: %s", exc)
-            return False
 
     async def send_sms(self, to_number: str, message: str) -> bool:
         """
@@ -56,12 +42,13 @@ class TwilioService:
         Returns:
             True → başarılı, False → hata
         """
-        if not self.client:
+        client = get_async_twilio_client()
+        if client is None:
             logger.warning("Twilio client başlatılmamış, SMS gönderilemedi.")
             return False
 
         try:
-            msg = self.client.messages.create(
+            msg = await client.messages.create_async(
                 body=message,
                 from_=self.from_number,
                 to=to_number
@@ -86,7 +73,8 @@ class TwilioService:
         Returns:
             True → başarılı, False → hata
         """
-        if not self.client:
+        client = get_async_twilio_client()
+        if client is None:
             logger.warning("Twilio client başlatılmamış, WhatsApp gönderilemedi.")
             return False
 
@@ -95,7 +83,7 @@ class TwilioService:
             whatsapp_to = f"whatsapp:{to_number}"
             whatsapp_from = f"whatsapp:{self.from_number}"
 
-            msg = self.client.messages.create(
+            msg = await client.messages.create_async(
                 body=message,
                 from_=whatsapp_from,
                 to=whatsapp_to
@@ -129,15 +117,9 @@ class TwilioService:
         if not phone_numbers:
             return 0
 
-        success_count = 0
-        for phone in phone_numbers:
-            if use_whatsapp:
-                success = await self.send_whatsapp(phone, message)
-            else:
-                success = await self.send_sms(phone, message)
-
-            if success:
-                success_count += 1
+        # Numaralar eşzamanlı; eşzamanlı istek httpx havuzuyla sınırlı
+        send = self.send_whatsapp if use_whatsapp else self.send_sms
+        success_count = sum(await asyncio.gather(*(send(phone, message) for phone in phone_numbers)))
 
         logger.info(
             "Acil durum mesajı: %d/%d başarılı (%s)",
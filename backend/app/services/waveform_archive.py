@@ -0,0 +1,263 @@
+"""
+Dalga formu arşivi — cihaz/olay başına int16 parçaların (chunk) sıkışık saklanması.
+
+Yerleşim (saat bazlı bölümleme, sorgu sadece ilgili saatlere dokunur):
+  <base>/<YYYYMMDDHH>/<pid>-<n>.seg  → ardışık chunk'lar: başlık + int16 (N, 3)
+  <base>/<YYYYMMDDHH>/<pid>-<n>.idx  → sabit boyutlu indeks kayıtları (INDEX_DTYPE)
+
+Her süreç kendi segment dosyasına yazar (uvicorn worker'ları arasında kilit
+gerekmez); dosyalar yalnızca sona ekleme ile büyür. Önce veri, sonra indeks
+yazılır: yarım kalan yazımda indeks veriden öne geçemez.
+
+Okuma mmap ile yapılır: indeks numpy structured dizi olarak, örnekler int16
+görünüm (view) olarak kopyasız döner; zaman/konum filtresi vektörize çalışır.
+"""
+
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.utils.geo import haversine_distance_km
+
+logger = logging.getLogger(__name__)
+
+CHUNK_MAGIC = b"WFA1"
+# magic | n_samples | start_ts | sample_rate | scale | lat | lon | device_id_len
+_HEADER = struct.Struct("<4sIdffffH")
+_ALIGN = 8
+_DEVICE_ID_MAX = 128
+_SEGMENT_MAX_BYTES: int = 256 * 1024 * 1024
+_KM_PER_DEG_LAT: float = 111.0
+
+INDEX_DTYPE = np.dtype([
+    ("start_ts", "<f8"),
+    ("end_ts", "<f8"),
+    ("offset", "<u8"),      # int16 verinin segment içindeki başlangıcı
+    ("n_samples", "<u4"),
+    ("sample_rate", "<f4"),
+    ("scale", "<f4"),
+    ("lat", "<f4"),
+    ("lon", "<f4"),
+    ("device_id", f"S{_DEVICE_ID_MAX}"),
+])
+
+
+class WaveformArchiveError(Exception):
+    """Arşiv yazma/okuma hatası."""
+
+
+@dataclass(frozen=True)
+class WaveformChunk:
+    """Arşivden okunan parça; counts mmap üzerinde kopyasız int16 görünümdür."""
+
+    device_id: str
+    start_ts: float
+    sample_rate: float
+    scale: float
+    latitude: float
+    longitude: float
+    counts: np.ndarray  # (N, 3) int16, salt okunur
+
+    def acceleration(self) -> np.ndarray:
+        """(N, 3) ivme (m/s²) — yeni dizi ayırır."""
+        return self.counts * self.scale
+
+
+def _hour_bucket(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y%m%d%H")
+
+
+def _pad(n: int) -> int:
+    return (-n) % _ALIGN
+
+
+class WaveformArchive:
+    """Append-only segment dosyaları + mmap okuyucu."""
+
+    def __init__(self, base_path: str | Path, segment_max_bytes: int = _SEGMENT_MAX_BYTES):
+        self.base_path = Path(base_path)
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        self._segments: Dict[str, Path] = {}        # saat → bu sürecin aktif segmenti
+        self._maps: Dict[Path, mmap.mmap] = {}
+
+    # ── Yazma ────────────────────────────────────────────────────────────────
+
+    def _segment_for(self, bucket: str, incoming: int) -> Path:
+        seg = self._segments.get(bucket)
+        if seg is not None and seg.stat().st_size + incoming <= self.segment_max_bytes:
+            return seg
+        directory = self.base_path / bucket
+        directory.mkdir(parents=True, exist_ok=True)
+        n = 0
+        while (directory / f"{os.getpid()}-{n}.seg").exists():
+            n += 1
+        seg = directory / f"{os.getpid()}-{n}.seg"
+        seg.touch()
+        self._segments[bucket] = seg
+        return seg
+
+    def append(
+        self,
+        device_id: str,
+        start_ts: float,
+        sample_rate: float,
+        scale: float,
+        latitude: float,
+        longitude: float,
+        counts: np.ndarray,
+    ) -> None:
+        """
+        Bir cihaz penceresini arşive ekler.
+
+        Args:
+            counts: (N, 3) int16 sayımlar (ivme = counts × scale).
+
+        Raises:
+            WaveformArchiveError: Geçersiz veri veya disk hatası.
+        """
+        counts = np.ascontiguousarray(counts, dtype="<i2")
+        if counts.ndim != 2 or counts.shape[1] != 3 or not len(counts):
+            raise WaveformArchiveError("counts (N, 3) int16 olmalı")
+        dev = device_id.encode()[:_DEVICE_ID_MAX]
+        header = _HEADER.pack(CHUNK_MAGIC, len(counts), start_ts, sample_rate, scale, latitude, longitude, len(dev))
+        prefix = header + dev + b"\0" * _pad(len(header) + len(dev))
+        payload = counts.tobytes()
+
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record[0] = (
+            start_ts, start_ts + len(counts) / sample_rate, 0, len(counts),
+            sample_rate, scale, latitude, longitude, dev,
+        )
+        with self._lock:
+            try:
+                seg = self._segment_for(_hour_bucket(start_ts), len(prefix) + len(payload))
+                with open(seg, "ab") as f:
+                    record["offset"] = f.tell() + len(prefix)
+                    f.write(prefix + payload + b"\0" * _pad(len(payload)))
+                with open(seg.with_suffix(".idx"), "ab") as f:
+                    f.write(record.tobytes())
+            except OSError as exc:
+                raise WaveformArchiveError(f"Dalga formu arşive yazılamadı: {exc}") from exc
+
+    # ── Okuma ────────────────────────────────────────────────────────────────
+
+    def _map(self, path: Path, min_size: int) -> Optional[mmap.mmap]:
+        """Dosyanın mmap'i; dosya büyüdüyse yeniden eşlenir."""
+        mapped = self._maps.get(path)
+        if mapped is not None and len(mapped) >= min_size:
+            return mapped
+        size = path.stat().st_size
+        if size == 0:
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[path] = mapped  # Eski eşleme, ona bakan görünümler bitince GC ile kapanır
+        return mapped
+
+    def _segments_between(self, start_ts: float, end_ts: float) -> Iterator[Path]:
+        # Bir chunk önceki saatte başlayıp bu aralığa taşabilir → bir saat geriden başla
+        hour = datetime.fromtimestamp(start_ts, tz=timezone.utc).replace(minute=0, second=0, microsecond=0)
+        hour -= timedelta(hours=1)
+        while hour.timestamp() <= end_ts:
+            directory = self.base_path / hour.strftime("%Y%m%d%H")
+            if directory.is_dir():
+                yield from sorted(directory.glob("*.seg"))
+            hour += timedelta(hours=1)
+
+    def query(
+        self,
+        start_ts: float,
+        end_ts: float,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius_km: Optional[float] = None,
+        device_id: Optional[str] = None,
+    ) -> List[WaveformChunk]:
+        """
+        [start_ts, end_ts] ile kesişen chunk'ları döner; isteğe bağlı olarak
+        merkezden radius_km içindeki veya tek cihaza ait olanlarla sınırlar.
+        """
+        chunks: List[WaveformChunk] = []
+        for seg in self._segments_between(start_ts, end_ts):
+            idx_path = seg.with_suffix(".idx")
+            if not idx_path.exists():
+                continue
+            idx_map = self._map(idx_path, idx_path.stat().st_size)
+            if idx_map is None:
+                continue
+            index = np.frombuffer(idx_map, dtype=INDEX_DTYPE, count=len(idx_map) // INDEX_DTYPE.itemsize)
+            mask = (index["end_ts"] >= start_ts) & (index["start_ts"] <= end_ts)
+            if device_id is not None:
+                mask &= index["device_id"] == device_id.encode()[:_DEVICE_ID_MAX]
+            if radius_km is not None and latitude is not None and longitude is not None:
+                # Kaba bbox ön-filtresi (vektörize), ardından haversine
+                dlat = radius_km / _KM_PER_DEG_LAT
+                dlon = dlat / max(np.cos(np.radians(latitude)), 0.01)
+                mask &= (np.abs(index["lat"] - latitude) <= dlat) & (np.abs(index["lon"] - longitude) <= dlon)
+            hits = index[mask]
+            if not len(hits):
+                continue
+            seg_map = self._map(seg, int((hits["offset"] + hits["n_samples"].astype("u8") * 6).max()))
+            for rec in hits:
+                lat, lon = float(rec["lat"]), float(rec["lon"])
+                if radius_km is not None and latitude is not None and longitude is not None:
+                    if haversine_distance_km(latitude, longitude, lat, lon) > radius_km:
+                        continue
+                end = int(rec["offset"]) + int(rec["n_samples"]) * 6
+                if seg_map is None or end > len(seg_map):
+                    continue  # Veri henüz diske ulaşmamış (yarım yazım)
+                counts = np.frombuffer(seg_map, dtype="<i2", count=int(rec["n_samples"]) * 3,
+                                       offset=int(rec["offset"])).reshape(-1, 3)
+                chunks.append(WaveformChunk(
+                    device_id=rec["device_id"].decode(),
+                    start_ts=float(rec["start_ts"]),
+                    sample_rate=float(rec["sample_rate"]),
+                    scale=float(rec["scale"]),
+                    latitude=lat,
+                    longitude=lon,
+                    counts=counts,
+                ))
+        return chunks
+
+    # ── Bakım ────────────────────────────────────────────────────────────────
+
+    def prune(self, older_than_ts: float) -> int:
+        """older_than_ts'den eski saat dizinlerini siler; silinen dizin sayısını döner."""
+        cutoff = _hour_bucket(older_than_ts)
+        removed = 0
+        if not self.base_path.is_dir():
+            return 0
+        for directory in self.base_path.iterdir():
+            if directory.is_dir() and directory.name.isdigit() and directory.name < cutoff:
+                for path in list(self._maps):
+                    if path.parent == directory:
+                        self._maps.pop(path, None)
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def close(self) -> None:
+        self._maps.clear()
+        self._segments.clear()
+
+
+_archive: Optional[WaveformArchive] = None
+
+
+def get_waveform_archive() -> WaveformArchive:
+    """Süreç başına tek WaveformArchive (settings.SEISMIC_WAVEFORM_ARCHIVE_PATH)."""
+    global _archive
+    if _archive is None:
+        _archive = WaveformArchive(settings.SEISMIC_WAVEFORM_ARCHIVE_PATH)
+    return _archive
@@ -0,0 +1,215 @@
+"""
+Sunucu tarafı dalga formu analiz motoru.
+Cihazların gönderdiği sıkıştırılmış 3 eksen ivme pencerelerini NumPy ile toplu
+(cihazlar × örnekler matrisi) işler: vector magnitude → high-pass → STA/LTA.
+Tetiklenen pencereler SeismicClusterEngine'e rapor olarak beslenir.
+
+Aynı formüller app.utils.sta_lta ile birebir aynıdır (örnek başına Python
+döngüsü yerine matris işlemleri); böylece eşikler merkezi olarak ayarlanabilir.
+rules.md: type hints, logging, magic number yasak.
+"""
+
+import base64
+import binascii
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.sta_lta import DEFAULT_HIGHPASS_ALPHA, DEFAULT_TRIGGER_RATIO
+
+if TYPE_CHECKING:
+    from app.services.waveform_archive import WaveformChunk
+
+logger = logging.getLogger(__name__)
+
+# IIR filtre kapalı formu α^-k ile ölçekler; blok boyu float64 hassasiyetini korur
+_HPF_BLOCK: int = 128
+# Sıkıştırılmış pencere üst sınırı (zip bomb koruması): 60 sn × 200 Hz × 3 eksen × int16
+MAX_DECODED_BYTES: int = 60 * 200 * 3 * 2
+
+
+class WaveformDecodeError(ValueError):
+    """Pencere verisi çözülemedi veya beklenen boyutta değil."""
+
+
+@dataclass(frozen=True)
+class WaveformVerdict:
+    """Tek pencerenin analiz sonucu."""
+
+    sta_lta_ratio: float      # Penceredeki en yüksek STA/LTA oranı
+    peak_acceleration: float  # Filtrelenmiş (yerçekimsiz) tepe ivme, m/s²
+    triggered: bool
+
+
+def decode_counts(data: str) -> np.ndarray:
+    """
+    base64(zlib(int16 LE, x/y/z sıralı)) veriyi (N, 3) int16 sayımlara çevirir.
+
+    Raises:
+        WaveformDecodeError: Bozuk veya tam 3 eksene bölünmeyen veri.
+    """
+    try:
+        inflater = zlib.decompressobj()
+        raw = inflater.decompress(base64.b64decode(data, validate=True), MAX_DECODED_BYTES)
+    except (binascii.Error, zlib.error) as exc:
+        raise WaveformDecodeError(f"Dalga formu çözülemedi: {exc}") from exc
+    if inflater.unconsumed_tail:
+        raise WaveformDecodeError("Dalga formu izin verilen boyutu aşıyor")
+    if len(raw) % 6 or not raw:
+        raise WaveformDecodeError("Dalga formu int16 × 3 eksen hizasında değil")
+    return np.frombuffer(raw, dtype="<i2").reshape(-1, 3)
+
+
+def decode_window(data: str, scale: float) -> np.ndarray:
+    """
+    Sıkıştırılmış pencereyi (N, 3) float64 ivmeye (m/s²) çevirir.
+
+    Args:
+        data: Sıkıştırılmış pencere.
+        scale: Sayım başına ivme (m/s²).
+    """
+    return decode_counts(data) * scale
+
+
+def encode_window(samples: np.ndarray, scale: float) -> str:
+    """decode_window'un tersi — test ve yük üreteçleri için."""
+    counts = np.clip(np.round(samples / scale), -32768, 32767).astype("<i2")
+    return base64.b64encode(zlib.compress(counts.tobytes())).decode("ascii")
+
+
+def high_pass_batch(x: np.ndarray, alpha: float = DEFAULT_HIGHPASS_ALPHA) -> np.ndarray:
+    """
+    (D, N) matrisine satır bazında high_pass_filter uygular.
+
+    y[n] = α·(y[n-1] + x[n] − x[n-1]) özyinelemesi, y[-1] = 0 ve x[-1] = x[0]
+    (StreamingStaLta ile aynı sıcak başlangıç) varsayımıyla blok blok kapalı
+    formda çözülür: y[m] = α^(m+1)·(y_prev + Σ α^(−k)·d[k]).
+    """
+    d = np.diff(x, axis=1, prepend=x[:, :1])
+    out = np.empty_like(d)
+    y_prev = np.zeros(x.shape[0])
+    for start in range(0, d.shape[1], _HPF_BLOCK):
+        block = d[:, start:start + _HPF_BLOCK]
+        k = np.arange(block.shape[1])
+        acc = np.cumsum(block * alpha ** -k, axis=1) + y_prev[:, None]
+        out[:, start:start + block.shape[1]] = acc * alpha ** (k + 1)
+        y_prev = out[:, start + block.shape[1] - 1]
+    return out
+
+
+def sta_lta_batch(filtered: np.ndarray, sta_window: int, lta_window: int) -> np.ndarray:
+    """
+    (D, N) matrisinde her örnek için STA/LTA oranı (compute_sta_lta ile aynı).
+    LTA penceresi dolmadan ve LTA sıfırken oran 0'dır.
+    """
+    d, n = filtered.shape
+    ratios = np.zeros((d, n))
+    if n < lta_window:
+        return ratios
+    csum = np.zeros((d, n + 1))
+    np.cumsum(np.abs(filtered), axis=1, out=csum[:, 1:])
+    end = np.arange(lta_window, n + 1)
+    sta = (csum[:, end] - csum[:, end - sta_window]) / sta_window
+    lta = (csum[:, end] - csum[:, end - lta_window]) / lta_window
+    np.divide(sta, lta, out=ratios[:, lta_window - 1:], where=lta > 0)
+    return ratios
+
+
+def analyze_batch(
+    windows: Sequence[np.ndarray],
+    sample_rate_hz: float,
+    sta_sec: float,
+    lta_sec: float,
+    trigger_ratio: float = DEFAULT_TRIGGER_RATIO,
+) -> List[WaveformVerdict]:
+    """
+    Aynı örnekleme hızındaki pencereleri uzunluğa göre gruplayıp her grubu
+    tek (D, N) matris olarak analiz eder.
+
+    Args:
+        windows: (N, 3) ivme dizileri.
+        sample_rate_hz: Örnekleme frekansı.
+        sta_sec: Kısa pencere (sn).
+        lta_sec: Uzun pencere (sn).
+        trigger_ratio: Tetikleme eşiği.
+
+    Returns:
+        Giriş sırasıyla WaveformVerdict listesi.
+    """
+    sta_window = max(1, int(round(sta_sec * sample_rate_hz)))
+    lta_window = max(sta_window, int(round(lta_sec * sample_rate_hz)))
+
+    groups: Dict[int, List[int]] = {}
+    for idx, w in enumerate(windows):
+        groups.setdefault(len(w), []).append(idx)
+
+    verdicts: List[WaveformVerdict] = [None] * len(windows)  # type: ignore[list-item]
+    for indices in groups.values():
+        stack = np.stack([windows[i] for i in indices])            # (D, N, 3)
+        magnitude = np.sqrt(np.einsum("dnk,dnk->dn", stack, stack))
+        filtered = high_pass_batch(magnitude)
+        max_ratio = sta_lta_batch(filtered, sta_window, lta_window).max(axis=1)
+        peak = np.abs(filtered).max(axis=1)
+        for row, i in enumerate(indices):
+            verdicts[i] = WaveformVerdict(
+                sta_lta_ratio=float(max_ratio[row]),
+                peak_acceleration=float(peak[row]),
+                triggered=bool(max_ratio[row] >= trigger_ratio),
+            )
+    return verdicts
+
+
+def decode_and_analyze(
+    payloads: Sequence[Tuple[str, float]],
+    sample_rate_hz: float,
+    sta_sec: float,
+    lta_sec: float,
+    trigger_ratio: float = DEFAULT_TRIGGER_RATIO,
+    on_decoded: Optional[Callable[[int, np.ndarray], None]] = None,
+) -> List[WaveformVerdict | WaveformDecodeError]:
+    """
+    (data, scale) çiftlerini çözüp analiz eder; çözülemeyen pencere için
+    sonuç listesinde ilgili hata nesnesi döner (batch'in geri kalanı işlenir).
+    on_decoded verilirse her çözülen pencerenin (sıra, int16 sayımlar) ile
+    çağrılır (ör. arşivleme) — ikinci kez çözme gerekmez.
+    """
+    results: List[WaveformVerdict | WaveformDecodeError] = []
+    decoded: List[np.ndarray] = []
+    positions: List[int] = []
+    for data, scale in payloads:
+        try:
+            counts = decode_counts(data)
+            if on_decoded is not None:
+                on_decoded(len(results), counts)
+            decoded.append(counts * scale)
+            positions.append(len(results))
+            results.append(None)  # type: ignore[arg-type]
+        except WaveformDecodeError as exc:
+            logger.warning("Dalga formu atlandı: %s", exc)
+            results.append(exc)
+    for pos, verdict in zip(positions, analyze_batch(decoded, sample_rate_hz, sta_sec, lta_sec, trigger_ratio)):
+        results[pos] = verdict
+    return results
+
+
+def reanalyze_chunks(
+    chunks: Sequence["WaveformChunk"],
+    sta_sec: float,
+    lta_sec: float,
+    trigger_ratio: float = DEFAULT_TRIGGER_RATIO,
+) -> List[Tuple["WaveformChunk", WaveformVerdict]]:
+    """
+    Arşivden okunan chunk'lara STA/LTA'yı yeniden uygular (ör. eşik ayarı
+    sonrası son bir saati tekrar değerlendirme). Örnekleme hızına göre gruplanır.
+    """
+    by_rate: Dict[float, List["WaveformChunk"]] = {}
+    for chunk in chunks:
+        by_rate.setdefault(chunk.sample_rate, []).append(chunk)
+    out: List[Tuple["WaveformChunk", WaveformVerdict]] = []
+    for rate, group in by_rate.items():
+        verdicts = analyze_batch([c.acceleration() for c in group], rate, sta_sec, lta_sec, trigger_ratio)
+        out.extend(zip(group, verdicts))
+    return out
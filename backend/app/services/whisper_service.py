@@ -2,14 +2,15 @@
 Groq Whisper transkripsiyon servisi (S.O.S ses → metin).
 OpenAI Whisper yerine Groq whisper-large-v3 kullanır.
 API anahtarı .env içinde GROQ_API_KEY olarak tanımlanır.
+Client süreç başına paylaşılır (app.services.ai_clients); çağrı süresi
+ai_latency histogramının "transcribe" aşamasına yazılır.
 """
 
 import logging
 from typing import Optional
 
-from groq import Groq
-
 from app.config import settings
+from app.services.ai_clients import provider_call
 
 logger = logging.getLogger(__name__)
 
@@ -54,13 +55,13 @@ class WhisperService:
         lang = language or self.language
 
         try:
-            client = Groq(api_key=self.api_key, timeout=timeout or self.timeout)
-            with open(audio_path, "rb") as audio_file:
+            with provider_call("groq", "transcribe") as client, open(audio_path, "rb") as audio_file:
                 response = client.audio.transcriptions.create(
                     file=audio_file,
                     model=self.model,
                     language=lang,
                     response_format="text",
+                    timeout=timeout or self.timeout,
                 )
 
             if hasattr(response, "text"):
@@ -3,6 +3,8 @@ Celery uygulaması. Tüm task'lar bu app üzerinden tanımlanır.
 """
 
 from celery import Celery
+from kombu import Queue
+
 from app.config import settings
 
 celery_app = Celery(
@@ -14,6 +16,13 @@ celery_app = Celery(
         "app.tasks.fetch_earthquakes",
         "app.tasks.process_sos",
         "app.tasks.send_emergency_twilio",
+        "app.tasks.persist_seismic_reports",
+        "app.tasks.waveform_archive",
+        "app.tasks.prune_fcm_tokens",
+        "app.tasks.push_audience",
+        "app.tasks.quake_alarm",
+        "app.tasks.outbox",
+        "app.tasks.push_coalescing",
     ],
 )
 celery_app.conf.update(
@@ -22,9 +31,14 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="Europe/Istanbul",
     enable_utc=True,
+    # Alarm hattı ayrı kuyrukta: genel worker'lar -X alarms, alarm worker'ı
+    # -Q alarms --prefetch-multiplier=1 -O fair ile çalışır (config.ALARM_QUEUE).
+    # Outbox boşaltma görevleri kuyruğu kanala göre seçer (outbox.channel_queue).
+    task_default_queue="default",
+    task_queues=(Queue("default"), Queue(settings.ALARM_QUEUE)),
     task_routes={
         "app.tasks.notify_emergency_contacts.handle_confirmed_earthquake": {
-            "queue": "notifications"
+            "queue": settings.ALARM_QUEUE
         },
     },
     beat_schedule={
@@ -32,5 +46,41 @@ celery_app.conf.update(
             "task": "app.tasks.fetch_earthquakes.fetch_earthquakes_task",
             "schedule": settings.FETCH_INTERVAL_SECONDS,  # saniye cinsinden
         },
+        "persist-seismic-reports": {
+            "task": "app.tasks.persist_seismic_reports.persist_seismic_reports",
+            "schedule": settings.SEISMIC_PERSIST_INTERVAL_SECONDS,
+        },
+        "prune-waveform-archive": {
+            "task": "app.tasks.waveform_archive.prune_waveform_archive",
+            "schedule": 3600,
+        },
+        "rebuild-push-audience": {
+            "task": "app.tasks.push_audience.rebuild_push_audience",
+            "schedule": settings.PUSH_AUDIENCE_REBUILD_INTERVAL_SECONDS,
+        },
+        "drain-outbox-push": {
+            "task": "app.tasks.outbox.drain_outbox",
+            "schedule": settings.OUTBOX_DRAIN_INTERVAL_SECONDS,
+            "args": ("push",),
+        },
+        "drain-outbox-push-alarm": {
+            "task": "app.tasks.outbox.drain_outbox",
+            "schedule": settings.OUTBOX_DRAIN_INTERVAL_SECONDS,
+            "args": ("push_alarm",),
+            "options": {"queue": settings.ALARM_QUEUE},
+        },
+        "drain-outbox-ws": {
+            "task": "app.tasks.outbox.drain_outbox",
+            "schedule": settings.OUTBOX_DRAIN_INTERVAL_SECONDS,
+            "args": ("ws",),
+        },
+        "flush-coalesced-pushes": {
+            "task": "app.tasks.push_coalescing.flush_coalesced_pushes",
+            "schedule": settings.COALESCE_FLUSH_INTERVAL_SECONDS,
+        },
+        "purge-notification-outbox": {
+            "task": "app.tasks.outbox.purge_outbox",
+            "schedule": 3600,
+        },
     },
 )
@@ -1,12 +1,14 @@
 """
 Celery periyodik deprem veri çekme görevi.
 Her FETCH_INTERVAL_SECONDS saniyede bir çalışır (config'den okunur).
-Yeni depremler DB'ye kaydedilir, WebSocket üzerinden broadcast edilir,
-ve FCM push bildirimi gönderilir. Cache invalidate edilir.
+Yeni depremler DB'ye kaydedilir, cache invalidate edilir. Bildirimler
+(FCM push, WebSocket) aynı transaction'da outbox'a yazılır ve ayrı teslimat
+worker'larınca gönderilir (app.tasks.outbox) — fetch süresi teslimattan bağımsız.
 """
 
 import asyncio
 import logging
+import time
 from typing import List
 
 from app.config import settings
@@ -17,7 +19,7 @@ logger = logging.getLogger(__name__)
 
 async def _run_fetch() -> int:
     """
-    Asenkron fetch + DB kayıt + WebSocket broadcast + FCM push işlemi.
+    Asenkron fetch + DB kayıt (deprem ve outbox olayları tek transaction'da).
 
     Returns:
         Eklenen yeni deprem sayısı.
@@ -25,16 +27,13 @@ async def _run_fetch() -> int:
     # Geç import — Celery worker import döngüsünden kaçınmak için
     from app.services.earthquake_fetcher import EarthquakeFetcherService, EarthquakeData
     from app.services.cache_manager import invalidate_earthquake_cache
-    from app.services.fcm import send_earthquake_push_multicast, send_earthquake_confirmed_push
+    from app.services.outbox import (
+        CHANNEL_PUSH_ALARM, CHANNEL_WS, EVENT_EARTHQUAKE, EVENT_EARTHQUAKE_CONFIRMED, add_events, push_channel,
+    )
     from app.models.earthquake import Earthquake
-    from app.models.user import User
     from app.database import SyncSessionLocal
     from app.core.redis import get_redis
-    from app.api.websocket import manager as ws_manager
-    from sqlalchemy import select
-
-    # M≥4.0 depremler için nükleer alarm eşiği
-    NUCLEAR_ALARM_MAGNITUDE_THRESHOLD = 4.0
+    from app.tasks.outbox import kick_outbox
 
     async with EarthquakeFetcherService() as svc:
         quakes: List[EarthquakeData] = await svc.fetch_latest(hours=2)
@@ -42,6 +41,8 @@ async def _run_fetch() -> int:
     if not quakes:
         return 0
 
+    # Alarm SLO: depremin sistemde ilk görüldüğü an (AlarmTimeline.detected_ts)
+    detected_ts = time.time()
     new_quakes: List[EarthquakeData] = []
     with SyncSessionLocal() as session:
         for quake in quakes:
@@ -61,6 +62,38 @@ async def _run_fetch() -> int:
                 occurred_at=quake.occurred_at,
             )
             session.add(row)
+            push_payload = {
+                "id": db_id,
+                "magnitude": quake.magnitude,
+                "latitude": quake.latitude,
+                "longitude": quake.longitude,
+                "depth": quake.depth,
+                "location": quake.location,
+                "occurred_at": quake.occurred_at.isoformat(),
+                "detected_ts": detected_ts,
+            }
+            add_events(session, EVENT_EARTHQUAKE, db_id, {
+                # FCM — beklenen şiddet (MMI raster) + kullanıcı tercihleri (app.tasks.quake_alarm.push_quake);
+                # M≥ALARM_MIN_MAGNITUDE alarm kuyruğundan, küçükler varsayılan kuyruktan
+                push_channel(quake.magnitude): push_payload,
+                # WebSocket broadcast (tüm API süreçlerinin bağlı istemcileri)
+                CHANNEL_WS: {
+                    "type": "NEW_EARTHQUAKE",
+                    "data": {
+                        "id": db_id,
+                        "source": quake.source,
+                        "magnitude": quake.magnitude,
+                        "depth": quake.depth,
+                        "latitude": quake.latitude,
+                        "longitude": quake.longitude,
+                        "location": quake.location,
+                        "occurred_at": quake.occurred_at.isoformat(),
+                    },
+                },
+            })
+            if quake.magnitude >= settings.ALARM_MIN_MAGNITUDE:
+                # EARTHQUAKE_CONFIRMED tüm kullanıcılara; ayrı satır → hedefli push'tan bağımsız yeniden denenir
+                add_events(session, EVENT_EARTHQUAKE_CONFIRMED, db_id, {CHANNEL_PUSH_ALARM: push_payload})
             new_quakes.append(quake)
         session.commit()
 
@@ -68,6 +101,7 @@ async def _run_fetch() -> int:
         return 0
 
     logger.info("💾 %d yeni deprem kaydedildi.", len(new_quakes))
+    kick_outbox()
 
     # Cache invalidate
     try:
@@ -76,93 +110,6 @@ async def _run_fetch() -> int:
     except Exception as exc:
         logger.warning("Cache invalidation başarısız: %s", exc)
 
-    # FCM token'larını ve tercihlerini topla (join ile çek)
-    from app.models.notification_pref import NotificationPref
-    from app.utils.geo import haversine_distance_km
-
-    users_with_push: List[User] = []
-    with SyncSessionLocal() as session:
-        # Note: notification_pref zaten lazy='selectin' olduğu için yüklenecektir
-        result = session.execute(
-            select(User).where(User.fcm_token.isnot(None))
-        )
-        users_with_push = result.scalars().all()
-
-    # WebSocket broadcast + FCM push
-    for quake in new_quakes:
-        quake_data: EarthquakeData = quake
-
-        # WebSocket broadcast (tüm bağlı istemciler)
-        await ws_manager.broadcast_earthquake({
-            "id": quake_data.db_id,
-            "source": quake_data.source,
-            "magnitude": quake_data.magnitude,
-            "depth": quake_data.depth,
-            "latitude": quake_data.latitude,
-            "longitude": quake_data.longitude,
-            "location": quake_data.location,
-            "occurred_at": quake_data.occurred_at.isoformat(),
-        })
-
-        # FCM push — Tercihlere göre filtrele
-        target_tokens: List[str] = []
-        for user in users_with_push:
-            pref = user.notification_pref
-            min_mag = pref.min_magnitude if pref else 3.0
-            radius = pref.radius_km if pref else 500.0
-            enabled = pref.is_enabled if pref else True
-
-            if not enabled:
-                continue
-
-            if quake_data.magnitude < min_mag:
-                continue
-
-            # Konum kontrolü (opsiyonel)
-            if user.latitude is not None and user.longitude is not None:
-                dist = haversine_distance_km(
-                    user.latitude, user.longitude, quake_data.latitude, quake_data.longitude
-                )
-                if dist > radius:
-                    continue
-
-            target_tokens.append(user.fcm_token)
-
-        if target_tokens:
-            # Standart deprem bildirimi (tüm uygun kullanıcılar)
-            await send_earthquake_push_multicast(
-                fcm_tokens=target_tokens,
-                magnitude=quake_data.magnitude,
-                location=quake_data.location,
-                depth=quake_data.depth,
-                occurred_at=quake_data.occurred_at.isoformat(),
-            )
-
-        # ── EARTHQUAKE_CONFIRMED Nükleer Alarm Push ────────────────────────
-        # M≥4.0 depremlerde tüm kullanıcılara priority="high" data-only push gönderir.
-        # Android: Doze Mode'u deler → telefon uyanır → Nükleer Alarm tetiklenir.
-        # iOS: content-available=1 + critical=True → Sessiz mod bypass.
-        if quake_data.magnitude >= NUCLEAR_ALARM_MAGNITUDE_THRESHOLD:
-            all_tokens = [u.fcm_token for u in users_with_push if u.fcm_token]
-            if all_tokens:
-                try:
-                    sent = await send_earthquake_confirmed_push(
-                        fcm_tokens=all_tokens,
-                        latitude=quake_data.latitude,
-                        longitude=quake_data.longitude,
-                        device_count=1,  # AFAD/Kandilli onaylı → cihaz sayısı 1 olarak işaret
-                        occurred_at=quake_data.occurred_at.isoformat(),
-                    )
-                    logger.info(
-                        "[NükleerAlarm] EARTHQUAKE_CONFIRMED push: M%.1f %s → %d/%d token",
-                        quake_data.magnitude, quake_data.location,
-                        sent, len(all_tokens),
-                    )
-                except Exception as exc:
-                    logger.error(
-                        "[NükleerAlarm] EARTHQUAKE_CONFIRMED push hatası: %s", exc
-                    )
-
     return len(new_quakes)
 
 
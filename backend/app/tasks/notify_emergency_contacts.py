@@ -5,7 +5,9 @@ FCM data payload (EARTHQUAKE_CONFIRMED) da bu task içinde bölge kullanıcılar
 """
 
 import logging
-from typing import List
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 from sqlalchemy.orm import Session
 
@@ -15,6 +17,9 @@ from app.models.emergency_contact import EmergencyContact
 from app.utils.geo import haversine_distance_km
 from app.tasks.celery_app import celery_app
 
+if TYPE_CHECKING:
+    from app.services.alarm_latency import AlarmTimeline
+
 logger = logging.getLogger(__name__)
 
 # Bölge yarıçapı (km) — config'den okunabilir, worker'da settings import dikkatli olmalı
@@ -46,63 +51,133 @@ def handle_confirmed_earthquake(
     geohash: str,
     timestamp_iso: str,
     device_count: int,
+    extent_km: float = 0.0,
+    estimated_magnitude: Optional[float] = None,
+    origin_time_iso: Optional[str] = None,
+    uncertainty_km: float = 0.0,
+    detected_ts: Optional[float] = None,
+    enqueued_ts: Optional[float] = None,
 ) -> None:
     """
     Deprem doğrulandığında çağrılır. Bölgedeki kullanıcılara FCM gönderir,
     her kullanıcının acil kişilerine 'depreme yakalandım' mesajı iletir.
+    FCM 500'lük parçalar halinde eşzamanlı gönderilir; Twilio işleri tek
+    seferde (celery group) kuyruğa atılır.
+
+    latitude/longitude kestirilen episantrdır (varış zamanlarından veya şiddet
+    ağırlıklı merkez); hedef yarıçap kümenin yayılımı (extent_km) ve konum
+    belirsizliği (uncertainty_km, elipsin büyük yarı ekseni) kadar genişletilir.
+
+    Her kullanıcının S dalgası geri sayımı tüm bölge için tek vektörize geçişte
+    hesaplanır; oluş zamanı yoksa (merkez kestirimi) timestamp_iso esas alınır.
+
+    Görev alarm kuyruğunda (settings.ALARM_QUEUE) koşar; detected_ts/enqueued_ts
+    (sunucunun kümeyi doğruladığı ve görevi kuyruğa attığı an) ile FCM aşama
+    süreleri alarm_latency:shake histogramına yazılır. Twilio işleri varsayılan
+    kuyruğa gider, alarm worker'ını meşgul etmez.
     """
+    from app.services.alarm_latency import AlarmTimeline
+
+    timeline = AlarmTimeline("shake", detected_ts or time.time(), enqueued_ts, started_ts=time.time())
+    radius_km = RADIUS_KM + max(extent_km, 0.0) + max(uncertainty_km, 0.0)
     with SyncSessionLocal() as session:
         try:
-            users = _users_in_radius(session, latitude, longitude)
-            logger.info("Doğrulanan deprem: bölgede %s kullanıcı", len(users))
-
-            for user in users:
-                _send_fcm_earthquake_confirmed(user, latitude, longitude, timestamp_iso, device_count)
-                active_contacts = [c for c in user.emergency_contacts if c.is_active and c.phone_number]
-                if active_contacts:
-                    _notify_emergency_contacts(active_contacts, user, latitude, longitude, timestamp_iso)
+            users = _users_in_radius(session, latitude, longitude, radius_km)
+            logger.info(
+                "Doğrulanan deprem: bölgede %s kullanıcı (yarıçap=%.1fkm, M~%s)",
+                len(users), radius_km, estimated_magnitude,
+            )
+
+            countdowns = _s_wave_countdowns(users, latitude, longitude, origin_time_iso or timestamp_iso)
+            _send_fcm_earthquake_confirmed(
+                users, countdowns, latitude, longitude, timestamp_iso, device_count,
+                estimated_magnitude, origin_time_iso, uncertainty_km, timeline,
+            )
+            _notify_emergency_contacts(users, latitude, longitude, timestamp_iso)
         except Exception as e:
             logger.exception("handle_confirmed_earthquake hatası: %s", e)
             raise
+    timeline.record()
+
+
+def _s_wave_countdowns(
+    users: List[User], latitude: float, longitude: float, origin_iso: str,
+) -> List[Dict[str, str]]:
+    """Kullanıcı başına S dalgası geri sayım alanları (hata durumunda boş)."""
+    try:
+        from app.services.fcm import s_wave_countdown_fields
+        origin_ts = datetime.fromisoformat(origin_iso).timestamp()
+        return s_wave_countdown_fields(
+            latitude, longitude, origin_ts, [(u.latitude, u.longitude) for u in users],
+        )
+    except Exception as e:
+        logger.warning("S dalgası geri sayımı hesaplanamadı: %s", e)
+        return [{} for _ in users]
 
 
 def _send_fcm_earthquake_confirmed(
-    user: User,
+    users: List[User],
+    countdowns: List[Dict[str, str]],
     latitude: float,
     longitude: float,
     timestamp_iso: str,
     device_count: int,
+    estimated_magnitude: Optional[float] = None,
+    origin_time_iso: Optional[str] = None,
+    uncertainty_km: float = 0.0,
+    timeline: Optional["AlarmTimeline"] = None,
 ) -> None:
-    """Kullanıcıya FCM ile EARTHQUAKE_CONFIRMED data payload gönderir."""
-    if not user.fcm_token:
+    """
+    Bölge kullanıcılarına FCM ile EARTHQUAKE_CONFIRMED data payload gönderir.
+    Mesajlar kullanıcı başına (geri sayım alanları farklı) hazırlanır, Android/APNs
+    yapılandırması paylaşılır; gönderim fcm.send_each_batched ile yapılır.
+
+    countdowns: users ile aynı sırada s_wave_countdown_fields çıktısı.
+    """
+    recipients = [(u, c) for u, c in zip(users, countdowns) if u.fcm_token]
+    if not recipients:
         return
     try:
         from firebase_admin import messaging
-        message = messaging.Message(
-            data={
-                "type": "EARTHQUAKE_CONFIRMED",
-                "latitude": str(latitude),
-                "longitude": str(longitude),
-                "timestamp": timestamp_iso,
-                "device_count": str(device_count),
-            },
-            token=user.fcm_token,
-            android=messaging.AndroidConfig(
-                priority="high",
-                notification=messaging.AndroidNotification(
-                    channel_id="earthquake_alarm",
-                    priority="max",
-                ),
+        from app.services.fcm import send_each_batched
+        base = {
+            "type": "EARTHQUAKE_CONFIRMED",
+            "latitude": str(latitude),
+            "longitude": str(longitude),
+            "timestamp": timestamp_iso,
+            "device_count": str(device_count),
+        }
+        if estimated_magnitude is not None:
+            base["estimated_magnitude"] = str(estimated_magnitude)
+        if origin_time_iso is not None:
+            base["origin_time"] = origin_time_iso
+            base["uncertainty_km"] = str(uncertainty_km)
+        android = messaging.AndroidConfig(
+            priority="high",
+            notification=messaging.AndroidNotification(
+                channel_id="earthquake_alarm",
+                priority="max",
             ),
-            apns=messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(content_available=True, sound="default"),
-                ),
-                fcm_options=messaging.APNSFCMOptions(analytics_label="earthquake_confirmed"),
+        )
+        apns = messaging.APNSConfig(
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(content_available=True, sound="default"),
             ),
+            fcm_options=messaging.APNSFCMOptions(analytics_label="earthquake_confirmed"),
         )
-        messaging.send(message)
-        logger.info("FCM EARTHQUAKE_CONFIRMED gönderildi: user_id=%s", user.id)
+        tokens = [u.fcm_token for u, _ in recipients]
+        messages = [
+            messaging.Message(data={**base, **countdown}, token=u.fcm_token, android=android, apns=apns)
+            for u, countdown in recipients
+        ]
+        results = send_each_batched(tokens, messages, timeline)
+        failed = [(u, r) for (u, _), r in zip(recipients, results) if not r.success]
+        logger.info(
+            "FCM EARTHQUAKE_CONFIRMED gönderildi: %d/%d başarılı",
+            len(results) - len(failed), len(messages),
+        )
+        for user, res in failed:
+            logger.warning("FCM EARTHQUAKE_CONFIRMED başarısız: user_id=%s → %s", user.id, res.error)
     except ImportError:
         logger.warning("firebase_admin yok, FCM atlanıyor")
     except Exception as e:
@@ -110,27 +185,41 @@ def _send_fcm_earthquake_confirmed(
 
 
 def _notify_emergency_contacts(
-    contacts: List[EmergencyContact],
-    user: User,
+    users: List[User],
     latitude: float,
     longitude: float,
     timestamp_iso: str,
 ) -> None:
-    """Acil kişilere Twilio SMS+WhatsApp ile 'depreme yakalandım' mesajı iletir."""
-    message = (
-        f"{user.email} şu konumda depreme yakalandı: "
-        f"https://maps.google.com/?q={latitude},{longitude} ({timestamp_iso})"
-    )
-    phone_numbers = [c.phone_number for c in contacts if c.phone_number]
-    if not phone_numbers:
+    """
+    Kullanıcıların aktif acil kişilerine Twilio SMS+WhatsApp ile 'depreme
+    yakalandım' mesajı iletir. Kullanıcı başına bir iş oluşturulur (retry ve
+    sonuç logu kullanıcı bazında kalır), işler tek group çağrısıyla kuyruğa atılır.
+    """
+    jobs = []
+    for user in users:
+        phone_numbers = [c.phone_number for c in user.emergency_contacts if c.is_active and c.phone_number]
+        if not phone_numbers:
+            continue
+        message = (
+            f"{user.email} şu konumda depreme yakalandı: "
+            f"https://maps.google.com/?q={latitude},{longitude} ({timestamp_iso})"
+        )
+        jobs.append((user.id, phone_numbers, message))
+    if not jobs:
         return
     try:
+        from celery import group
         from app.tasks.send_emergency_twilio import send_emergency_alerts
-        send_emergency_alerts.apply_async(
-            args=[phone_numbers, message],
-            kwargs={"channel": "hybrid"},
-            queue="default",
+        group([
+            send_emergency_alerts.s(
+                phone_numbers, message, channel="hybrid",
+                user_id=user_id, event_type="EARTHQUAKE_EARLY_WARNING",
+            ).set(queue="default")
+            for user_id, phone_numbers, message in jobs
+        ]).apply_async()
+        logger.info(
+            "Erken uyarı Twilio kuyruğa atıldı: %d kullanıcı, %d numara",
+            len(jobs), sum(len(p) for _, p, _ in jobs),
         )
-        logger.info("Erken uyarı Twilio kuyruğa atıldı: user_id=%s contacts=%d", user.id, len(phone_numbers))
     except Exception as e:
         logger.error("Acil kişi bildirimi hatası: %s", e)
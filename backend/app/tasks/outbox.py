@@ -0,0 +1,219 @@
+"""
+Outbox teslimat worker'ları — kanal başına bağımsız boşaltma görevleri.
+
+push:       M<ALARM_MIN_MAGNITUDE depremlerin hedefli NEW_EARTHQUAKE push'u
+            (earthquake.new); varsayılan kuyrukta.
+push_alarm: M≥ALARM_MIN_MAGNITUDE depremlerin hedefli push'u ve ayrı satırda
+            EARTHQUAKE_CONFIRMED (earthquake.confirmed); alarm kuyruğunda,
+            ısıtılmış alarm worker'ında koşar.
+ws:         Yeni deprem olayını Redis WS bus'ına (settings.WS_BUS_CHANNEL) yayınlar;
+            her API süreci kendi WebSocket bağlantılarına iletir.
+
+Ingest commit'ten sonra kick_outbox() boşaltmayı hemen tetikler; beat aynı
+görevi OUTBOX_DRAIN_INTERVAL_SECONDS aralıkla yedek olarak çalıştırır
+(kaçan tetikler, geri çekilen denemeler, kirası dolan satırlar).
+
+Teslimatçılar (events, settle) alır ve id → hata döndürür. settle(event) olayı
+hemen teslim edildi olarak işaretler ve batch'in kalanının kirasını yeniler;
+push teslimatçısı her deprem fanout'undan sonra çağırır.
+"""
+
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.outbox import (
+    CHANNEL_PUSH,
+    CHANNEL_PUSH_ALARM,
+    CHANNEL_WS,
+    CHANNELS,
+    EVENT_EARTHQUAKE,
+    EVENT_EARTHQUAKE_CONFIRMED,
+    OutboxEvent,
+    channel_queue,
+    claim_batch,
+    extend_lease,
+    filter_undelivered,
+    mark_delivered,
+    mark_failed,
+    purge_delivered,
+    remember_delivered,
+)
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+# Tek çalıştırmada işlenecek en fazla batch (beat aralığını aşmamak için)
+_MAX_BATCHES_PER_RUN = 20
+
+
+Settle = Callable[[OutboxEvent], None]
+
+
+def _deliver_push(events: List[OutboxEvent], settle: Settle) -> Dict[int, str]:
+    """
+    Deprem push'larını gönderir; büyük depremler önce, aynı depremde hedefli
+    NEW_EARTHQUAKE (earthquake.new) alarmdan (earthquake.confirmed) önce. Her
+    olay iletilir iletilmez settle edilir; bir depremin iki olayı tek alarm
+    zaman çizelgesini paylaşır. Döner: id → hata (PushDeliveryError dahil).
+    """
+    from app.core.redis import get_redis
+    from app.services.alarm_latency import AlarmTimeline
+    from app.services.push_audience import load_audience
+    from app.tasks.quake_alarm import push_quake, push_quake_alarm, run_on_worker_loop
+
+    errors: Dict[int, str] = {}
+    senders = {EVENT_EARTHQUAKE: push_quake, EVENT_EARTHQUAKE_CONFIRMED: push_quake_alarm}
+
+    async def run() -> None:
+        try:
+            redis = await get_redis()
+        except Exception as exc:
+            logger.warning("Outbox push Redis'e ulaşamadı: %s", exc)
+            redis = None
+        audience = await load_audience(redis)
+        timelines: Dict[str, AlarmTimeline] = {}
+        recorded: Set[str] = set()
+        # Büyükler önce: birleştirme penceresini en büyük deprem açar
+        for event in sorted(events, key=lambda e: (-e.payload["magnitude"], e.event_type != EVENT_EARTHQUAKE)):
+            quake = event.payload
+            if quake["magnitude"] >= settings.ALARM_MIN_MAGNITUDE and quake["id"] not in timelines:
+                timelines[quake["id"]] = AlarmTimeline(
+                    "catalog", quake["detected_ts"], event.created_at.timestamp(), started_ts=time.time(),
+                )
+            timeline = timelines.get(quake["id"])
+            try:
+                await senders[event.event_type](quake, audience, timeline, redis=redis)
+            except Exception as exc:
+                errors[event.id] = str(exc)
+                continue
+            settle(event)
+            if timeline is not None:
+                recorded.add(quake["id"])
+        for quake_id in recorded:
+            timelines[quake_id].record()
+
+    run_on_worker_loop(run())
+    return errors
+
+
+def _deliver_ws(events: List[OutboxEvent], _settle: Settle) -> Dict[int, str]:
+    """Olayları WS bus'ına yayınlar (tek pipeline)."""
+    from app.core.redis import get_redis_sync
+
+    pipe = get_redis_sync().pipeline(transaction=False)
+    for event in events:
+        pipe.publish(settings.WS_BUS_CHANNEL, json.dumps(event.payload, ensure_ascii=False, default=str))
+    pipe.execute()
+    return {}
+
+
+_HANDLERS: Dict[str, Callable[[List[OutboxEvent], Settle], Dict[int, str]]] = {
+    CHANNEL_PUSH: _deliver_push,
+    CHANNEL_PUSH_ALARM: _deliver_push,
+    CHANNEL_WS: _deliver_ws,
+}
+
+
+def deliver(
+    channel: str,
+    events: List[OutboxEvent],
+    redis,
+    on_settled: Optional[Callable[[List[OutboxEvent]], None]] = None,
+) -> Dict[int, str]:
+    """
+    Kiralanmış olayları kanalın teslimatçısına verir.
+    Daha önce teslim edilmiş (tekrar kiralanmış) olaylar gönderilmeden başarılı
+    sayılır; başarılıların anahtarları Redis'e işaretlenir. Teslimatçının
+    settle ettiği olaylar on_settled ile hemen bildirilir. Döner: id → hata.
+    """
+    fresh = filter_undelivered(redis, events)
+    if len(fresh) < len(events):
+        logger.info("Outbox %s: %d olay daha önce teslim edilmiş, atlandı", channel, len(events) - len(fresh))
+    settled: Set[int] = set()
+
+    def settle(event: OutboxEvent) -> None:
+        remember_delivered(redis, [event])
+        settled.add(event.id)
+        if on_settled is not None:
+            on_settled([event])
+
+    try:
+        errors = _HANDLERS[channel](fresh, settle) if fresh else {}
+    except Exception as exc:
+        logger.error("Outbox %s teslimat hatası: %s", channel, exc)
+        errors = {e.id: str(exc) for e in fresh if e.id not in settled}
+    remember_delivered(redis, [e for e in fresh if e.id not in errors and e.id not in settled])
+    return errors
+
+
+@celery_app.task(name="app.tasks.outbox.drain_outbox", ignore_result=True)
+def drain_outbox(channel: str) -> dict:
+    """
+    Bir kanalın bekleyen outbox satırlarını kiralayıp teslim eder.
+    Aynı kanalı boşaltan birden çok worker SKIP LOCKED sayesinde çakışmaz.
+    """
+    from app.core.redis import get_redis_sync
+    from app.database import SyncSessionLocal
+
+    if channel not in _HANDLERS:
+        logger.error("Bilinmeyen outbox kanalı: %s", channel)
+        return {"delivered": 0, "failed": 0}
+
+    redis = get_redis_sync()
+    delivered = failed = 0
+    for _ in range(_MAX_BATCHES_PER_RUN):
+        with SyncSessionLocal() as session:
+            events = claim_batch(session, channel)
+            session.commit()
+        if not events:
+            break
+
+        settled: Set[int] = set()
+
+        def on_settled(done: List[OutboxEvent]) -> None:
+            settled.update(e.id for e in done)
+            with SyncSessionLocal() as session:
+                mark_delivered(session, (e.id for e in done))
+                extend_lease(session, (e.id for e in events if e.id not in settled))
+                session.commit()
+
+        errors = deliver(channel, events, redis, on_settled)
+        with SyncSessionLocal() as session:
+            mark_delivered(session, (e.id for e in events if e.id not in errors and e.id not in settled))
+            for event in events:
+                if event.id in errors:
+                    mark_failed(session, event, errors[event.id])
+            session.commit()
+        delivered += len(events) - len(errors)
+        failed += len(errors)
+        if len(events) < settings.OUTBOX_BATCH_SIZE:
+            break
+
+    if delivered or failed:
+        logger.info("Outbox %s: %d teslim, %d yeniden denenecek", channel, delivered, failed)
+    return {"delivered": delivered, "failed": failed}
+
+
+@celery_app.task(name="app.tasks.outbox.purge_outbox", ignore_result=True)
+def purge_outbox() -> int:
+    """Saklama süresi dolan teslim edilmiş outbox satırlarını siler."""
+    from app.database import SyncSessionLocal
+
+    with SyncSessionLocal() as session:
+        removed = purge_delivered(session)
+        session.commit()
+    if removed:
+        logger.info("Outbox: %d eski satır silindi", removed)
+    return removed
+
+
+def kick_outbox(channels=None) -> None:
+    """Kanalların boşaltma görevlerini kendi kuyruklarına atar (hata beat'e bırakılır)."""
+    for channel in channels or CHANNELS:
+        try:
+            drain_outbox.apply_async((channel,), queue=channel_queue(channel))
+        except Exception as exc:
+            logger.warning("Outbox boşaltma tetiklenemedi (%s), beat'e kaldı: %s", channel, exc)
@@ -0,0 +1,152 @@
+"""
+Sismik raporların toplu (batch) kalıcılaştırma görevi.
+POST /seismic/report raporları Redis bekleme listesine yazar; bu task
+Celery Beat ile SEISMIC_PERSIST_INTERVAL_SECONDS aralıkla listeyi boşaltıp
+seismic_reports tablosuna tek INSERT ... VALUES (executemany) ile aktarır.
+
+Kayıtlar bekleme listesinden silinmez, LMOVE ile işlenenler listesine taşınır ve
+ancak commit'ten sonra oradan LREM ile kaldırılır. Görev tek seferde yalnız bir
+worker'da koşar (SET NX kilidi, batch başına yenilenir); bu yüzden kilidi alan
+çalıştırma işlenenler listesinde bulduğu kayıtları önceki, commit'ten önce ölmüş
+(SIGKILL, OOM) çalıştırmadan kalmış sayıp bekleme listesine geri koyar — en az bir kez.
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, List
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+# Tek çalıştırmada boşaltılacak en fazla batch (beat aralığını aşmamak için)
+_MAX_BATCHES_PER_RUN = 20
+# Tek persist çalıştırması kilidi; her batch'te yenilenir, ölen worker'da bu süre sonunda düşer
+_LOCK_KEY = "{seis:pending_reports}:lock"
+_LOCK_TTL_SECONDS = 120
+
+
+def _decode(raw: List[str]) -> List[dict]:
+    """Bekleme listesi kayıtlarını DB satırına çevirir; bozuk kayıtlar atlanır."""
+    rows = []
+    for item in raw:
+        try:
+            row = json.loads(item)
+            row["reported_at"] = datetime.fromisoformat(row["reported_at"])
+            rows.append(row)
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.warning("Bozuk sismik rapor kaydı atlandı: %s", exc)
+    return rows
+
+
+def _claim_batch(redis: Any) -> List[str]:
+    """Bekleme listesinin başındaki en fazla SEISMIC_PERSIST_BATCH_SIZE kaydı işlenenler listesine taşır."""
+    from app.services.seismic_cluster import PENDING_REPORTS_KEY, PROCESSING_REPORTS_KEY
+
+    size = min(redis.llen(PENDING_REPORTS_KEY), settings.SEISMIC_PERSIST_BATCH_SIZE)
+    if not size:
+        return []
+    pipe = redis.pipeline(transaction=False)
+    for _ in range(size):
+        pipe.lmove(PENDING_REPORTS_KEY, PROCESSING_REPORTS_KEY, "LEFT", "RIGHT")
+    return [item for item in pipe.execute() if item is not None]
+
+
+def _release_batch(redis: Any, raw: List[str], requeue: bool = False) -> None:
+    """Batch'i işlenenler listesinden kaldırır; requeue ise bekleme listesinin başına geri koyar."""
+    from app.services.seismic_cluster import PENDING_REPORTS_KEY, PROCESSING_REPORTS_KEY
+
+    pipe = redis.pipeline(transaction=False)
+    if requeue:
+        pipe.lpush(PENDING_REPORTS_KEY, *reversed(raw))
+    for item in raw:
+        pipe.lrem(PROCESSING_REPORTS_KEY, 1, item)
+    pipe.execute()
+
+
+def _hold_lock(redis: Any, token: str) -> bool:
+    """Kilidi alır veya (sahibiyse) süresini yeniler."""
+    if redis.set(_LOCK_KEY, token, nx=True, ex=_LOCK_TTL_SECONDS):
+        return True
+    if redis.get(_LOCK_KEY) == token:
+        return bool(redis.set(_LOCK_KEY, token, xx=True, ex=_LOCK_TTL_SECONDS))
+    return False
+
+
+def _release_lock(redis: Any, token: str) -> None:
+    if redis.get(_LOCK_KEY) == token:
+        redis.delete(_LOCK_KEY)
+
+
+def requeue_stale_reports(redis: Any) -> int:
+    """
+    İşlenenler listesinde kalan kayıtları bekleme listesinin başına (sırası
+    korunarak) geri koyar. Yalnız persist kilidi tutulurken çağrılmalıdır;
+    aksi halde başka worker'ın commit etmekte olduğu batch çift yazılır.
+    """
+    from app.services.seismic_cluster import PENDING_REPORTS_KEY, PROCESSING_REPORTS_KEY
+
+    moved = 0
+    while redis.lmove(PROCESSING_REPORTS_KEY, PENDING_REPORTS_KEY, "RIGHT", "LEFT") is not None:
+        moved += 1
+    if moved:
+        logger.warning("%d yarım kalmış sismik rapor bekleme listesine geri kondu.", moved)
+    return moved
+
+
+def _persist_batches(redis: Any, token: str) -> int:
+    """Kilit altında: önceki çalıştırmanın kalıntısını geri koyar ve batch'leri DB'ye yazar."""
+    from app.database import SyncSessionLocal
+    from app.models.seismic_report import SeismicReport
+
+    requeue_stale_reports(redis)
+    persisted = 0
+    for _ in range(_MAX_BATCHES_PER_RUN):
+        if not _hold_lock(redis, token):
+            logger.warning("Sismik persist kilidi kaybedildi, çalıştırma durduruldu.")
+            break
+        raw = _claim_batch(redis)
+        if not raw:
+            break
+        rows = _decode(raw)
+        try:
+            if rows:
+                with SyncSessionLocal() as session:
+                    session.execute(insert(SeismicReport), rows)
+                    session.commit()
+        except Exception as exc:
+            logger.error("Sismik rapor batch insert hatası, kayıtlar geri kondu: %s", exc)
+            _release_batch(redis, raw, requeue=True)
+            break
+        _release_batch(redis, raw)
+        persisted += len(rows)
+    return persisted
+
+
+@celery_app.task(name="app.tasks.persist_seismic_reports.persist_seismic_reports")
+def persist_seismic_reports() -> dict:
+    """
+    Redis'teki bekleyen sismik raporları toplu olarak DB'ye yazar.
+    Insert başarısız olursa kayıtlar listeye geri konur; süreç commit'ten önce
+    ölürse sonraki çalıştırma kilidi aldığında requeue_stale_reports geri koyar
+    (kayıp yok, en az bir kez). Kilit başka çalıştırmadaysa hiçbir şey yapmaz.
+    """
+    from app.core.redis import get_shake_redis_sync
+
+    token = uuid.uuid4().hex
+    with get_shake_redis_sync() as redis:
+        if not _hold_lock(redis, token):
+            return {"status": "busy", "persisted": 0}
+        try:
+            persisted = _persist_batches(redis, token)
+        finally:
+            _release_lock(redis, token)
+
+    if persisted:
+        logger.info("💾 %d sismik rapor toplu kaydedildi.", persisted)
+    return {"status": "ok", "persisted": persisted}
@@ -72,10 +72,9 @@ def process_sos_audio_task(
                 user_id, latitude, longitude, timestamp, str(exc)
             )
 
-        # 2. Transcribe with Whisper
+        # 2. Transcribe with Whisper (senkron; paylaşılan Groq client)
         try:
-            import asyncio
-            transcription = asyncio.run(whisper.transcribe(audio_path, timeout=10))
+            transcription = whisper.transcribe(audio_path, timeout=10)
             logger.info("Groq Whisper transkripsiyon başarılı: %d karakter", len(transcription))
         except WhisperServiceError as exc:
             logger.warning("Whisper hatası, fallback kullanılıyor: %s", exc)
@@ -0,0 +1,55 @@
+"""
+Geçersiz FCM token temizliği.
+FCM gönderimleri UNREGISTERED / token kaynaklı INVALID_ARGUMENT dönen token'ları
+toplu olarak bu task'a verir (app.services.fcm._record_outcome); task
+users.fcm_token kolonunu FCM_PRUNE_BATCH_SIZE'lık UPDATE'lerle temizler.
+Böylece ölü token'lar sonraki yayınlarda gönderim maliyeti oluşturmaz.
+Temizlenen kullanıcılar push kitle segmentlerinden de çıkarılır.
+"""
+
+import logging
+from typing import List
+
+from redis.exceptions import RedisError
+from sqlalchemy import update
+
+from app.config import settings
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.prune_fcm_tokens.prune_fcm_tokens", ignore_result=True)
+def prune_fcm_tokens(tokens: List[str]) -> dict:
+    """
+    Verilen token'lara sahip kullanıcıların fcm_token alanını NULL yapar.
+    Yalnızca token hâlâ aynıysa temizlenir: arada yenilenen token korunur.
+    """
+    from app.core.redis import get_redis_sync
+    from app.database import SyncSessionLocal
+    from app.models.user import User
+    from app.services.metrics import incr_counters
+    from app.services.push_audience import apply_memberships_sync
+
+    unique = list(dict.fromkeys(t for t in tokens if t))
+    pruned = 0
+    user_ids: List[int] = []
+    with SyncSessionLocal() as session:
+        for start in range(0, len(unique), settings.FCM_PRUNE_BATCH_SIZE):
+            batch = unique[start:start + settings.FCM_PRUNE_BATCH_SIZE]
+            result = session.execute(
+                update(User).where(User.fcm_token.in_(batch)).values(fcm_token=None).returning(User.id)
+            )
+            pruned += result.rowcount or 0
+            user_ids.extend(result.scalars().all())
+        session.commit()
+
+    if user_ids:
+        try:
+            apply_memberships_sync(get_redis_sync(), [(user_id, None) for user_id in user_ids])
+        except (RedisError, OSError) as exc:
+            logger.warning("Temizlenen token'lar push kitlesinden çıkarılamadı: %s", exc)
+
+    incr_counters("fcm", pruned=pruned)
+    logger.info("🧹 FCM token temizliği: %d/%d token kullanıcıdan silindi", pruned, len(unique))
+    return {"status": "ok", "reported": len(unique), "pruned": pruned}
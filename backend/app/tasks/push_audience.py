@@ -0,0 +1,61 @@
+"""
+Push kitle segmentlerinin (app.services.push_audience) tam yeniden kurulumu.
+İlk kurulumda ve PUSH_AUDIENCE_REBUILD_INTERVAL_SECONDS'ta bir çalışır:
+token'ı olan kullanıcılar PUSH_AUDIENCE_REBUILD_BATCH_SIZE'lık parçalarla
+segmentlere yazılır, artık token'ı olmayan/silinmiş kullanıcıların kayıtları
+kaldırılır; son olarak hiçbir üye kaydının göstermediği token'lar segmentlerden
+silinir. Artımlı bakımın (Redis kesintisi vb.) kaçırdığı değişiklikleri onarır.
+"""
+
+import logging
+from typing import List, Optional, Set, Tuple
+
+from app.config import settings
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.push_audience.rebuild_push_audience", ignore_result=True)
+def rebuild_push_audience() -> dict:
+    """Kitleyi DB'den yeniden kurar ve hazır işaretini koyar."""
+    from app.core.redis import get_redis_sync
+    from app.database import SyncSessionLocal
+    from app.models.user import User
+    from app.services.push_audience import (
+        MEMBER_KEY_PATTERN, READY_KEY, Membership,
+        apply_memberships_sync, audience_query, member_user_id, membership_for,
+        prune_unreferenced_sync,
+    )
+
+    redis = get_redis_sync()
+    batch_size = settings.PUSH_AUDIENCE_REBUILD_BATCH_SIZE
+    seen: Set[int] = set()
+    batch: List[Tuple[int, Optional[Membership]]] = []
+    with SyncSessionLocal() as session:
+        rows = session.execute(
+            audience_query().where(User.fcm_token.isnot(None)).execution_options(yield_per=batch_size)
+        )
+        for user_id, *fields in rows:
+            seen.add(user_id)
+            batch.append((user_id, membership_for(*fields)))
+            if len(batch) >= batch_size:
+                apply_memberships_sync(redis, batch)
+                batch = []
+    apply_memberships_sync(redis, batch)
+
+    stale = [
+        member_user_id(key)
+        for key in redis.scan_iter(match=MEMBER_KEY_PATTERN, count=batch_size)
+        if member_user_id(key) not in seen
+    ]
+    for start in range(0, len(stale), batch_size):
+        apply_memberships_sync(redis, [(user_id, None) for user_id in stale[start:start + batch_size]])
+    pruned = prune_unreferenced_sync(redis, batch_size)
+    redis.set(READY_KEY, "1")
+
+    logger.info(
+        "👥 Push kitlesi yeniden kuruldu: %d kullanıcı, %d eski kayıt, %d sahipsiz token silindi",
+        len(seen), len(stale), pruned,
+    )
+    return {"status": "ok", "members": len(seen), "removed": len(stale), "pruned": pruned}
@@ -0,0 +1,52 @@
+"""
+Birleştirilmiş deprem push'larının özet gönderimi.
+Celery Beat ile COALESCE_FLUSH_INTERVAL_SECONDS aralıkla çalışır; pencere sonu
+gelen token'ları aynı özete göre gruplar ve her grup için tek multicast atar.
+Bekleyen depremler yalnız gönderim başarılı olursa silinir (ack_due); FCM
+hatasında özet bir sonraki çalıştırmada yeniden denenir.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from app.config import settings
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.push_coalescing.flush_coalesced_pushes", ignore_result=True)
+def flush_coalesced_pushes() -> int:
+    """
+    Bekleyen deprem özetlerini gönderir.
+
+    Returns:
+        Özet gönderilen token sayısı.
+    """
+    from app.core.redis import get_redis
+    from app.services.fcm import send_quake_summary_multicast
+    from app.services.push_coalescing import CoalescedSummary, ack_due, take_due
+    from app.tasks.quake_alarm import run_on_worker_loop
+
+    async def run() -> int:
+        redis = await get_redis()
+        groups: Dict[CoalescedSummary, List[Tuple[str, Sequence[str]]]] = defaultdict(list)
+        for token, summary, event_ids in await take_due(redis):
+            groups[summary].append((token, event_ids))
+        sent = 0
+        for summary, members in groups.items():
+            delivered = await send_quake_summary_multicast(
+                [token for token, _ in members], summary.count, summary.max_magnitude, summary.location,
+                settings.COALESCE_WINDOW_SECONDS // 60,
+            )
+            if not delivered:
+                logger.warning("[Birleştirme] %d token'lık özet gönderilemedi, yeniden denenecek", len(members))
+                continue
+            await ack_due(redis, members)
+            sent += len(members)
+        if groups:
+            logger.info("[Birleştirme] %d token'a %d farklı özet gönderildi", sent, len(groups))
+        return sent
+
+    return run_on_worker_loop(run())
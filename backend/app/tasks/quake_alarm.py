@@ -0,0 +1,206 @@
+"""
+Alarm hattı — katalog depremlerinin push'ları ve alarm worker'ı ısıtma.
+
+M≥ALARM_MIN_MAGNITUDE deprem push'ları outbox'tan (app.tasks.outbox, push_alarm
+kanalı) ayrı kuyrukta (settings.ALARM_QUEUE) gönderilir: SOS transkripsiyonu,
+Twilio ve periyodik işlerin birikmesi alarm fanout'unu geciktirmez; küçük
+depremlerin push'ları (push kanalı) varsayılan kuyrukta kalır. Alarm worker'ı
+-Q alarms --prefetch-multiplier=1 -O fair ile çalışır; diğerleri -X alarms ile dinlemez.
+
+ALARM_QUEUE'yu tüketen worker'ın süreçleri başlarken (worker_process_init)
+Firebase, FCM thread havuzu, ulusal şiddet ızgarası, DB, Redis ve Groq/Anthropic
+bağlantıları ısıtılır; kuyruk seçimi celeryd_after_setup'ta (-Q/-X uygulandıktan
+sonra) okunur, -X alarms ile çalışan genel worker ısıtılmaz. Async işler süreç
+boyunca yaşayan tek olay döngüsünde koşar, böylece async Redis havuzu görevler
+arasında yeniden kullanılır. Her alarm aşama damgalarını (AlarmTimeline) histograma yazar.
+"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Coroutine, Dict, List, Optional
+
+from celery.signals import celeryd_after_setup, worker_process_init
+
+if TYPE_CHECKING:
+    from app.services.alarm_latency import AlarmTimeline
+    from app.services.push_audience import SegmentAudience, TableScanAudience
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+# Ana süreçte celeryd_after_setup'ta belirlenir, prefork çocuklarına fork ile geçer
+_consumes_alarm_queue = False
+
+
+class PushDeliveryError(Exception):
+    """Boş olmayan bir kitleye hiç push iletilemedi (FCM kesintisi); outbox yeniden dener."""
+    pass
+
+
+def run_on_worker_loop(coro: Coroutine) -> Any:
+    """Coroutine'i süreç başına kalıcı olay döngüsünde çalıştırır."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+@celeryd_after_setup.connect
+def _note_alarm_consumer(sender: str, instance: Any, **_: Any) -> None:
+    """Worker'ın (-Q/-X sonrası) ALARM_QUEUE'yu tüketip tüketmediğini kaydeder."""
+    from app.config import settings
+
+    global _consumes_alarm_queue
+    _consumes_alarm_queue = settings.ALARM_QUEUE in instance.app.amqp.queues.consume_from
+    logger.info("Worker %s alarm kuyruğunu %s.", sender, "tüketiyor" if _consumes_alarm_queue else "tüketmiyor")
+
+
+@worker_process_init.connect
+def prewarm_worker(**_: Any) -> None:
+    """
+    Alarm yolunun ilk görevde ödeyeceği kurulum maliyetlerini önceden öder.
+    Yalnız ALARM_QUEUE'yu tüketen worker'da; genel worker'ın her süreci gereksiz
+    yere Firebase/ızgara/AI istemcisi ve DB/Redis bağlantısı açmasın.
+    """
+    if not _consumes_alarm_queue:
+        return
+    from sqlalchemy import text
+    from app.core.redis import get_redis, get_redis_sync
+    from app.database import SyncSessionLocal
+    from app.services.ai_clients import warm_ai_clients
+    from app.services.fcm import _fcm_executor, _init_firebase
+    from app.services.intensity_grid import get_national_grid
+
+    steps = {
+        "firebase": _init_firebase,
+        "fcm_executor": _fcm_executor,
+        "intensity_grid": get_national_grid,
+        "redis_sync": lambda: get_redis_sync().ping(),
+        "redis_async": lambda: run_on_worker_loop(get_redis()),
+        # S.O.S işleme (Groq/Anthropic) — ilk görev TLS el sıkışması beklemesin
+        "ai_clients": warm_ai_clients,
+    }
+
+    def warm_db() -> None:
+        with SyncSessionLocal() as session:
+            session.execute(text("SELECT 1"))
+
+    steps["database"] = warm_db
+    for name, step in steps.items():
+        try:
+            step()
+        except Exception as exc:
+            logger.warning("Worker ısıtma adımı başarısız (%s): %s", name, exc)
+    logger.info("Worker ısıtıldı: %s", ", ".join(steps))
+
+
+async def push_quake(
+    quake: Dict[str, Any],
+    audience: "SegmentAudience | TableScanAudience",
+    timeline: Optional["AlarmTimeline"] = None,
+    redis=None,
+) -> None:
+    """
+    Bir deprem için hedefli NEW_EARTHQUAKE push'u gönderir (outbox
+    earthquake.new olayı).
+
+    Args:
+        quake: id, magnitude, latitude, longitude, depth, location, occurred_at (ISO).
+        audience: app.services.push_audience.load_audience sonucu.
+        timeline: Alarm SLO zaman çizelgesi (yalnız alarm hattında).
+        redis: Verilirse artçı birleştirme uygulanır (app.services.push_coalescing):
+            penceresi açık token'lar özete eklenir. Yeniden denemede penceresini
+            bu deprem açmış token'lara yine hemen gönderilir.
+
+    Raises:
+        PushDeliveryError: Boş olmayan kitleye 0 başarılı gönderim.
+    """
+    from app.services.fcm import send_earthquake_push_multicast
+    from app.services.intensity_grid import get_intensity_raster
+    from app.services.push_coalescing import admit
+
+    raster = get_intensity_raster(
+        quake["id"], quake["magnitude"], quake["latitude"], quake["longitude"], quake["depth"],
+    )
+    target_tokens = await audience.targets(quake["magnitude"], raster)
+    if redis is not None:
+        target_tokens = await admit(redis, quake, target_tokens)
+    if not target_tokens:
+        return
+    sent = await send_earthquake_push_multicast(
+        fcm_tokens=target_tokens,
+        magnitude=quake["magnitude"],
+        location=quake["location"],
+        depth=quake["depth"],
+        occurred_at=quake["occurred_at"],
+        timeline=timeline,
+    )
+    if not sent:
+        raise PushDeliveryError(
+            f"M{quake['magnitude']:.1f} {quake['location']}: NEW_EARTHQUAKE: 0/{len(target_tokens)} token"
+        )
+
+
+async def push_quake_alarm(
+    quake: Dict[str, Any],
+    audience: "SegmentAudience | TableScanAudience",
+    timeline: Optional["AlarmTimeline"] = None,
+    redis=None,
+) -> None:
+    """
+    Tüm kullanıcılara EARTHQUAKE_CONFIRMED alarmını gönderir (outbox
+    earthquake.confirmed olayı; hedefli push'tan ayrı settle edilir, böylece
+    alarm yeniden denemesi NEW_EARTHQUAKE'i tekrarlamaz).
+
+    Args:
+        redis: Verilirse yakın tarihli alarmın artçısı için alarm tekrarlanmaz.
+
+    Raises:
+        PushDeliveryError: Alarm gönderilemedi veya 0 başarılı gönderim.
+    """
+    from app.services.push_coalescing import should_alarm
+
+    if redis is not None and not await should_alarm(redis, quake):
+        return
+    failures = await _push_confirmed(quake, audience, timeline)
+    if failures:
+        raise PushDeliveryError(f"M{quake['magnitude']:.1f} {quake['location']}: " + "; ".join(failures))
+
+
+async def _push_confirmed(
+    quake: Dict[str, Any],
+    audience: "SegmentAudience | TableScanAudience",
+    timeline: Optional["AlarmTimeline"],
+) -> List[str]:
+    """EARTHQUAKE_CONFIRMED alarmını tüm kullanıcılara gönderir. Döner: hata açıklamaları."""
+    from datetime import datetime
+    from app.services.fcm import send_earthquake_confirmed_push
+
+    # ── EARTHQUAKE_CONFIRMED Nükleer Alarm Push ────────────────────────
+    # Tüm kullanıcılara priority="high" data-only push gönderir.
+    # Android: Doze Mode'u deler → telefon uyanır → Nükleer Alarm tetiklenir.
+    # iOS: content-available=1 + critical=True → Sessiz mod bypass.
+    all_tokens, coords = await audience.everyone()
+    if not all_tokens:
+        return []
+    try:
+        sent = await send_earthquake_confirmed_push(
+            fcm_tokens=all_tokens,
+            latitude=quake["latitude"],
+            longitude=quake["longitude"],
+            device_count=1,  # AFAD/Kandilli onaylı → cihaz sayısı 1 olarak işaret
+            occurred_at=quake["occurred_at"],
+            # Kullanıcı başına S dalgası geri sayımı (tek vektörize geçiş)
+            recipient_coords=coords,
+            origin_ts=datetime.fromisoformat(quake["occurred_at"]).timestamp(),
+            depth_km=quake["depth"],
+            timeline=timeline,
+        )
+        logger.info(
+            "[NükleerAlarm] EARTHQUAKE_CONFIRMED push: M%.1f %s → %d/%d token",
+            quake["magnitude"], quake["location"], sent, len(all_tokens),
+        )
+    except Exception as exc:
+        logger.error("[NükleerAlarm] EARTHQUAKE_CONFIRMED push hatası: %s", exc)
+        return [f"EARTHQUAKE_CONFIRMED: {exc}"]
+    return [] if sent else [f"EARTHQUAKE_CONFIRMED: 0/{len(all_tokens)} token"]
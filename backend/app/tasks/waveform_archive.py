@@ -0,0 +1,59 @@
+"""
+Dalga formu arşivi görevleri.
+  - reanalyze_waveforms_near: episantr çevresindeki cihazların son kayıtlarına
+    STA/LTA'yı güncel eşiklerle yeniden uygular (olay sonrası analiz).
+  - prune_waveform_archive: saklama süresi dolan saat dizinlerini siler (Beat).
+"""
+
+import logging
+import time
+
+from app.config import settings
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.waveform_archive.reanalyze_waveforms_near")
+def reanalyze_waveforms_near(
+    latitude: float,
+    longitude: float,
+    radius_km: float = 100.0,
+    minutes: int = 60,
+) -> dict:
+    """Son `minutes` dakikada radius_km içindeki cihaz pencerelerini yeniden analiz eder."""
+    from app.services.waveform_archive import get_waveform_archive
+    from app.services.waveform_engine import reanalyze_chunks
+
+    end_ts = time.time()
+    chunks = get_waveform_archive().query(
+        end_ts - minutes * 60, end_ts, latitude=latitude, longitude=longitude, radius_km=radius_km,
+    )
+    results = reanalyze_chunks(
+        chunks,
+        settings.SEISMIC_WAVEFORM_STA_SECONDS,
+        settings.SEISMIC_WAVEFORM_LTA_SECONDS,
+        settings.SEISMIC_WAVEFORM_TRIGGER_RATIO,
+    )
+    triggered = [
+        {"device_id": c.device_id, "start_ts": c.start_ts, "sta_lta_ratio": round(v.sta_lta_ratio, 2),
+         "peak_acceleration": round(v.peak_acceleration, 3)}
+        for c, v in results if v.triggered
+    ]
+    logger.info(
+        "🔁 Dalga formu yeniden analizi: %d pencere, %d tetik (%.4f, %.4f, %s km)",
+        len(results), len(triggered), latitude, longitude, radius_km,
+    )
+    return {"status": "ok", "windows": len(results), "triggered": triggered}
+
+
+@celery_app.task(name="app.tasks.waveform_archive.prune_waveform_archive")
+def prune_waveform_archive() -> dict:
+    """Saklama süresini aşan arşiv dizinlerini siler."""
+    from app.services.waveform_archive import get_waveform_archive
+
+    cutoff = time.time() - settings.SEISMIC_WAVEFORM_ARCHIVE_RETENTION_HOURS * 3600
+    removed = get_waveform_archive().prune(cutoff)
+    if removed:
+        logger.info("🧹 Dalga formu arşivinden %d saatlik dizin silindi.", removed)
+    return {"status": "ok", "removed": removed}
@@ -0,0 +1,157 @@
+"""
+Varış zamanı farklarından episantr ve oluş zamanı kestirimi (çok cihazlı konumlama).
+Pure fonksiyonlar — test edilebilir, yan etkisiz.
+
+Yöntem: cihazların tetik zamanları P dalgası varışı kabul edilir. Yerel düzlem
+(km) üzerinde vektörize ızgara araması yapılır; her düğüm için oluş zamanı
+kapalı formda (artıkların ortalaması) çözülür, en küçük kareler misfit'i en düşük
+düğüm seçilir, ardından daha sık bir ızgarayla iyileştirilir. Belirsizlik elipsi
+misfit yüzeyinden türetilen olabilirlik ağırlıklı konum kovaryansından hesaplanır.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.seismology import P_WAVE_VELOCITY_KMS, DEFAULT_DEPTH_KM
+
+_KM_PER_DEG_LAT: float = 111.0
+MIN_STATIONS: int = 4                  # 3 bilinmeyen (x, y, t0) + en az 1 serbestlik derecesi
+DEFAULT_PICK_SIGMA_SEC: float = 0.5    # Telefon saati + tetik gecikmesi belirsizliği
+_ROBUST_NODES: int = 31
+_ROBUST_MAX_STATIONS: int = 64         # L1 ön çözümde kullanılan en erken varışlar
+_COARSE_NODES: int = 41
+_FINE_NODES: int = 41
+_SEARCH_MARGIN_KM: float = 30.0
+_CHI2_2DOF_68: float = 2.30            # 2 serbestlik dereceli %68 güven bölgesi
+_OUTLIER_MAD_FACTOR: float = 4.0
+
+
+@dataclass(frozen=True)
+class EpicenterSolution:
+    """Konumlama sonucu."""
+
+    latitude: float
+    longitude: float
+    origin_ts: float               # Oluş zamanı (epoch sn)
+    rms_residual_sec: float
+    station_count: int             # Aykırı değerler atıldıktan sonra kullanılan cihaz
+    semi_major_km: float           # %68 belirsizlik elipsi
+    semi_minor_km: float
+    azimuth_deg: float             # Büyük eksenin kuzeyden saat yönünde açısı
+
+
+def _travel_times(gx: np.ndarray, gy: np.ndarray, sx: np.ndarray, sy: np.ndarray, depth_km: float) -> np.ndarray:
+    """(düğüm × cihaz) P seyahat süresi matrisi."""
+    dx = gx[:, None] - sx[None, :]
+    dy = gy[:, None] - sy[None, :]
+    return np.sqrt(dx * dx + dy * dy + depth_km * depth_km) * (1.0 / P_WAVE_VELOCITY_KMS)
+
+
+def _misfit_l2(travel: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Her düğüm için en küçük kareler oluş zamanı (ortalama) ve misfit (Σr²)."""
+    origin = (t[None, :] - travel).mean(axis=1)
+    residual = t[None, :] - travel - origin[:, None]
+    return (residual ** 2).sum(axis=1), origin
+
+
+def _misfit_l1(travel: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Aykırı değerlere dayanıklı ön çözüm: medyan oluş zamanı ve Σ|r|."""
+    origin = np.median(t[None, :] - travel, axis=1)
+    return np.abs(t[None, :] - travel - origin[:, None]).sum(axis=1), origin
+
+
+def _grid(cx: float, cy: float, half_span: float, nodes: int) -> Tuple[np.ndarray, np.ndarray]:
+    axis = np.linspace(-half_span, half_span, nodes)
+    gx, gy = np.meshgrid(cx + axis, cy + axis)
+    return gx.ravel(), gy.ravel()
+
+
+def _ellipse(
+    gx: np.ndarray, gy: np.ndarray, misfit: np.ndarray, sigma2: float,
+) -> Tuple[float, float, float]:
+    """Olabilirlik ağırlıklı kovaryanstan %68 elips (büyük, küçük eksen km, azimut)."""
+    chi2 = (misfit - misfit.min()) / sigma2
+    w = np.exp(-0.5 * chi2)
+    w /= w.sum()
+    mx, my = (w * gx).sum(), (w * gy).sum()
+    dx, dy = gx - mx, gy - my
+    cov = np.array([[(w * dx * dx).sum(), (w * dx * dy).sum()],
+                    [(w * dx * dy).sum(), (w * dy * dy).sum()]])
+    eigval, eigvec = np.linalg.eigh(cov)
+    major, minor = np.sqrt(np.maximum(eigval[::-1], 0.0) * _CHI2_2DOF_68)
+    vx, vy = eigvec[:, 1]
+    azimuth = math.degrees(math.atan2(vx, vy)) % 180.0
+    return float(major), float(minor), azimuth
+
+
+def locate_epicenter(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    arrival_ts: Sequence[float],
+    depth_km: float = DEFAULT_DEPTH_KM,
+    pick_sigma_sec: float = DEFAULT_PICK_SIGMA_SEC,
+) -> Optional[EpicenterSolution]:
+    """
+    Cihaz konumları ve P varış (tetik) zamanlarından episantr kestirir.
+
+    Args:
+        latitudes / longitudes: Cihaz konumları.
+        arrival_ts: Tetik zamanları (epoch sn).
+        depth_km: Varsayılan odak derinliği.
+        pick_sigma_sec: Tek varış zamanının tahmini hatası (sn).
+
+    Returns:
+        EpicenterSolution; cihaz sayısı MIN_STATIONS'tan azsa None.
+    """
+    lat = np.asarray(latitudes, dtype=float)
+    lon = np.asarray(longitudes, dtype=float)
+    t_abs = np.asarray(arrival_ts, dtype=float)
+    if len(lat) < MIN_STATIONS:
+        return None
+
+    lat0, lon0, t_ref = float(lat.mean()), float(lon.mean()), float(t_abs.min())
+    km_per_deg_lon = _KM_PER_DEG_LAT * max(math.cos(math.radians(lat0)), 0.01)
+    sx, sy, t = (lon - lon0) * km_per_deg_lon, (lat - lat0) * _KM_PER_DEG_LAT, t_abs - t_ref
+
+    half_span = max(np.abs(sx).max(), np.abs(sy).max()) + _SEARCH_MARGIN_KM
+    gx, gy = _grid(0.0, 0.0, half_span, _COARSE_NODES)
+    step = 2 * half_span / (_COARSE_NODES - 1)
+
+    # 1) L1 ön çözüm (seyrek ızgara, en erken varışlar) → saati kaymış cihazları ayıkla
+    early = np.argsort(t)[:_ROBUST_MAX_STATIONS]
+    rx, ry = _grid(0.0, 0.0, half_span, _ROBUST_NODES)
+    l1, l1_origin = _misfit_l1(_travel_times(rx, ry, sx[early], sy[early], depth_km), t[early])
+    best = int(l1.argmin())
+    residual = t - _travel_times(rx[best:best + 1], ry[best:best + 1], sx, sy, depth_km)[0] - l1_origin[best]
+    mad = float(np.median(np.abs(residual - np.median(residual))))
+    keep = np.abs(residual) <= max(_OUTLIER_MAD_FACTOR * 1.4826 * mad, 3 * pick_sigma_sec)
+    if keep.sum() < MIN_STATIONS:
+        keep[:] = True
+    sx, sy, t = sx[keep], sy[keep], t[keep]
+
+    # 2) Kalan cihazlarla en küçük kareler: kaba ızgara + en iyi düğüm çevresinde sık ızgara
+    misfit, _ = _misfit_l2(_travel_times(gx, gy, sx, sy, depth_km), t)
+    best = int(misfit.argmin())
+    fx, fy = _grid(gx[best], gy[best], 2 * step, _FINE_NODES)
+    f_misfit, f_origin = _misfit_l2(_travel_times(fx, fy, sx, sy, depth_km), t)
+    fbest = int(f_misfit.argmin())
+
+    n = int(keep.sum())
+    sigma2 = max(float(f_misfit[fbest]) / max(n - 3, 1), pick_sigma_sec ** 2)
+    major, minor, azimuth = _ellipse(fx, fy, f_misfit, sigma2)
+    if major > step:  # Sık ızgara elipsi kapsamıyor → kaba ızgarayla hesapla
+        major, minor, azimuth = _ellipse(gx, gy, misfit, sigma2)
+
+    return EpicenterSolution(
+        latitude=lat0 + float(fy[fbest]) / _KM_PER_DEG_LAT,
+        longitude=lon0 + float(fx[fbest]) / km_per_deg_lon,
+        origin_ts=t_ref + float(f_origin[fbest]),
+        rms_residual_sec=math.sqrt(float(f_misfit[fbest]) / n),
+        station_count=n,
+        semi_major_km=round(major, 2),
+        semi_minor_km=round(minor, 2),
+        azimuth_deg=round(azimuth, 1),
+    )
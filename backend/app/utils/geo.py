@@ -4,7 +4,9 @@ Kümeleme ve bölge eşlemesi için kullanılır.
 """
 
 import math
-from typing import Tuple
+from typing import Sequence, Tuple
+
+import numpy as np
 
 # GeoHash için base32 alfabesi (standart)
 _GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
@@ -24,6 +26,20 @@ def haversine_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) ->
     return R * c
 
 
+def haversine_distances_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Tek noktadan çok sayıda noktaya Haversine mesafesi (km), vektörize.
+    haversine_distance_km ile aynı formül; NaN koordinat NaN mesafe verir.
+    """
+    R = 6371.0
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlam = np.radians(lons) - math.radians(lon)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    return R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
 def geohash_encode(latitude: float, longitude: float, precision: int = 5) -> str:
     """
     Koordinatı GeoHash string'e çevirir. Aynı/komşu bölge karşılaştırması için.
@@ -57,3 +73,42 @@ def geohash_encode(latitude: float, longitude: float, precision: int = 5) -> str
             bits = 0
             ch = 0
     return "".join(result)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    GeoHash hücresinin sınırlarını (lat_min, lat_max, lon_min, lon_max) döner.
+    geohash_encode'un tersi; hücre merkezi sınırların ortalamasıdır.
+    """
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    even = True
+    for char in geohash:
+        ch = _GEOHASH_ALPHABET.index(char)
+        for bit in range(4, -1, -1):
+            on = (ch >> bit) & 1
+            if even:
+                mid = (lon_min + lon_max) / 2
+                lon_min, lon_max = (mid, lon_max) if on else (lon_min, mid)
+            else:
+                mid = (lat_min + lat_max) / 2
+                lat_min, lat_max = (mid, lat_max) if on else (lat_min, mid)
+            even = not even
+    return lat_min, lat_max, lon_min, lon_max
+
+
+def weighted_centroid(points: Sequence[Tuple[float, float, float]]) -> Tuple[float, float]:
+    """
+    (lat, lon, ağırlık) noktalarının ağırlıklı merkezini döner.
+    Küme ölçeğinde (onlarca km) düzlem yaklaşımı yeterlidir.
+    Toplam ağırlık sıfırsa basit ortalama alınır.
+    """
+    if not points:
+        raise ValueError("weighted_centroid: en az bir nokta gerekli")
+    total = sum(max(w, 0.0) for _, _, w in points)
+    if total <= 0:
+        n = len(points)
+        return sum(p[0] for p in points) / n, sum(p[1] for p in points) / n
+    lat = sum(p[0] * max(p[2], 0.0) for p in points) / total
+    lon = sum(p[1] * max(p[2], 0.0) for p in points) / total
+    return lat, lon
@@ -0,0 +1,143 @@
+"""
+Sismolojik yaklaşık hesaplamalar: yer hareketi tahmini (GMPE) ve büyüklük kestirimi.
+Pure fonksiyonlar — test edilebilir, yan etkisiz.
+Katsayılar kaba kestirim içindir; resmi (AFAD/Kandilli) büyüklüğün yerini tutmaz.
+"""
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.geo import haversine_distances_km
+
+# Yerçekimi ivmesi (m/s²)
+G_MS2: float = 9.81
+
+# Basit GMPE: log10(PGA[g]) = A + B·M − C·log10(√(R² + H²))
+_GMPE_A: float = -1.75
+_GMPE_B: float = 0.35
+_GMPE_C: float = 1.0
+DEFAULT_DEPTH_KM: float = 10.0  # Varsayılan odak derinliği (yakın alan doygunluğu)
+
+# Kabuk ortalaması dalga hızları (km/s)
+P_WAVE_VELOCITY_KMS: float = 6.0
+S_WAVE_VELOCITY_KMS: float = 3.5
+
+# PGA → MMI dönüşümü (Wald vd. 1999): MMI = a·log10(PGA[cm/s²]) + b
+_MMI_HIGH_A: float = 3.66
+_MMI_HIGH_B: float = -1.66
+_MMI_LOW_A: float = 2.20
+_MMI_LOW_B: float = 1.00
+_MMI_SPLIT: float = 5.0           # Yüksek bağıntının geçerli olduğu en düşük MMI
+_MMI_MIN: float = 1.0
+_MMI_MAX: float = 10.0
+_CM_S2_PER_G: float = 980.665
+
+# Kestirilen büyüklüğün kırpılacağı aralık
+_MAGNITUDE_MIN: float = 1.0
+_MAGNITUDE_MAX: float = 9.5
+
+
+def hypocentral_distance_km(epicentral_km: float, depth_km: float = DEFAULT_DEPTH_KM) -> float:
+    """Episantr uzaklığı ve derinlikten hiposantr uzaklığını döner."""
+    return math.sqrt(epicentral_km ** 2 + depth_km ** 2)
+
+
+def p_wave_travel_time(distance_km: float, depth_km: float = DEFAULT_DEPTH_KM) -> float:
+    """Episantr uzaklığındaki noktaya P dalgasının varış süresi (saniye)."""
+    return hypocentral_distance_km(distance_km, depth_km) / P_WAVE_VELOCITY_KMS
+
+
+def s_wave_travel_time(distance_km: float, depth_km: float = DEFAULT_DEPTH_KM) -> float:
+    """Episantr uzaklığındaki noktaya S dalgasının (güçlü sarsıntı) varış süresi (saniye)."""
+    return hypocentral_distance_km(distance_km, depth_km) / S_WAVE_VELOCITY_KMS
+
+
+def s_wave_arrivals(
+    epicenter_lat: float,
+    epicenter_lon: float,
+    origin_ts: float,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    depth_km: float = DEFAULT_DEPTH_KM,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Çok sayıda noktaya S dalgası varışını tek vektörize geçişte hesaplar
+    (s_wave_travel_time ile aynı model).
+
+    Args:
+        epicenter_lat / epicenter_lon: Episantr.
+        origin_ts: Oluş zamanı (epoch sn).
+        latitudes / longitudes: Hedef noktalar; konumu bilinmeyen için NaN.
+        depth_km: Odak derinliği (km).
+
+    Returns:
+        (episantr uzaklıkları km, S varış zamanları epoch sn) — NaN girişte NaN.
+    """
+    distances = haversine_distances_km(
+        epicenter_lat, epicenter_lon,
+        np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float),
+    )
+    arrivals = origin_ts + np.sqrt(distances * distances + depth_km * depth_km) * (1.0 / S_WAVE_VELOCITY_KMS)
+    return distances, arrivals
+
+
+def predict_pga_g(magnitude: float, distance_km: float, depth_km: float = DEFAULT_DEPTH_KM) -> float:
+    """
+    Basit GMPE ile beklenen tepe yer ivmesini (g) hesaplar.
+
+    Args:
+        magnitude: Deprem büyüklüğü.
+        distance_km: Episantr uzaklığı (km).
+        depth_km: Odak derinliği (km).
+
+    Returns:
+        Beklenen PGA (g cinsinden).
+    """
+    r = hypocentral_distance_km(distance_km, depth_km)
+    return 10 ** (_GMPE_A + _GMPE_B * magnitude - _GMPE_C * math.log10(r))
+
+
+def predict_mmi(
+    magnitude: float,
+    distances_km: np.ndarray,
+    depth_km: float = DEFAULT_DEPTH_KM,
+) -> np.ndarray:
+    """
+    predict_pga_g ile aynı GMPE'yi uzaklık dizisi üzerinde vektörize değerlendirip
+    Wald (1999) bağıntısıyla Değiştirilmiş Mercalli şiddetine (MMI) çevirir.
+
+    Returns:
+        distances_km ile aynı biçimde MMI (1–10 aralığına kırpılmış).
+    """
+    r2 = np.square(distances_km) + depth_km * depth_km
+    log_pga_g = _GMPE_A + _GMPE_B * magnitude - 0.5 * _GMPE_C * np.log10(r2)
+    log_pga = log_pga_g + math.log10(_CM_S2_PER_G)
+    high = _MMI_HIGH_A * log_pga + _MMI_HIGH_B
+    mmi = np.where(high >= _MMI_SPLIT, high, _MMI_LOW_A * log_pga + _MMI_LOW_B)
+    return np.clip(mmi, _MMI_MIN, _MMI_MAX)
+
+
+def estimate_magnitude_from_pga(
+    pga_ms2: float,
+    distance_km: float,
+    depth_km: float = DEFAULT_DEPTH_KM,
+) -> Optional[float]:
+    """
+    Ölçülen tepe ivme ve uzaklıktan GMPE'yi ters çevirerek büyüklük kestirir.
+
+    Args:
+        pga_ms2: Cihazın ölçtüğü filtrelenmiş tepe ivme (m/s²).
+        distance_km: Cihazın episantra uzaklığı (km).
+        depth_km: Varsayılan odak derinliği (km).
+
+    Returns:
+        Kaba büyüklük kestirimi; ivme sıfır/negatifse None.
+    """
+    if pga_ms2 <= 0:
+        return None
+    pga_g = pga_ms2 / G_MS2
+    r = hypocentral_distance_km(distance_km, depth_km)
+    magnitude = (math.log10(pga_g) - _GMPE_A + _GMPE_C * math.log10(r)) / _GMPE_B
+    return max(_MAGNITUDE_MIN, min(_MAGNITUDE_MAX, magnitude))
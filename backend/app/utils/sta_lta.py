@@ -1,11 +1,19 @@
 """
 STA/LTA sismik algoritma yardımcı fonksiyonlar.
 Pure fonksiyonlar — test edilebilir, yan etkisiz.
+StreamingStaLta: örnek başına O(1) durumlu dedektör (halka tampon + yürüyen toplam).
 rules.md: type hints zorunlu, max 50 satır/fonksiyon.
 """
 
+import math
 from collections import deque
-from typing import Deque
+from dataclasses import dataclass
+from typing import Deque, Literal, Optional
+
+# Varsayılanlar mobil uygulamayla aynı (mobile/src/constants/seismic.ts)
+DEFAULT_TRIGGER_RATIO: float = 5.0
+DEFAULT_DETRIGGER_RATIO: float = 2.0
+DEFAULT_HIGHPASS_ALPHA: float = 0.94
 
 
 def high_pass_filter(sample: float, prev_raw: float, prev_filtered: float, alpha: float) -> float:
@@ -60,3 +68,102 @@ def vector_magnitude(x: float, y: float, z: float) -> float:
         √(x² + y² + z²) değeri.
     """
     return (x ** 2 + y ** 2 + z ** 2) ** 0.5
+
+
+@dataclass(frozen=True)
+class TriggerEvent:
+    """Tetikleme başlangıcı ("on") veya bitişi ("off")."""
+
+    kind: Literal["on", "off"]
+    sample_index: int
+    sta_lta_ratio: float
+    peak_acceleration: float  # Tetikleme boyunca en yüksek ham büyüklük (m/s²)
+
+
+class StreamingStaLta:
+    """
+    Akış halinde STA/LTA dedektörü.
+
+    Her örnek için vector_magnitude → high_pass_filter uygular; STA ve LTA
+    pencerelerini halka tamponlarda yürüyen |x| toplamlarıyla tutar. Örnek
+    başına maliyet pencere boyundan bağımsızdır (liste kopyası yok).
+    compute_sta_lta ile aynı oranı üretir; kayan nokta birikimini önlemek için
+    toplamlar her lta_window örnekte bir yeniden hesaplanır (amortize O(1)).
+    Tetikleme hysteresis ile çalışır: oran ≥ trigger_ratio → "on",
+    tetikliyken oran < detrigger_ratio → "off".
+    """
+
+    def __init__(
+        self,
+        sta_window: int,
+        lta_window: int,
+        trigger_ratio: float = DEFAULT_TRIGGER_RATIO,
+        detrigger_ratio: float = DEFAULT_DETRIGGER_RATIO,
+        alpha: float = DEFAULT_HIGHPASS_ALPHA,
+    ) -> None:
+        if not 0 < sta_window <= lta_window:
+            raise ValueError("0 < sta_window <= lta_window olmalı")
+        if detrigger_ratio > trigger_ratio:
+            raise ValueError("detrigger_ratio, trigger_ratio'dan büyük olamaz")
+        self.sta_window = sta_window
+        self.lta_window = lta_window
+        self.trigger_ratio = trigger_ratio
+        self.detrigger_ratio = detrigger_ratio
+        self.alpha = alpha
+
+        self._sta_buf: Deque[float] = deque(maxlen=sta_window)
+        self._lta_buf: Deque[float] = deque(maxlen=lta_window)
+        self._sta_sum = 0.0
+        self._lta_sum = 0.0
+        self._prev_raw: Optional[float] = None
+        self._prev_filtered = 0.0
+        self._index = -1
+        self._peak = 0.0
+        self.triggered = False
+        self.ratio = 0.0
+
+    def _push(self, value: float) -> None:
+        """|x| değerini iki pencereye ekler, çıkan değeri toplamdan düşer."""
+        if len(self._sta_buf) == self.sta_window:
+            self._sta_sum -= self._sta_buf[0]
+        if len(self._lta_buf) == self.lta_window:
+            self._lta_sum -= self._lta_buf[0]
+        self._sta_buf.append(value)
+        self._lta_buf.append(value)
+        self._sta_sum += value
+        self._lta_sum += value
+        if self._index % self.lta_window == 0:
+            self._sta_sum = math.fsum(self._sta_buf)
+            self._lta_sum = math.fsum(self._lta_buf)
+
+    def update(self, x: float, y: float, z: float) -> Optional[TriggerEvent]:
+        """
+        3 eksen ham ivme örneğini işler.
+
+        Returns:
+            Tetikleme durumu değiştiyse TriggerEvent, aksi halde None.
+        """
+        self._index += 1
+        raw = vector_magnitude(x, y, z)
+        if self._prev_raw is None:
+            self._prev_raw = raw  # İlk örnekte yerçekimi basamağı tetik üretmesin
+        filtered = high_pass_filter(raw, self._prev_raw, self._prev_filtered, self.alpha)
+        self._prev_raw = raw
+        self._prev_filtered = filtered
+        self._push(abs(filtered))
+
+        if len(self._lta_buf) < self.lta_window or self._lta_sum <= 0:
+            self.ratio = 0.0
+        else:
+            self.ratio = (self._sta_sum / self.sta_window) / (self._lta_sum / self.lta_window)
+
+        if self.triggered:
+            self._peak = max(self._peak, raw)
+            if self.ratio < self.detrigger_ratio:
+                self.triggered = False
+                return TriggerEvent("off", self._index, self.ratio, self._peak)
+        elif self.ratio >= self.trigger_ratio:
+            self.triggered = True
+            self._peak = raw
+            return TriggerEvent("on", self._index, self.ratio, self._peak)
+        return None
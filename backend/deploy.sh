@@ -121,8 +121,10 @@ fi
 
 # 11. Celery worker'ı başlat
 echo -e "${YELLOW}🚀 Celery worker başlatılıyor...${NC}"
-nohup celery -A app.tasks.celery_app worker --loglevel=info > /var/log/celery-worker.log 2>&1 &
+nohup celery -A app.tasks.celery_app worker --loglevel=info -X alarms > /var/log/celery-worker.log 2>&1 &
 CELERY_PID=$!
+# Alarm hattı ayrı worker'da: uzun SOS/Twilio işleri alarm push'larını bekletmez
+nohup celery -A app.tasks.celery_app worker -Q alarms -n alarms@%h --loglevel=info --concurrency=2 --prefetch-multiplier=1 -O fair > /var/log/celery-alarms.log 2>&1 &
 sleep 3
 
 # Celery'nin başladığını kontrol et
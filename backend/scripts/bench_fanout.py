@@ -0,0 +1,200 @@
+"""
+Bildirim fanout benchmark'ı — yerel FCM/Twilio stand-in'lerine karşı.
+
+Gerçek gönderim yollarını (fcm.send_earthquake_push_multicast,
+fcm.send_earthquake_confirmed_push, twilio_fallback.send_waterfall_emergency[_async],
+twilio_sms.TwilioService.send_emergency_alert) FCM_TRANSPORT=local ve
+TWILIO_TRANSPORT=local ile sürer; Google veya Twilio'ya istek gitmez.
+Stand-in davranışı (gecikme, hata/geçersiz oranı, kota) komut satırından ayarlanır.
+
+Raporlanan metrikler (senaryo × alıcı sayısı):
+  - duvar süresi ve throughput (alıcı/sn), başarılı gönderim
+  - stand-in istek sayısı, istek gecikmesi p50/p99, eşzamanlı en fazla istek
+  - kotaya takılan, geçersiz ve geçici hatalı alıcılar
+
+Çalıştırma (backend dizininde):
+  python scripts/bench_fanout.py --tokens 10000 100000 1000000
+  python scripts/bench_fanout.py --tokens 100000 --fcm-rate 50000 --fcm-error-rate 0.01 --json
+  python scripts/bench_fanout.py --scenarios waterfall sms --phones 500 --twilio-rate 100
+
+Not: geçersiz token'lar (--fcm-invalid-rate) prune_fcm_tokens işi kuyruğa atar;
+broker yoksa bu arka planda başarısız olur, ölçümü etkilemez. Metrik sayaçları
+Redis yoksa sessizce atlanır. Twilio şelalesi DB log'u yazamazsa loglayıp devam eder.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+
+FCM_SCENARIOS = ("multicast", "confirmed")
+TWILIO_SCENARIOS = ("waterfall", "waterfall_async", "sms")
+
+# Sentetik alıcı konumları için Türkiye sınır kutusu
+_TR_LAT = (36.0, 42.0)
+_TR_LON = (26.0, 44.5)
+_EPICENTER = (37.45, 37.05)
+
+
+def _configure(args: argparse.Namespace) -> None:
+    """Stand-in'leri etkinleştirir ve profilleri ayarlar (ilk gönderimden önce)."""
+    settings.FCM_TRANSPORT = "local"
+    settings.TWILIO_TRANSPORT = "local"
+    settings.FCM_FANOUT_WORKERS = args.fcm_workers
+    settings.LOCAL_FCM_LATENCY_MS = args.fcm_latency_ms
+    settings.LOCAL_FCM_JITTER_MS = args.fcm_jitter_ms
+    settings.LOCAL_FCM_ERROR_RATE = args.fcm_error_rate
+    settings.LOCAL_FCM_INVALID_RATE = args.fcm_invalid_rate
+    settings.LOCAL_FCM_RATE_PER_SECOND = args.fcm_rate
+    settings.LOCAL_TWILIO_LATENCY_MS = args.twilio_latency_ms
+    settings.LOCAL_TWILIO_JITTER_MS = args.twilio_jitter_ms
+    settings.LOCAL_TWILIO_ERROR_RATE = args.twilio_error_rate
+    settings.LOCAL_TWILIO_INVALID_RATE = args.twilio_invalid_rate
+    settings.LOCAL_TWILIO_RATE_PER_SECOND = args.twilio_rate
+
+
+def _tokens(n: int) -> List[str]:
+    return [f"bench-token-{i:08d}" for i in range(n)]
+
+
+def _coords(n: int, rng: random.Random) -> List[Tuple[float, float]]:
+    return [(rng.uniform(*_TR_LAT), rng.uniform(*_TR_LON)) for _ in range(n)]
+
+
+def _measure(name: str, recipients: int, run: Callable[[], int], stats: Callable[[], dict]) -> dict:
+    t0 = time.perf_counter()
+    sent = run()
+    wall = time.perf_counter() - t0
+    return {
+        "scenario": name,
+        "recipients": recipients,
+        "sent": sent,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_sec": round(recipients / wall, 1) if wall else None,
+        **stats(),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    _configure(args)
+    from app.services import fcm, local_transports
+    from app.services.twilio_fallback import send_waterfall_emergency, send_waterfall_emergency_async
+    from app.services.twilio_sms import TwilioService
+
+    rng = random.Random(args.seed)
+    occurred_at = datetime.now(timezone.utc).isoformat()
+    origin_ts = time.time()
+    results = []
+
+    for n in args.tokens:
+        tokens = _tokens(n)
+        for scenario in (s for s in args.scenarios if s in FCM_SCENARIOS):
+            local_transports.reset_local_transports()
+            if scenario == "multicast":
+                def go() -> int:
+                    return asyncio.run(fcm.send_earthquake_push_multicast(
+                        tokens, 5.2, "Bench (stand-in)", 10.0, occurred_at,
+                    ))
+            else:
+                coords = _coords(n, rng)
+
+                def go() -> int:
+                    return asyncio.run(fcm.send_earthquake_confirmed_push(
+                        tokens, *_EPICENTER, device_count=1, occurred_at=occurred_at,
+                        recipient_coords=coords, origin_ts=origin_ts, depth_km=10.0,
+                    ))
+            results.append(_measure(
+                scenario, n, go, lambda: local_transports.get_local_fcm().stats.as_dict(),
+            ))
+            print(f"  ✓ {scenario:<15} {n:>9} token  {results[-1]['wall_seconds']} sn", file=sys.stderr)
+
+    phones = [f"+90555{i:07d}" for i in range(args.phones)]
+    for scenario in (s for s in args.scenarios if s in TWILIO_SCENARIOS):
+        local_transports.reset_local_transports()
+        if scenario == "waterfall":
+            def go() -> int:
+                result = send_waterfall_emergency(phones, "Bench: depreme yakalandım", event_type="BENCH")
+                return result["whatsapp_sent"] + result["sms_sent"]
+        elif scenario == "waterfall_async":
+            def go() -> int:
+                result = asyncio.run(send_waterfall_emergency_async(phones, "Bench: depreme yakalandım", event_type="BENCH"))
+                return result["whatsapp_sent"] + result["sms_sent"]
+        else:
+            def go() -> int:
+                return asyncio.run(TwilioService().send_emergency_alert(phones, "Bench: depreme yakalandım"))
+        results.append(_measure(
+            scenario, len(phones), go, lambda: local_transports.get_local_twilio().stats.as_dict(),
+        ))
+        print(f"  ✓ {scenario:<15} {len(phones):>9} numara {results[-1]['wall_seconds']} sn", file=sys.stderr)
+
+    return {
+        "fcm_profile": vars(local_transports.StandInProfile.fcm()),
+        "twilio_profile": vars(local_transports.StandInProfile.twilio()),
+        "fcm_workers": settings.FCM_FANOUT_WORKERS,
+        "results": results,
+    }
+
+
+def _print_report(report: dict) -> None:
+    print("\n" + "=" * 100)
+    print(f"  Fanout benchmark — FCM workers={report['fcm_workers']}")
+    print(f"  FCM stand-in   : {report['fcm_profile']}")
+    print(f"  Twilio stand-in: {report['twilio_profile']}")
+    print("=" * 100)
+    print(
+        f"  {'senaryo':<15} {'alıcı':>9} {'başarılı':>9} {'süre sn':>9} {'alıcı/sn':>10} "
+        f"{'istek':>7} {'p50 ms':>8} {'p99 ms':>8} {'eşzaman':>8} {'kota':>7} {'geçersiz':>8} {'hata':>6}"
+    )
+    for r in report["results"]:
+        print(
+            f"  {r['scenario']:<15} {r['recipients']:>9} {r['sent']:>9} {r['wall_seconds']:>9} "
+            f"{r['throughput_per_sec']:>10} {r['requests']:>7} {r['request_p50_ms']!s:>8} "
+            f"{r['request_p99_ms']!s:>8} {r['max_in_flight']:>8} {r['throttled']:>7} {r['invalid']:>8} {r['errors']:>6}"
+        )
+    print("=" * 100)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bildirim fanout benchmark'ı (yerel FCM/Twilio stand-in'leri)")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--phones", type=int, default=200, help="Twilio senaryolarındaki numara sayısı")
+    parser.add_argument(
+        "--scenarios", nargs="+", default=[*FCM_SCENARIOS, *TWILIO_SCENARIOS],
+        choices=[*FCM_SCENARIOS, *TWILIO_SCENARIOS],
+    )
+    parser.add_argument("--fcm-workers", type=int, default=settings.FCM_FANOUT_WORKERS)
+    parser.add_argument("--fcm-latency-ms", type=float, default=settings.LOCAL_FCM_LATENCY_MS)
+    parser.add_argument("--fcm-jitter-ms", type=float, default=settings.LOCAL_FCM_JITTER_MS)
+    parser.add_argument("--fcm-error-rate", type=float, default=settings.LOCAL_FCM_ERROR_RATE)
+    parser.add_argument("--fcm-invalid-rate", type=float, default=settings.LOCAL_FCM_INVALID_RATE)
+    parser.add_argument("--fcm-rate", type=float, default=settings.LOCAL_FCM_RATE_PER_SECOND, help="Mesaj/sn kotası (0 = sınırsız)")
+    parser.add_argument("--twilio-latency-ms", type=float, default=settings.LOCAL_TWILIO_LATENCY_MS)
+    parser.add_argument("--twilio-jitter-ms", type=float, default=settings.LOCAL_TWILIO_JITTER_MS)
+    parser.add_argument("--twilio-error-rate", type=float, default=settings.LOCAL_TWILIO_ERROR_RATE)
+    parser.add_argument("--twilio-invalid-rate", type=float, default=settings.LOCAL_TWILIO_INVALID_RATE)
+    parser.add_argument("--twilio-rate", type=float, default=settings.LOCAL_TWILIO_RATE_PER_SECOND, help="Mesaj/sn kotası (0 = sınırsız)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Uygulama loglarını göster")
+    parser.add_argument("--json", action="store_true", help="Raporu JSON olarak yazdır")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Crowdsource sarsıntı yük üreteci ve algılama benchmark'ı.
+
+Bir il ölçeğinde sentetik cihaz nüfusu üretir (ilçe merkezleri etrafında
+yoğunlaşan, Zipf dağılımlı nüfus), seçilen episantrdan P/S dalga varış
+gecikmeleriyle sarsıntı sinyalleri oluşturur ve ShakeClusterService'i
+süreç içinde (fakeredis veya yerel Redis) sürer.
+
+Raporlanan metrikler:
+  - throughput (sinyal/sn), add_shake p50/p99 gecikme
+  - time-to-confirm: deprem anından ilk doğrulamaya kadar geçen simüle süre
+  - episantr hatası ve kestirilen büyüklük
+  - false positive oranı: yalnızca arka plan gürültüsü içeren fazda doğrulama/saat
+
+Çalıştırma (backend dizininde):
+  pip install fakeredis   # yerel Redis kullanılmayacaksa
+  python scripts/bench_shake_load.py --devices 100000 --magnitude 5.5
+  python scripts/bench_shake_load.py --redis-url redis://localhost:6379/15 --json
+
+Not: rate limit ve TTL gerçek (duvar) saatle işler; replay simüle süreden çok
+hızlı aktığı için gürültü fazında cihaz başına rate limit gerçekte olduğundan
+daha katı davranır. Her çalıştırma benzersiz cihaz/zaman öneki kullanır,
+yerel Redis'teki veriler silinmez.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+from app.services.shake_cluster_service import ConfirmedShakeEvent, ShakeClusterService  # noqa: E402
+from app.utils.geo import haversine_distance_km  # noqa: E402
+from app.utils.seismology import (  # noqa: E402
+    G_MS2,
+    p_wave_travel_time,
+    predict_pga_g,
+    s_wave_travel_time,
+)
+
+_KM_PER_DEG_LAT = 111.0
+# Telefonun sarsıntıyı algıladığı yaklaşık ivme eşiği (g)
+_PHONE_TRIGGER_G = 0.01
+# GMPE saçılımı (log10 birimi)
+_GMPE_SIGMA_LOG10 = 0.3
+# P dalgasında tetiklenmek için eşiğin kaç katı ivme gerekir
+_P_TRIGGER_FACTOR = 4.0
+
+
+@dataclass
+class Device:
+    device_id: str
+    latitude: float
+    longitude: float
+
+
+@dataclass
+class Signal:
+    device_id: str
+    latitude: float
+    longitude: float
+    offset_sec: float
+    intensity: float
+
+
+@dataclass
+class PhaseResult:
+    name: str
+    signals: int
+    wall_seconds: float
+    throughput_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    confirmations: int
+    time_to_confirm_sec: Optional[float] = None
+    epicenter_error_km: Optional[float] = None
+    estimated_magnitude: Optional[float] = None
+
+
+def _offset(lat: float, lon: float, dx_km: float, dy_km: float) -> Tuple[float, float]:
+    """Noktayı doğu/kuzey yönünde km cinsinden öteler."""
+    dlat = dy_km / _KM_PER_DEG_LAT
+    dlon = dx_km / (_KM_PER_DEG_LAT * math.cos(math.radians(lat)))
+    return lat + dlat, lon + dlon
+
+
+def generate_population(
+    rng: random.Random,
+    n_devices: int,
+    center: Tuple[float, float],
+    radius_km: float,
+    n_towns: int,
+    run_id: str,
+) -> List[Device]:
+    """
+    İl içinde ilçe merkezleri etrafında kümelenen cihaz nüfusu üretir.
+    İlçe nüfusları Zipf (1/k) dağılımlıdır; merkez ilçe en kalabalığıdır.
+    """
+    towns = [(center, 4.0)]
+    for _ in range(n_towns - 1):
+        r = radius_km * math.sqrt(rng.random())
+        theta = rng.uniform(0, 2 * math.pi)
+        towns.append((_offset(*center, r * math.cos(theta), r * math.sin(theta)), rng.uniform(1.0, 3.0)))
+    weights = [1.0 / (k + 1) for k in range(len(towns))]
+
+    devices = []
+    for i, ((lat, lon), spread_km) in enumerate(rng.choices(towns, weights=weights, k=n_devices)):
+        dlat, dlon = _offset(lat, lon, rng.gauss(0, spread_km), rng.gauss(0, spread_km))
+        devices.append(Device(f"{run_id}-{i}", dlat, dlon))
+    return devices
+
+
+def generate_quake_signals(
+    rng: random.Random,
+    devices: List[Device],
+    epicenter: Tuple[float, float],
+    magnitude: float,
+    depth_km: float,
+    participation: float,
+) -> List[Signal]:
+    """
+    Deprem sinyalleri: GMPE (log-normal saçılımlı) ivme telefon eşiğini aşan
+    cihazlar S dalgasında, çok güçlü sarsılanlar P dalgasında tetiklenir.
+    """
+    signals = []
+    for d in devices:
+        if rng.random() > participation:
+            continue
+        dist = haversine_distance_km(epicenter[0], epicenter[1], d.latitude, d.longitude)
+        pga_g = predict_pga_g(magnitude, dist, depth_km) * 10 ** rng.gauss(0, _GMPE_SIGMA_LOG10)
+        if pga_g < _PHONE_TRIGGER_G:
+            continue
+        if pga_g >= _PHONE_TRIGGER_G * _P_TRIGGER_FACTOR:
+            arrival = p_wave_travel_time(dist, depth_km)
+        else:
+            arrival = s_wave_travel_time(dist, depth_km)
+        # Algılama gecikmesi: STA penceresi + ağ (0.3–1.5 sn)
+        arrival += rng.uniform(0.3, 1.5)
+        signals.append(Signal(d.device_id, d.latitude, d.longitude, arrival, pga_g * G_MS2))
+    signals.sort(key=lambda s: s.offset_sec)
+    return signals
+
+
+def generate_noise_signals(
+    rng: random.Random,
+    devices: List[Device],
+    hours: float,
+    rate_per_device_hour: float,
+) -> List[Signal]:
+    """Arka plan gürültüsü: her cihaz Poisson süreciyle rastgele yanlış tetiklenir."""
+    duration = hours * 3600.0
+    expected = rate_per_device_hour * hours * len(devices)
+    count = int(rng.gauss(expected, math.sqrt(expected))) if expected > 0 else 0
+    signals = []
+    for d in rng.choices(devices, k=max(count, 0)):
+        signals.append(Signal(d.device_id, d.latitude, d.longitude, rng.uniform(0, duration), rng.uniform(0.2, 1.5)))
+    signals.sort(key=lambda s: s.offset_sec)
+    return signals
+
+
+async def replay(
+    name: str,
+    service: ShakeClusterService,
+    signals: List[Signal],
+    origin: datetime,
+    concurrency: int,
+) -> Tuple[PhaseResult, List[Tuple[float, ConfirmedShakeEvent]]]:
+    """Sinyalleri zaman sırasıyla, sınırlı eşzamanlılıkla servise gönderir."""
+    latencies: List[float] = []
+    confirmations: List[Tuple[float, ConfirmedShakeEvent]] = []
+
+    async def _send(sig: Signal) -> None:
+        t0 = time.perf_counter()
+        event = await service.add_shake(
+            device_id=sig.device_id,
+            latitude=sig.latitude,
+            longitude=sig.longitude,
+            timestamp=origin + timedelta(seconds=sig.offset_sec),
+            intensity=sig.intensity,
+        )
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if event:
+            confirmations.append((sig.offset_sec, event))
+
+    wall_start = time.perf_counter()
+    for i in range(0, len(signals), concurrency):
+        await asyncio.gather(*(_send(s) for s in signals[i:i + concurrency]))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    result = PhaseResult(
+        name=name,
+        signals=len(signals),
+        wall_seconds=round(wall, 3),
+        throughput_per_sec=round(len(signals) / wall, 1) if wall > 0 else 0.0,
+        p50_ms=round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+        p99_ms=round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3) if latencies else 0.0,
+        confirmations=len(confirmations),
+    )
+    return result, sorted(confirmations, key=lambda c: c[0])
+
+
+async def _make_redis(redis_url: Optional[str]):
+    if redis_url:
+        import redis.asyncio as aioredis
+        return aioredis.from_url(redis_url, decode_responses=True)
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis bulunamadı: pip install fakeredis veya --redis-url verin.")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    devices = generate_population(
+        rng, args.devices, (args.province_lat, args.province_lon), args.province_radius_km, args.towns, run_id
+    )
+
+    # ── Faz 1: deprem ─────────────────────────────────────────────────────
+    origin = datetime.now(timezone.utc).replace(microsecond=0)
+    quake_signals = generate_quake_signals(
+        rng, devices, (args.lat, args.lon), args.magnitude, args.depth_km, args.participation
+    )
+    redis = await _make_redis(args.redis_url)
+    quake, confirmations = await replay(
+        "quake", ShakeClusterService(redis), quake_signals, origin, args.concurrency
+    )
+    if confirmations:
+        first_offset, first = confirmations[0]
+        quake.time_to_confirm_sec = round(first_offset, 2)
+        quake.epicenter_error_km = round(
+            haversine_distance_km(args.lat, args.lon, first.latitude, first.longitude), 2
+        )
+        quake.estimated_magnitude = first.estimated_magnitude
+    await redis.aclose()
+
+    # ── Faz 2: yalnızca gürültü (false positive) ──────────────────────────
+    noise_origin = origin + timedelta(days=1)
+    noise_signals = generate_noise_signals(rng, devices, args.noise_hours, args.noise_rate)
+    redis = await _make_redis(args.redis_url)
+    noise, _ = await replay(
+        "noise", ShakeClusterService(redis), noise_signals, noise_origin, args.concurrency
+    )
+    await redis.aclose()
+
+    return {
+        "devices": args.devices,
+        "min_devices_to_confirm": settings.SHAKE_MIN_DEVICES_TO_CONFIRM,
+        "geohash_precision": settings.SHAKE_GEOHASH_PRECISION,
+        "backend": args.redis_url or "fakeredis",
+        "quake": asdict(quake),
+        "noise": asdict(noise),
+        "false_positives_per_hour": round(noise.confirmations / args.noise_hours, 3) if args.noise_hours else None,
+    }
+
+
+def _print_report(report: dict) -> None:
+    print("\n" + "=" * 64)
+    print(f"  Shake benchmark — {report['devices']} cihaz, backend={report['backend']}")
+    print(f"  Eşik: {report['min_devices_to_confirm']} cihaz, geohash={report['geohash_precision']}")
+    print("=" * 64)
+    for phase in ("quake", "noise"):
+        r = report[phase]
+        print(f"\n▶ {phase}")
+        print(f"  sinyal            : {r['signals']}")
+        print(f"  throughput        : {r['throughput_per_sec']} sinyal/sn ({r['wall_seconds']} sn)")
+        print(f"  gecikme p50 / p99 : {r['p50_ms']} ms / {r['p99_ms']} ms")
+        print(f"  doğrulama         : {r['confirmations']}")
+        if r.get("time_to_confirm_sec") is not None:
+            print(f"  time-to-confirm   : {r['time_to_confirm_sec']} sn (simüle)")
+            print(f"  episantr hatası   : {r['epicenter_error_km']} km, M~{r['estimated_magnitude']}")
+    print(f"\n  False positive    : {report['false_positives_per_hour']} doğrulama/saat")
+    print("=" * 64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Crowdsource sarsıntı yük üreteci ve algılama benchmark'ı")
+    parser.add_argument("--devices", type=int, default=100_000)
+    parser.add_argument("--province-lat", type=float, default=37.58, help="İl merkezi (varsayılan: Kahramanmaraş)")
+    parser.add_argument("--province-lon", type=float, default=36.93)
+    parser.add_argument("--province-radius-km", type=float, default=60.0)
+    parser.add_argument("--towns", type=int, default=12)
+    parser.add_argument("--lat", type=float, default=37.45, help="Episantr latitude")
+    parser.add_argument("--lon", type=float, default=37.05, help="Episantr longitude")
+    parser.add_argument("--magnitude", type=float, default=5.5)
+    parser.add_argument("--depth-km", type=float, default=10.0)
+    parser.add_argument("--participation", type=float, default=0.3, help="Sabit/şarjda olup algılayabilen cihaz oranı")
+    parser.add_argument("--noise-hours", type=float, default=1.0)
+    parser.add_argument("--noise-rate", type=float, default=0.02, help="Cihaz başına saatlik yanlış tetik oranı")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--redis-url", default=None, help="Boşsa fakeredis kullanılır")
+    parser.add_argument("--json", action="store_true", help="Raporu JSON olarak yazdır")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+STA/LTA dedektör benchmark'ı — liste tabanlı fonksiyonlar vs StreamingStaLta.
+
+100 Hz × 3 eksen sentetik ivmeölçer kaydı üretir (yerçekimi + sensör gürültüsü,
+ortasında P/S benzeri sarsıntı patlaması) ve iki yolu örnek örnek sürer:
+  - liste: vector_magnitude → high_pass_filter → list.append/pop(0) → compute_sta_lta
+  - akış : StreamingStaLta.update
+
+Raporlanan metrikler: örnek başına µs, hızlanma oranı, en büyük oran farkı
+ve iki yolun ürettiği tetikleme olaylarının uyumu.
+
+--windows N verilirse sunucu tarafı NumPy motoru (app.services.waveform_engine)
+için N adet 10 sn'lik sıkıştırılmış pencerenin çözme + analiz hızı da ölçülür.
+
+Çalıştırma (backend dizininde):
+  python scripts/bench_sta_lta.py --seconds 600 --lta-sec 30
+  python scripts/bench_sta_lta.py --windows 5000 --json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.seismology import G_MS2  # noqa: E402
+from app.utils.sta_lta import (  # noqa: E402
+    DEFAULT_DETRIGGER_RATIO,
+    DEFAULT_HIGHPASS_ALPHA,
+    DEFAULT_TRIGGER_RATIO,
+    StreamingStaLta,
+    compute_sta_lta,
+    high_pass_filter,
+    vector_magnitude,
+)
+
+Sample = Tuple[float, float, float]
+
+
+def generate_record(seconds: float, rate_hz: int, seed: int) -> List[Sample]:
+    """Gürültü + ortada 8 sn'lik 3 Hz sarsıntı içeren 3 eksen kayıt."""
+    rng = random.Random(seed)
+    n = int(seconds * rate_hz)
+    quake_start, quake_len = n // 2, 8 * rate_hz
+    record = []
+    for i in range(n):
+        x, y, z = rng.gauss(0, 0.02), rng.gauss(0, 0.02), G_MS2 + rng.gauss(0, 0.02)
+        k = i - quake_start
+        if 0 <= k < quake_len:
+            envelope = math.sin(math.pi * k / quake_len) * 2.5
+            phase = 2 * math.pi * 3.0 * k / rate_hz
+            x += envelope * math.sin(phase)
+            y += envelope * 0.6 * math.cos(phase)
+            z += envelope * 0.4 * math.sin(1.3 * phase)
+        record.append((x, y, z))
+    return record
+
+
+def run_list(record: List[Sample], sta: int, lta: int) -> Tuple[float, List[float], List[Tuple[str, int]]]:
+    """Mevcut fonksiyonlarla (mobil useShakeDetector ile aynı akış) işler."""
+    samples: List[float] = []
+    prev_raw, prev_filtered = vector_magnitude(*record[0]), 0.0
+    triggered, ratios, events = False, [], []
+    t0 = time.perf_counter()
+    for i, (x, y, z) in enumerate(record):
+        raw = vector_magnitude(x, y, z)
+        filtered = high_pass_filter(raw, prev_raw, prev_filtered, DEFAULT_HIGHPASS_ALPHA)
+        prev_raw, prev_filtered = raw, filtered
+        samples.append(filtered)
+        if len(samples) > lta:
+            samples.pop(0)
+        ratio = compute_sta_lta(samples, sta, lta)
+        if not triggered and ratio >= DEFAULT_TRIGGER_RATIO:
+            triggered = True
+            events.append(("on", i))
+        elif triggered and ratio < DEFAULT_DETRIGGER_RATIO:
+            triggered = False
+            events.append(("off", i))
+        ratios.append(ratio)
+    return time.perf_counter() - t0, ratios, events
+
+
+def run_streaming(record: List[Sample], sta: int, lta: int) -> Tuple[float, List[float], List[Tuple[str, int]]]:
+    detector = StreamingStaLta(sta, lta)
+    ratios, events = [], []
+    t0 = time.perf_counter()
+    for x, y, z in record:
+        event = detector.update(x, y, z)
+        if event:
+            events.append((event.kind, event.sample_index))
+        ratios.append(detector.ratio)
+    return time.perf_counter() - t0, ratios, events
+
+
+def run_waveform_batch(count: int, rate_hz: int, seed: int) -> dict:
+    """N cihazın 10 sn'lik pencerelerini tek batch olarak çözüp analiz eder."""
+    import numpy as np
+    from app.config import settings
+    from app.services.waveform_engine import decode_and_analyze, encode_window
+
+    rng = np.random.default_rng(seed)
+    windows = rng.normal(0, 0.02, (count, 10 * rate_hz, 3))
+    windows[..., 2] += G_MS2
+    payloads = [(encode_window(w, 0.001), 0.001) for w in windows]
+    t0 = time.perf_counter()
+    decode_and_analyze(
+        payloads, rate_hz,
+        settings.SEISMIC_WAVEFORM_STA_SECONDS, settings.SEISMIC_WAVEFORM_LTA_SECONDS,
+    )
+    elapsed = time.perf_counter() - t0
+    return {"windows": count, "seconds": round(elapsed, 3), "windows_per_sec": int(count / elapsed)}
+
+
+def run(args: argparse.Namespace) -> dict:
+    record = generate_record(args.seconds, args.rate_hz, args.seed)
+    sta, lta = int(args.sta_sec * args.rate_hz), int(args.lta_sec * args.rate_hz)
+    list_sec, list_ratios, list_events = run_list(record, sta, lta)
+    stream_sec, stream_ratios, stream_events = run_streaming(record, sta, lta)
+    n = len(record)
+    report = {
+        "samples": n,
+        "rate_hz": args.rate_hz,
+        "sta_window": sta,
+        "lta_window": lta,
+        "list_us_per_sample": round(list_sec / n * 1e6, 3),
+        "streaming_us_per_sample": round(stream_sec / n * 1e6, 3),
+        "speedup": round(list_sec / stream_sec, 1),
+        "realtime_streams_per_core": int(1.0 / (stream_sec / n * args.rate_hz)),
+        "max_ratio_abs_diff": max(abs(a - b) for a, b in zip(list_ratios, stream_ratios)),
+        "events_match": list_events == stream_events,
+        "events": stream_events,
+    }
+    if args.windows:
+        report["waveform_batch"] = run_waveform_batch(args.windows, args.rate_hz, args.seed)
+    return report
+
+
+def _print_report(r: dict) -> None:
+    print("=" * 64)
+    print(f"STA/LTA benchmark — {r['samples']} örnek @ {r['rate_hz']} Hz × 3 eksen "
+          f"(STA={r['sta_window']}, LTA={r['lta_window']})")
+    print("=" * 64)
+    print(f"  liste   : {r['list_us_per_sample']} µs/örnek")
+    print(f"  akış    : {r['streaming_us_per_sample']} µs/örnek")
+    print(f"  hızlanma: {r['speedup']}×  (tek çekirdekte ~{r['realtime_streams_per_core']} gerçek zamanlı akış)")
+    print(f"  oran farkı (max): {r['max_ratio_abs_diff']:.2e}")
+    print(f"  tetik olayları  : {r['events']} — {'uyumlu' if r['events_match'] else 'UYUMSUZ'}")
+    if "waveform_batch" in r:
+        b = r["waveform_batch"]
+        print(f"  NumPy batch     : {b['windows']} × 10 sn pencere, {b['seconds']} sn → {b['windows_per_sec']} pencere/sn")
+    print("=" * 64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="STA/LTA dedektör benchmark'ı")
+    parser.add_argument("--seconds", type=float, default=300.0)
+    parser.add_argument("--rate-hz", type=int, default=100)
+    parser.add_argument("--sta-sec", type=float, default=1.0)
+    parser.add_argument("--lta-sec", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--windows", type=int, default=0, help="NumPy batch motoru için pencere sayısı (0 = atla)")
+    parser.add_argument("--json", action="store_true", help="Raporu JSON olarak yazdır")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ export interface SeismicReportPayload {
 }
 
 export interface SeismicReportResponse {
-    id: number;
+    id: number | null;  // Rapor DB'ye asenkron yazılır
     device_id: string;
     cluster_id: number | null;
     cluster_size: number;